@@ -0,0 +1,171 @@
+"""
+Bayesian Optimisation (BO)
+======================================================================
+
+This module realises a Bayesian optimiser for expensive fits with few
+(say 3--8) parameters. A Gaussian process (`GPSurrogate`) is fitted on
+all evaluations so far, and the next points are those maximising the
+expected improvement (EI) over the best weighted fitness found.
+
+To evaluate `q` points per round concurrently, the batch is built by the
+constant liar strategy (D. Ginsbourger et al., "Kriging is well-suited to
+parallelize optimization", 2010): once a point is chosen, it is added to
+the data of the process with a fictitious value -- the best, the mean or
+the worst value observed, by `liar` = `optimistic`, `mean` or
+`pessimistic` -- and the next point maximises the EI of the updated
+process. The EI is maximised over random candidates spread over the
+parameter space and around the best points found so far.
+
+The first round evaluates `ninit` points of a Latin hypercube design,
+unless enough points are provided for a warm start, either from the
+persistent cache of evaluations of the evaluator (`warmstart: cache`),
+or from a file with a row of parameter values followed by the cost for
+each evaluation (`warmstart: filename`).
+
+As in PSO, parameters are normalised to [-1, +1] within their ranges,
+and the renormalised values are passed for evaluation. An iteration is
+tagged by (round, point).
+"""
+import os
+import numpy as np
+from scipy.stats import norm as normal
+from scipy.stats import qmc
+from skpar.core.utils import get_logger
+from skpar.core.evaluate import batch_evaluate
+from skpar.core.engine import BatchEngine, get_ranges, get_stats
+from skpar.core.engine import get_normalisation
+from skpar.core.surrogate import GPSurrogate
+
+module_logger = get_logger('skpar.bo')
+
+LIARS = ['optimistic', 'mean', 'pessimistic']
+
+
+def expected_improvement(mean, std, best, xi=0.):
+    """Return the expected improvement over `best`, for maximisation"""
+    std = np.maximum(std, 1.e-12)
+    improvement = mean - best - xi
+    zval = improvement / std
+    return improvement * normal.cdf(zval) + std * normal.pdf(zval)
+
+
+class BO(BatchEngine):
+    """
+    Class defining a Bayesian optimiser with batches of q points per round.
+    """
+    name = 'BO'
+    statekeys = ['gp'] + BatchEngine.statekeys
+
+    def __init__(self, parameters, evaluate, q=4, ngen=20,
+                 objective_weights=(-1,), ErrTol=0.001, *args, **kwargs):
+        """
+        Set up the Gaussian process, warm-started if requested
+        """
+        super().__init__(evaluate, objective_weights, ngen, ErrTol, **kwargs)
+        self.logger = module_logger
+        self.parnames, parrange, _ = get_ranges(parameters, self.name)
+        self.q = q
+        self.ndim = len(parrange)
+        self.ninit = kwargs.get('ninit', None) or 2 * (self.ndim + 1)
+        self.ncandidates = kwargs.get('ncandidates', 2000)
+        self.xi = kwargs.get('xi', 0.)
+        self.liar = kwargs.get('liar', 'optimistic').lower()
+        if self.liar not in LIARS:
+            self.logger.critical('Unknown liar %s; use one of %s',
+                                 self.liar, LIARS)
+            raise ValueError('Unknown liar {}'.format(self.liar))
+        self.seed = kwargs.get('seed', None)
+        self.norm, self.shift = get_normalisation(parrange)
+        self.gpoptions = kwargs.get('gp', None) or {}
+        self.gp = GPSurrogate(**self.gpoptions)
+        self.warmstart = kwargs.get('warmstart', None)
+        if self.warmstart:
+            self.warm_start(self.warmstart)
+
+    def get_warmstart_data(self, source):
+        """Return parameter values and costs of previous evaluations"""
+        if source == 'cache':
+            cache = getattr(self.evaluate, 'cache', None)
+            if cache is None:
+                self.logger.warning('Warm start from the cache of '
+                                    'evaluations, but no cache is enabled')
+                return np.empty((0, self.ndim)), np.empty(0)
+            records = cache.records()
+            points = np.array([pp for pp, _ in records], dtype=float)
+            costs = np.array([cc for _, cc in records], dtype=float)
+        else:
+            data = np.atleast_2d(np.loadtxt(os.path.expanduser(source)))
+            points, costs = data[:, :-1], data[:, -1]
+        return points.reshape(-1, self.ndim), costs
+
+    def warm_start(self, source):
+        """Add previous evaluations within the parameter range to the GP"""
+        points, costs = self.get_warmstart_data(source)
+        normalised = (points - self.shift) * self.norm
+        inside = np.all(np.abs(normalised) <= 1. + 1.e-12, axis=1)
+        points, normalised, costs = \
+            points[inside], normalised[inside], costs[inside]
+        if not len(costs):
+            return
+        fitness = costs.reshape(-1, 1)
+        score = fitness.dot(self.weights[:1])
+        self.gp.add(normalised, score)
+        self.update_best(fitness, score, points,
+                         [('warmstart', i) for i in range(len(costs))])
+        self.logger.info('Warm start from %s: %d evaluations in range',
+                         source, len(costs))
+
+    def initial_design(self, npoints):
+        """Return a Latin hypercube of npoints normalised points"""
+        sampler = qmc.LatinHypercube(d=self.ndim, seed=self.rng)
+        return 2. * sampler.random(npoints) - 1.
+
+    def propose(self, npoints):
+        """Return npoints normalised points by EI and the constant liar"""
+        xval, yval = self.gp.get_data()
+        liar = GPSurrogate(**self.gpoptions)
+        liar.add(xval, yval)
+        lie = {'optimistic': np.max(yval), 'mean': np.mean(yval),
+               'pessimistic': np.min(yval)}[self.liar]
+        best = np.max(yval)
+        # candidates spread uniformly, and around the best points found
+        nlocal = self.ncandidates // 4
+        centres = xval[np.argsort(-yval, kind='stable')[:5]]
+        local = centres[self.rng.integers(len(centres), size=nlocal)] +\
+            self.rng.normal(0., 0.1, (nlocal, self.ndim))
+        candidates = np.vstack([
+            self.rng.uniform(-1., 1., (self.ncandidates - nlocal, self.ndim)),
+            np.clip(local, -1., 1.)])
+        proposed = []
+        for _ in range(npoints):
+            mean, std = liar.predict(candidates)
+            ei = expected_improvement(mean, std, best, self.xi)
+            ichosen = int(np.argmax(ei))
+            proposed.append(candidates[ichosen].copy())
+            liar.add([candidates[ichosen]], [lie])
+            candidates = np.delete(candidates, ichosen, axis=0)
+        return np.array(proposed)
+
+    def _evolve(self, ngen, mapper=None):
+        """Propose and evaluate batches of points for ngen rounds."""
+        for g in range(self.gen0, ngen):
+            if len(self.gp) < self.ninit:
+                points = self.initial_design(self.ninit - len(self.gp))
+            else:
+                points = self.propose(self.q)
+            iterations = [(g, i) for i in range(len(points))]
+            positions = points / self.norm + self.shift
+            fitness = np.array(batch_evaluate(self.evaluate, list(positions),
+                                              iterations, self.nworkers,
+                                              self.pool, mapper), dtype=float)
+            fitness = fitness.reshape(len(points), -1)
+            score = self.get_score(fitness)
+            self.gp.add(points, score)
+            self.update_best(fitness, score, positions, iterations)
+            self.stats_record.append(get_stats(fitness))
+            if self.end_generation(g, ngen, points):
+                break
+
+    def report(self):
+        super().report()
+        self.logger.info("Points in GP      : {}".format(len(self.gp)))
@@ -0,0 +1,41 @@
+"""Checkpointing of the state of optimisation engines.
+
+The state of an engine is a dictionary of picklable objects, e.g. the
+swarm and hall of fame of a PSO, together with the state of the random
+number generator, which is written to a binary file, so that a run may
+be resumed after an interruption.
+"""
+import os
+import pickle
+from skpar.core.utils import get_logger
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_CHECKPOINT_FILE = 'skpar.checkpoint'
+
+def save_checkpoint(filename, state):
+    """Write the `state` dictionary to `filename`.
+
+    The file is written under a temporary name first and then renamed,
+    so that an interruption during writing does not spoil a preceding
+    checkpoint.
+    """
+    dirname = os.path.dirname(os.path.abspath(filename))
+    if not os.path.exists(dirname):
+        os.makedirs(dirname, exist_ok=True)
+    tmpfile = filename + '.tmp'
+    with open(tmpfile, 'wb') as fout:
+        pickle.dump(state, fout, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmpfile, filename)
+    LOGGER.debug('Checkpoint written to %s', filename)
+
+def load_checkpoint(filename):
+    """Return the state dictionary stored in `filename`."""
+    try:
+        with open(filename, 'rb') as fin:
+            state = pickle.load(fin)
+    except (IOError, FileNotFoundError):
+        LOGGER.critical('Cannot read checkpoint file %s', filename)
+        raise
+    LOGGER.info('Checkpoint read from %s', filename)
+    return state
@@ -0,0 +1,110 @@
+"""
+Covariance Matrix Adaptation Evolution Strategy (CMA-ES)
+======================================================================
+
+This module wraps the CMA-ES of DEAP (`deap.cma.Strategy`, after
+N. Hansen and A. Ostermeier, Evolutionary Computation 9, 159 (2001)).
+At each generation the strategy samples a population of `npop` points
+from a multivariate normal distribution, which are evaluated as a single
+batch -- concurrently, if `nworkers` > 1 -- and the mean, step size and
+covariance matrix of the distribution are then adapted according to the
+ranking of the points. For smooth problems of 10--30 parameters this
+usually needs considerably fewer evaluations than PSO.
+
+As in PSO, parameters are normalised to [-1, +1] within their ranges.
+The search starts from the initial values of the parameters (or from the
+centre of the ranges, for initial values not given or out of range),
+with a step size `sigma` in normalised units. Sampled points outside the
+range are evaluated at their projection onto its boundary, but the
+strategy is updated with the samples themselves, ranked by their fitness
+less a penalty growing with the square of their distance from the range,
+so that the adaptation of the distribution is not biased towards the
+boundary. The renormalised values,
+:math:`\\lambda = P/\\eta + \\sigma`, are passed for evaluation, and an
+iteration is tagged by (generation, individual).
+"""
+import numpy as np
+from deap import cma
+from skpar.core.utils import get_logger
+from skpar.core.evaluate import batch_evaluate
+from skpar.core.engine import BatchEngine, get_ranges, get_stats
+from skpar.core.engine import get_normalisation, normalise_initial
+
+module_logger = get_logger('skpar.cmaes')
+
+
+class Individual(list):
+    """Point sampled by the strategy, ranked by its weighted fitness"""
+    fitness = None
+
+
+def get_penalty(population, clipped, score):
+    """Return the penalty of samples outside the range, for their ranking.
+
+    The penalty is the squared distance of a sample from its projection
+    onto the range, scaled by the spread of the scores (or 1), so that
+    samples projected onto the same point are ranked by their distance.
+    """
+    distance2 = np.sum((np.asarray(population) - clipped)**2, axis=1)
+    return (np.ptp(score) or 1.) * distance2
+
+
+class CMAES(BatchEngine):
+    """
+    Class defining a CMA-ES optimiser, with a batch evaluation per generation.
+    """
+    name = 'CMAES'
+    statekeys = ['strategy'] + BatchEngine.statekeys
+
+    def __init__(self, parameters, evaluate, npop=None, ngen=100,
+                 objective_weights=(-1,), ErrTol=0.001, *args, **kwargs):
+        """
+        Create the strategy; npop defaults to DEAP's 4 + 3 ln(nparameters)
+        """
+        # samples are drawn by the generator of the optimiser, not by
+        # strategy.generate(), which uses the global one of NumPy
+        super().__init__(evaluate, objective_weights, ngen, ErrTol, **kwargs)
+        self.logger = module_logger
+        self.parnames, parrange, initial = get_ranges(parameters, self.name)
+        self.norm, self.shift = get_normalisation(parrange)
+        centroid = normalise_initial(initial, parrange, self.norm, self.shift)
+        strategy_args = {}
+        if npop:
+            strategy_args['lambda_'] = npop
+        self.strategy = cma.Strategy(list(centroid), kwargs.get('sigma', 0.3),
+                                     **strategy_args)
+        self.npop = self.strategy.lambda_
+
+    def sample(self):
+        """Return npop individuals sampled as by `cma.Strategy.generate`"""
+        strategy = self.strategy
+        arz = self.rng.standard_normal((strategy.lambda_, strategy.dim))
+        arz = strategy.centroid + strategy.sigma * np.dot(arz, strategy.BD.T)
+        return [Individual(ind) for ind in arz]
+
+    def renormalise(self, points):
+        """Return the true (physical) coordinates of normalised points"""
+        return np.asarray(points, dtype=float) / self.norm + self.shift
+
+    def _evolve(self, ngen, mapper=None):
+        """Sample, evaluate and update the strategy for ngen generations."""
+        for g in range(self.gen0, ngen):
+            population = self.sample()
+            clipped = np.clip(population, -1., 1.)
+            iterations = [(g, i) for i in range(len(population))]
+            positions = self.renormalise(clipped)
+            fitness = np.array(batch_evaluate(self.evaluate, list(positions),
+                                              iterations, self.nworkers,
+                                              self.pool, mapper), dtype=float)
+            fitness = fitness.reshape(len(population), -1)
+            score = self.get_score(fitness)
+            for ind, val in zip(population, score -
+                                get_penalty(population, clipped, score)):
+                ind.fitness = val
+            self.update_best(fitness, score, positions, iterations)
+            self.strategy.update(population)
+            self.stats_record.append(get_stats(fitness))
+            self.logger.debug('Generation %d: sigma %.4g, condition %.4g',
+                              g, self.strategy.sigma, self.strategy.cond)
+            if self.end_generation(g, ngen, clipped):
+                break
@@ -0,0 +1,137 @@
+"""
+Differential Evolution (DE)
+======================================================================
+
+This module realises the classical differential evolution of R. Storn
+and K. Price, J. Global Optim. 11, 341 (1997). For each member
+:math:`x_i` of a population of `npop` points, a mutant vector is formed
+from the difference of two other randomly chosen members,
+
+    :math:`v_i = x_{r_1} + F (x_{r_2} - x_{r_3})` (strategy `rand1bin`), or
+    :math:`v_i = x_{best} + F (x_{r_1} - x_{r_2})` (strategy `best1bin`),
+
+and a trial vector takes each coordinate from :math:`v_i` with
+probability `CR` (at least one coordinate always), or from :math:`x_i`
+otherwise. The trial replaces :math:`x_i` if it is not worse.
+Since the differences of population members scale with the spread of the
+population along each direction, DE copes well with parameters of
+different scales and with strong correlations between them.
+
+All trial vectors of a generation are evaluated as a single batch --
+concurrently, if `nworkers` > 1. As in PSO, parameters are normalised to
+[-1, +1] within their ranges, and the renormalised values are passed for
+evaluation; a trial coordinate falling outside the range is placed
+midway between the coordinate of :math:`x_i` and the violated bound.
+An iteration is tagged by (generation, member), generation 0 being the
+evaluation of the initial population.
+"""
+import numpy as np
+from skpar.core.utils import get_logger
+from skpar.core.evaluate import batch_evaluate
+from skpar.core.engine import BatchEngine, get_ranges, get_stats
+from skpar.core.engine import get_normalisation
+
+module_logger = get_logger('skpar.de')
+
+DE_STRATEGIES = ['rand1bin', 'best1bin']
+
+
+def get_trials(population, ibest, F, CR, rng, strategy='rand1bin'):
+    """Return trial vectors by mutation and binomial crossover.
+
+    Args:
+        population(array): normalised members, shape (npop, ndim)
+        ibest(int): index of the best member, for `best1bin`
+        F(float): differential weight
+        CR(float): crossover probability
+        rng(Generator): NumPy random number generator
+        strategy(str): one of DE_STRATEGIES
+
+    Returns:
+        array of trial vectors, shape (npop, ndim), within [-1, 1]
+    """
+    npop, ndim = population.shape
+    mutants = np.empty_like(population)
+    for i in range(npop):
+        others = np.delete(np.arange(npop), i)
+        r1, r2, r3 = rng.choice(others, 3, replace=False)
+        if strategy == 'best1bin':
+            mutants[i] = population[ibest] +\
+                F * (population[r1] - population[r2])
+        else:
+            mutants[i] = population[r1] + F * (population[r2] - population[r3])
+    crossover = rng.random((npop, ndim)) < CR
+    crossover[np.arange(npop), rng.integers(ndim, size=npop)] = True
+    trials = np.where(crossover, mutants, population)
+    # move escaped coordinates between the member and the bound
+    trials = np.where(trials > 1, 0.5 * (population + 1), trials)
+    trials = np.where(trials < -1, 0.5 * (population - 1), trials)
+    return trials
+
+
+class DE(BatchEngine):
+    """
+    Class defining a Differential Evolution optimiser.
+    """
+    name = 'DE'
+    statekeys = ['population', 'popfit', 'popscore'] + BatchEngine.statekeys
+
+    def __init__(self, parameters, evaluate, npop=20, ngen=100,
+                 objective_weights=(-1,), ErrTol=0.001, *args, **kwargs):
+        """
+        Create a random population
+        """
+        super().__init__(evaluate, objective_weights, ngen, ErrTol, **kwargs)
+        self.logger = module_logger
+        self.parnames, parrange, _ = get_ranges(parameters, self.name)
+        assert npop >= 4, 'DE needs a population of at least 4 members'
+        self.npop = npop
+        self.F = kwargs.get('F', 0.7)
+        self.CR = kwargs.get('CR', 0.9)
+        self.strategy = kwargs.get('strategy', 'rand1bin').lower()
+        if self.strategy not in DE_STRATEGIES:
+            self.logger.critical('Unknown DE strategy %s; use one of %s',
+                                 self.strategy, DE_STRATEGIES)
+            raise ValueError('Unknown DE strategy {}'.format(self.strategy))
+        self.norm, self.shift = get_normalisation(parrange)
+        self.population = self.rng.uniform(-1., 1., (npop, len(parrange)))
+        # fitness and weighted fitness of the members; None until evaluated
+        self.popfit = None
+        self.popscore = None
+
+    @property
+    def renormalized(self):
+        """True (physical) coordinates of the population"""
+        return self.population / self.norm + self.shift
+
+    def get_output(self):
+        return self.renormalized
+
+    def _evolve(self, ngen, mapper=None):
+        """Evaluate trials and select the population for ngen generations."""
+        for g in range(self.gen0, ngen):
+            if self.popscore is None:
+                trials = self.population.copy()
+            else:
+                ibest = int(np.argmax(self.popscore))
+                trials = get_trials(self.population, ibest, self.F, self.CR,
+                                    self.rng, self.strategy)
+            iterations = [(g, i) for i in range(self.npop)]
+            positions = trials / self.norm + self.shift
+            fitness = np.array(batch_evaluate(self.evaluate, list(positions),
+                                              iterations, self.nworkers,
+                                              self.pool, mapper), dtype=float)
+            fitness = fitness.reshape(self.npop, -1)
+            score = self.get_score(fitness)
+            # selection: a trial replaces its target unless it is worse
+            if self.popscore is None:
+                self.popfit, self.popscore = fitness, score
+            else:
+                improved = score >= self.popscore
+                self.population[improved] = trials[improved]
+                self.popfit[improved] = fitness[improved]
+                self.popscore[improved] = score[improved]
+            self.update_best(fitness, score, positions, iterations)
+            self.stats_record.append(get_stats(fitness))
+            if self.end_generation(g, ngen, trials):
+                break
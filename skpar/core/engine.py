@@ -0,0 +1,322 @@
+"""Bookkeeping shared by the optimisation engines.
+
+The engines other than PSO hold their points in NumPy arrays, with the
+parameters normalised to [-1, +1] within their ranges, and evaluate the
+points of a generation as one batch. This module provides what they
+have in common:
+
+    * `get_ranges()` -- names, ranges and initial values of parameters;
+    * `merge_halloffame()` -- the best distinct points evaluated so far;
+    * `report_stats()` -- the log of the fitness statistics;
+    * `run_batches()` -- the dispatch of batches to an Evaluator, or to a
+      pool of workers mapping a plain function;
+    * `BatchEngine` -- the base class of the engines, which keeps the
+      global best, the hall of fame, statistics, stopping criteria and
+      checkpoints.
+"""
+import functools
+import itertools
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+import numpy as np
+from skpar.core.utils import get_logger
+from skpar.core.stopping import get_stopping
+from skpar.core.checkpoint import save_checkpoint, load_checkpoint
+from skpar.core.checkpoint import DEFAULT_CHECKPOINT_FILE
+
+module_logger = get_logger('skpar.engine')
+
+
+def get_ranges(parameters, engine):
+    """Return names (or None), ranges and initial values of parameters.
+
+    `parameters` is a list of objects with attributes name, value, minv
+    and maxv, or a list of tuples (min_value, max_value), for which the
+    initial values are None.
+    """
+    try:
+        parnames = [p.name for p in parameters]
+    except AttributeError:
+        parnames = None
+    try:
+        parrange = [(p.minv, p.maxv) for p in parameters]
+        initial = [p.value for p in parameters]
+    except AttributeError:
+        assert isinstance(parameters, list) and len(parameters[0]) == 2,\
+            ("NOTABENE: `parameters` argument {}.__init__() should be a list,\n"
+            "every element of which is either a tuple (min_value, max_value)\n"
+            "or a class with attributes minv and maxv!".format(engine))
+        parrange = parameters
+        initial = [None] * len(parrange)
+    return parnames, np.asarray(parrange, dtype=float), initial
+
+def get_normalisation(parrange):
+    """Return norm and shift mapping the ranges onto [-1, 1].
+
+    A point P in normalised coordinates has the physical values
+    P/norm + shift, as the particles of PSO.
+    """
+    norm = 2. / (parrange[:, 1] - parrange[:, 0])
+    shift = 0.5 * (parrange[:, 1] + parrange[:, 0])
+    return norm, shift
+
+def normalise_initial(initial, parrange, norm, shift):
+    """Return normalised initial values; those missing or out of range are 0"""
+    return np.array([(val - sh) * nn
+                     if val is not None and lo <= val <= hi else 0.
+                     for val, (lo, hi), sh, nn in
+                     zip(initial, parrange, shift, norm)])
+
+def merge_halloffame(halloffame, fitness, score, positions, iterations,
+                     weights, nkept=10):
+    """Return the `nkept` best distinct points of a generation and halloffame.
+
+    Args:
+        halloffame(list): (fitness, parameters, iteration), the best first
+        fitness(array): fitness of the points, shape (npoints, nobjectives)
+        score(array): weighted fitness of the points, the higher the better
+        positions(array): parameter values of the points
+        iterations(list): iteration tag of each point
+        weights(array): objective weights yielding the score from fitness
+    """
+    # only the best of the generation may enter the hall of fame
+    candidates = np.argsort(-score, kind='stable')[:nkept]
+    entries = [(score[i], tuple(fitness[i]), list(positions[i]),
+                iterations[i]) for i in candidates]
+    entries += [(np.dot(ff, weights[:len(ff)]), ff, pp, it)
+                for ff, pp, it in halloffame]
+    entries.sort(key=lambda item: -item[0])
+    merged = []
+    for _, ff, pp, it in entries:
+        if any(np.array_equal(pp, item[1]) for item in merged):
+            continue
+        merged.append((ff, pp, it))
+        if len(merged) == nkept:
+            break
+    return merged
+
+def get_stats(fitness):
+    """Return the statistics of fitness values, as compiled by DEAP"""
+    return {'Fitness': {'Avg': np.mean(fitness), 'Std': np.std(fitness),
+                        'Min': np.min(fitness), 'Max': np.max(fitness)}}
+
+def report_stats(stats):
+    """Log the fitness statistics of each generation"""
+    logger = module_logger
+    statsHeader = "".join([
+    '{0:>5s}'.format('Gen.'),
+    '{0:>10s}'.format('Min.'),
+    '{0:>10s}'.format('Max.'),
+    '{0:>10s}'.format('Avg.'),
+    '{0:>10s}'.format('Std.'),
+    ])
+    logger.info('')
+    logger.info("Fitness statistics follow:")
+    logger.info(statsHeader)
+    logger.info('============================================================')
+    ngen = len(stats)
+    for gen in range(ngen):
+        s = stats[gen]
+        logger.info("".join([
+        '{0:>5d}'.format(gen),
+        '{0:>10.4f}'.format(s['Fitness']['Min']),
+        '{0:>10.4f}'.format(s['Fitness']['Max']),
+        '{0:>10.4f}'.format(s['Fitness']['Avg']),
+        '{0:>10.4f}'.format(s['Fitness']['Std']),
+            ]))
+    logger.info('============================================================')
+
+def report_parameters(logger, label, values, parnames=None):
+    """Log parameter values, one per line with their names, if known"""
+    if parnames:
+        logger.info("{}:\n".format(label)+
+            "\n".join(["{:>20s}  {}".format(name, val)
+            for (name, val) in zip(parnames, values)]))
+    else:
+        logger.info("{:<18s}: {}".format(label, values))
+
+def run_batches(run, evaluate, nworkers=1, pool='process',
+                batch='evaluate_batch'):
+    """Return run(mapper), with the mapper for evaluations of batches.
+
+    An evaluator with the method `batch` (e.g. an Evaluator) schedules
+    the evaluations of a batch itself, and is closed after the run; the
+    mapper is then None. A plain function is mapped by the starmap of
+    `nworkers` processes (or threads, if `pool` is 'thread'), or
+    point after point. Note that it must then be picklable to be sent to
+    worker processes, and thread-safe to be called from worker threads.
+    """
+    if hasattr(evaluate, batch):
+        try:
+            return run(None)
+        finally:
+            evaluate.close()
+    if nworkers > 1:
+        workers = ThreadPool if pool == 'thread' else Pool
+        with workers(nworkers) as workerpool:
+            return run(workerpool.starmap)
+    return run(itertools.starmap)
+
+
+class BatchEngine(object):
+    """Base class of the engines evaluating a batch of points per generation.
+
+    A derived class realises `_evolve(ngen, mapper)`, which evaluates and
+    evolves its points for generations `gen0` to ngen, calling
+    `update_best()` with the outcome of each batch and `end_generation()`
+    after each generation. `statekeys` names the attributes written to a
+    checkpoint, besides the generation, the state of the random number
+    generator and of the stopping criteria.
+    """
+    nBestKept = 10
+    name = 'engine'
+    statekeys = ['gbest', 'gbestfit', 'gbestscore', 'gbest_iteration',
+                 'halloffame', 'stats_record']
+
+    def __init__(self, evaluate, objective_weights=(-1,), ngen=100,
+                 ErrTol=None, **kwargs):
+        self.logger = module_logger
+        self.evaluate = evaluate
+        self.weights = np.asarray(objective_weights, dtype=float)
+        self.ngen = ngen
+        self.ErrTol = ErrTol
+        # number of workers evaluating the points of a batch; workers
+        # are processes by default, but may be threads too
+        self.nworkers = kwargs.get('nworkers', 1)
+        self.pool = kwargs.get('pool', 'process').lower()
+        # write the complete state of the optimiser every `checkpoint`
+        # generations (never if 0), so that a run may be resumed
+        self.checkpoint = kwargs.get('checkpoint', 0)
+        self.checkpointfile = kwargs.get('checkpointfile',
+                                         DEFAULT_CHECKPOINT_FILE)
+        self.rng = np.random.default_rng(kwargs.get('seed', None))
+        # stop before ngen generations if the cost falls below ErrTol, or
+        # by the criteria of skpar.core.stopping given in kwargs
+        self.stopping = get_stopping(ErrTol, **kwargs)
+        self.gbest = None
+        self.gbestfit = None
+        self.gbestscore = -np.inf
+        self.gbest_iteration = None
+        # list of (fitness, parameters, iteration), the best first
+        self.halloffame = []
+        self.gen0 = 0
+        self.stats_record = []
+
+    def optimise(self, ngen=None, ErrTol=None, resume=False):
+        """
+        Let the optimiser evolve for ngen (or self.ngen) generations.
+
+        If `resume` is True, the state of the optimiser is restored from
+        the checkpoint file and evolution continues from the generation
+        following the last completed one.
+        """
+        if ngen is None:
+            ngen = self.ngen
+        if ErrTol is None:
+            ErrTol = self.ErrTol
+        self.stopping.errtol = ErrTol
+        if resume:
+            self.restore()
+        else:
+            self.gen0 = 0
+            self.stats_record = []
+            self.stopping.reset()
+        run_batches(functools.partial(self._evolve, ngen), self.evaluate,
+                    self.nworkers, self.pool)
+        return self.get_output(), self.stats_record
+
+    def _evolve(self, ngen, mapper=None):
+        """Evaluate and evolve the points for ngen generations."""
+        raise NotImplementedError
+
+    def get_output(self):
+        """Return the outcome of `optimise()`, besides the statistics"""
+        return self.gbest
+
+    def get_score(self, fitness):
+        """Return the weighted fitness of points, the higher the better"""
+        return fitness.dot(self.weights[:fitness.shape[1]])
+
+    def update_best(self, fitness, score, positions, iterations):
+        """Update the global best and the hall of fame with a batch"""
+        ibest = int(np.argmax(score))
+        if score[ibest] > self.gbestscore:
+            self.gbestscore = score[ibest]
+            self.gbest = np.array(positions[ibest], dtype=float)
+            self.gbestfit = tuple(fitness[ibest])
+            self.gbest_iteration = iterations[ibest]
+        self.update_halloffame(fitness, score, positions, iterations)
+
+    def update_halloffame(self, fitness, score, positions, iterations):
+        """Keep the `nBestKept` best distinct points evaluated so far"""
+        self.halloffame = merge_halloffame(self.halloffame, fitness, score,
+                                           positions, iterations,
+                                           self.weights, self.nBestKept)
+
+    def get_best_parameters(self):
+        """Return the parameter values of the global best"""
+        return self.gbest
+
+    def get_cost(self):
+        """Return the cost of the global best, to which ErrTol applies"""
+        # the tolerance applies to the cost of a minimisation
+        return self.gbestfit[0] if self.weights[0] < 0 else None
+
+    def end_generation(self, g, ngen, points):
+        """Record the end of generation g; return True if the run stops.
+
+        Args:
+            g(int): the generation completed
+            ngen(int): the last generation of the run
+            points(array): normalised points evaluated in the generation
+        """
+        self.gen0 = g + 1
+        stop = self.stopping.check(self.get_cost(), self.gbestscore, points,
+                                   len(points))
+        if self.checkpoint and (self.gen0 % self.checkpoint == 0 or
+                                self.gen0 == ngen or stop):
+            self.save()
+        return bool(stop)
+
+    def get_random_state(self):
+        """Return the state of the random number generator"""
+        return self.rng.bit_generator.state
+
+    def set_random_state(self, state):
+        """Set the state of the random number generator"""
+        self.rng.bit_generator.state = state
+
+    def save(self, filename=None):
+        """Write the complete state of the optimiser to a checkpoint file"""
+        if filename is None:
+            filename = self.checkpointfile
+        state = {'generation': self.gen0}
+        for key in self.statekeys:
+            state[key] = getattr(self, key)
+        state['stopping'] = self.stopping
+        state['random'] = self.get_random_state()
+        save_checkpoint(filename, state)
+
+    def restore(self, filename=None):
+        """Restore the state of the optimiser from a checkpoint file"""
+        if filename is None:
+            filename = self.checkpointfile
+        state = load_checkpoint(filename)
+        self.gen0 = state.pop('generation')
+        self.set_random_state(state.pop('random'))
+        self.stopping.reset(state.pop('stopping', None))
+        for key, val in state.items():
+            setattr(self, key, val)
+        self.logger.info('Resuming %s from generation %d', self.name,
+                         self.gen0)
+
+    def report(self):
+        report_stats(self.stats_record)
+        self.logger.info("GBest iteration   : {}".format(self.gbest_iteration))
+        self.logger.info("GBest fitness     : {}".format(self.gbestfit))
+        report_parameters(self.logger, "GBest parameters",
+                          self.get_best_parameters(), self.parnames)
+        self.logger.info(self.stopping)
+
+    def __call__(self, *args, **kwargs):
+        return self.optimise(*args, **kwargs)
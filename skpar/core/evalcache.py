@@ -0,0 +1,151 @@
+"""Persistent cache of evaluations, keyed on the parameter vector.
+
+Every evaluation is stored in an sqlite database as a record of the
+parameter vector, the fitness of each objective and the global cost.
+A subsequent evaluation of the same point in parameter space (within a
+rounding tolerance) may then return the stored cost, without creating a
+working directory and executing any task.
+This is useful when the optimiser revisits nearly the same point, or when
+an optimisation is re-run after a crash.
+
+Records are keyed on a signature of the task list and the objectives too,
+so that a modified input does not retrieve records of the old input.
+The size of the cache is limited, and the least recently used records
+are evicted first.
+"""
+import os
+import time
+import json
+import sqlite3
+import hashlib
+from contextlib import closing
+import numpy as np
+from skpar.core.utils import get_logger
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_CACHE_FILE = 'skpar_evalcache.sqlite'
+
+DEFAULT_CACHE_CONFIG = {
+    'file': None,
+    'tolerance': 1.e-8,
+    'maxsize': 100000,
+}
+
+def get_signature(tasklist, objectives, parnames=None):
+    """Return a hash of the task list, the objectives and parameter names.
+
+    Only attributes defining the objectives (queries, models, reference data
+    and weights, cost and error functions) enter the signature, while data
+    from preceding evaluations does not.
+    """
+    sha = hashlib.sha1()
+    sha.update(repr(tasklist).encode())
+    sha.update(repr(parnames).encode())
+    for objv in objectives:
+        for attr in ['objtype', 'query_key', 'model_names', 'weight']:
+            sha.update(repr(getattr(objv, attr, None)).encode())
+        for attr in ['costf', 'errf']:
+            sha.update(repr(getattr(getattr(objv, attr, None), '__name__',
+                                    None)).encode())
+        for attr in ['ref_data', 'subweights', 'model_weights']:
+            val = getattr(objv, attr, None)
+            if val is not None:
+                sha.update(np.ascontiguousarray(val).tobytes())
+    return sha.hexdigest()
+
+
+class EvaluationCache():
+    """Sqlite store of (parameters, objectives fitness, cost) records.
+
+    Note that no connection is kept open between calls, so that the object
+    can be pickled and used by concurrent evaluations in processes or
+    threads; sqlite takes care of locking of the database file.
+    """
+    def __init__(self, filename, signature, tolerance=1.e-8, maxsize=100000):
+        """Create the database file if necessary.
+
+        Args:
+            filename(str): path to the sqlite database file
+            signature(str): identifies the input the records relate to
+            tolerance(float): parameter values are rounded to a multiple
+                of tolerance to form the key of a record
+            maxsize(int): maximum number of records kept in the database
+        """
+        self.filename = os.path.abspath(os.path.expanduser(filename))
+        self.signature = signature
+        self.tolerance = tolerance
+        self.maxsize = maxsize
+        dirname = os.path.dirname(self.filename)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS evaluations ('
+                         'signature TEXT, key TEXT, parameters TEXT, '
+                         'fitness TEXT, cost REAL, atime REAL, '
+                         'PRIMARY KEY (signature, key))')
+
+    def _connect(self):
+        """Return a new connection to the database"""
+        return sqlite3.connect(self.filename, timeout=60)
+
+    def key(self, parametervalues):
+        """Return the key of a parameter vector, rounded to tolerance"""
+        rounded = np.rint(np.asarray(parametervalues, dtype=float) /
+                          self.tolerance).astype(np.int64)
+        return ' '.join([str(val) for val in rounded])
+
+    def get(self, parametervalues):
+        """Return (cost, objectives fitness) stored for the given parameters.
+
+        Return None if there is no matching record.
+        """
+        key = self.key(parametervalues)
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute('SELECT cost, fitness FROM evaluations '
+                               'WHERE signature=? AND key=?',
+                               (self.signature, key)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE evaluations SET atime=? '
+                         'WHERE signature=? AND key=?',
+                         (time.time(), self.signature, key))
+        cost, fitness = row
+        return cost, np.array(json.loads(fitness))
+
+    def put(self, parametervalues, fitness, cost):
+        """Store the result of an evaluation, evicting old records if needed"""
+        key = self.key(parametervalues)
+        record = (self.signature, key,
+                  json.dumps([float(val) for val in parametervalues]),
+                  json.dumps([float(val) for val in np.ravel(fitness)]),
+                  float(cost), time.time())
+        with closing(self._connect()) as conn, conn:
+            conn.execute('INSERT OR REPLACE INTO evaluations '
+                         'VALUES (?, ?, ?, ?, ?, ?)', record)
+            size, = conn.execute('SELECT COUNT(*) FROM evaluations').fetchone()
+            if size > self.maxsize:
+                # least recently used records go first, which naturally
+                # includes records of inputs that are no longer in use
+                conn.execute('DELETE FROM evaluations WHERE rowid IN '
+                             '(SELECT rowid FROM evaluations '
+                             'ORDER BY atime LIMIT ?)', (size - self.maxsize,))
+
+    def records(self):
+        """Return a list of (parameter values, cost) of all records"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT parameters, cost FROM evaluations '
+                                'WHERE signature=? ORDER BY rowid',
+                                (self.signature,)).fetchall()
+        return [(json.loads(parameters), cost) for parameters, cost in rows]
+
+    def __len__(self):
+        with closing(self._connect()) as conn:
+            size, = conn.execute('SELECT COUNT(*) FROM evaluations '
+                                 'WHERE signature=?',
+                                 (self.signature,)).fetchone()
+        return size
+
+    def __repr__(self):
+        return 'EvaluationCache: {} ({} records; tolerance {}; maxsize {})'.\
+            format(self.filename, len(self), self.tolerance, self.maxsize)
@@ -1,19 +1,36 @@
 """Evaluator engine of SKPAR."""
 import os
-import shutil
+import threading
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
 import numpy as np
 from skpar.core.utils import get_logger, normalise
-from skpar.core.tasks import initialise_tasks
+from skpar.core.tasks import initialise_tasks, execute_tasks
 from skpar.core.database import Database
+from skpar.core.evalcache import EvaluationCache, get_signature
+from skpar.core.workdir import get_workdir, create_workdir, destroy_workdir
+from skpar.core.workdir import WorkdirPool
+from skpar.core.taskstore import TaskStore, DEFAULT_TASK_STORE
 
 LOGGER = get_logger(__name__)
 
+# Objectives keep the data of their last evaluation as attributes, so
+# concurrent evaluations in threads must not evaluate them simultaneously
+OBJECTIVES_LOCK = threading.Lock()
+
 DEFAULT_GLOBAL_COST_FUNC = "rms"
 
 DEFAULT_CONFIG = {
     'workroot': None,
     'templatedir': None,
     'keepworkdirs': True,
+    'materialise': 'copy',
+    'writable': None,
+    'workdirpool': 0,
+    'taskworkers': 1,
+    'taskstore': None,
+    'cache': None,
 }
 
 
@@ -49,12 +66,12 @@ def relerr(ref, model):
     rel_err[err != 0] = err[err != 0] / denom[err != 0]
     return rel_err
 
-def cost_rms(ref, model, weights, errf=abserr):
-    """Return the weighted-RMS deviation"""
+def cost_rms(ref, model, weights, errf=abserr, axis=None):
+    """Return the weighted-RMS deviation, or its array along `axis`"""
     assert np.asarray(ref).shape == np.asarray(model).shape
     assert np.asarray(ref).shape == np.asarray(weights).shape
     err2 = errf(ref, model) ** 2
-    rms = np.sqrt(np.sum(weights*err2))
+    rms = np.sqrt(np.sum(weights*err2, axis=axis))
     return rms
 
 def eval_objectives(objectives, database):
@@ -62,6 +79,80 @@ def eval_objectives(objectives, database):
     fitness = np.array([objv(database) for objv in objectives])
     return fitness
 
+def eval_residuals(objectives, weights):
+    """Return the weighted residuals of evaluated objectives, as a 1D array.
+
+    With the RMS cost of objectives and the global RMS cost (with
+    vanishing utopia point), the global cost is the norm of this vector.
+    """
+    return np.concatenate([np.sqrt(weight) * objv.residuals()
+                           for objv, weight in zip(objectives, weights)])
+
+def eval_objectives_stacked(objectives, database, npoints):
+    """Evaluate fitness of objectives at npoints, from stacked model data.
+
+    Return:
+        fitness (array): shape (npoints, nobjectives)
+    """
+    return np.column_stack([objv.evaluate_stacked(database, npoints)
+                            for objv in objectives])
+
+def eval_residuals_stacked(objectives, weights):
+    """Return the weighted residuals of stacked evaluations of objectives.
+
+    Return:
+        residuals (array): shape (npoints, nresiduals)
+    """
+    return np.hstack([np.sqrt(weight) * objv.residuals_stacked()
+                      for objv, weight in zip(objectives, weights)])
+
+# The evaluator installed in each worker process of a batch evaluation;
+# installed once per process, rather than pickled with each point
+_WORKER_EVALUATOR = None
+
+def _init_worker(evaluator):
+    """Install the evaluator in a worker process"""
+    global _WORKER_EVALUATOR
+    _WORKER_EVALUATOR = evaluator
+
+def _evaluate_in_worker(parametervalues, iteration, residuals=False):
+    """Evaluate a point by the evaluator installed in the worker process"""
+    return _WORKER_EVALUATOR._evaluate(parametervalues, iteration, residuals)
+
+def batch_evaluate(evaluate, points, iterations, nworkers=1, pool='process',
+                   mapper=None):
+    """Return the costs of a batch of points, as a list of 1D arrays.
+
+    If `evaluate` supports batches (e.g. it is an Evaluator), the batch is
+    passed to its `evaluate_batch()`, which schedules the evaluations.
+    Otherwise `evaluate` is mapped over the points, by `mapper`
+    (e.g. the starmap of a pool of workers), or one after another.
+    """
+    if hasattr(evaluate, 'evaluate_batch'):
+        costs, _ = evaluate.evaluate_batch(points, iterations, nworkers, pool)
+        return [np.atleast_1d(cost) for cost in costs]
+    if mapper is None:
+        return [evaluate(point, iteration)
+                for point, iteration in zip(points, iterations)]
+    return list(mapper(evaluate, zip(points, iterations)))
+
+def get_executor(evaluate, nworkers=1, pool='process'):
+    """Return an executor for asynchronous evaluations by `evaluate`.
+
+    See `submit_evaluation()` for submitting evaluations to the executor.
+    """
+    if hasattr(evaluate, 'get_executor'):
+        return evaluate.get_executor(nworkers, pool)
+    if pool == 'thread':
+        return ThreadPoolExecutor(nworkers)
+    return ProcessPoolExecutor(nworkers)
+
+def submit_evaluation(evaluate, executor, parametervalues, iteration):
+    """Submit an evaluation to `executor`, returning a future of the cost"""
+    if hasattr(evaluate, 'submit'):
+        return evaluate.submit(executor, parametervalues, iteration)
+    return executor.submit(evaluate, parametervalues, iteration)
+
 # ----------------------------------------------------------------------
 # Function mappers
 # ----------------------------------------------------------------------
@@ -119,8 +210,49 @@ class Evaluator():
         # report objectives; these do not change over time
         for item in objectives:
             self._msg(item)
-
-    def evaluate(self, parametervalues, iteration=None):
+        # tasks are set up once, and only called at each evaluation
+        self.tasks = initialise_tasks(tasklist, taskdict, report=False)
+        # a batch of points is evaluated by a single execution of the
+        # tasks if all of them, and all objectives, handle stacked data
+        self.vectorised = bool(self.tasks) and\
+            all(task.vectorised for task in self.tasks) and\
+            all(getattr(objv, 'vectorised', False) for objv in objectives)
+        if self.vectorised:
+            self.logger.info('All tasks and objectives are vectorised: '
+                             'batches of points are evaluated at once.')
+        # persistent cache of evaluations, if requested
+        cacheconfig = self.config.get('cache', None)
+        if cacheconfig:
+            signature = get_signature(tasklist, objectives, parameternames)
+            self.cache = EvaluationCache(cacheconfig['file'], signature,
+                                         cacheconfig['tolerance'],
+                                         cacheconfig['maxsize'])
+            self.logger.info(self.cache)
+        else:
+            self.cache = None
+        # recyclable work directories, if these are not kept anyway
+        poolsize = self.config.get('workdirpool', 0)
+        if poolsize and self.config['workroot'] is not None:
+            if self.config['keepworkdirs']:
+                self.logger.warning('Ignoring workdirpool, since '
+                                    'keepworkdirs is true.')
+                self.workdirpool = None
+            else:
+                self.workdirpool = WorkdirPool(
+                    self.config['workroot'], self.config['templatedir'],
+                    poolsize, self.config.get('materialise', 'copy'),
+                    self.config.get('writable', None))
+                self._msg(self.workdirpool)
+        else:
+            self.workdirpool = None
+        # store of outputs of memoised tasks; created upon first use
+        taskstore = self.config.get('taskstore', None)
+        if taskstore is None:
+            taskstore = os.path.join(self.config['workroot'] or os.getcwd(),
+                                     DEFAULT_TASK_STORE)
+        self.taskstore = TaskStore(taskstore)
+
+    def evaluate(self, parametervalues, iteration=None, usecache=True):
         """Evaluate the global fitness of a given point in parameter space.
 
         This is the only object accessible to the optimiser, therefore only
@@ -130,19 +262,224 @@ class Evaluator():
             parametervalues (list): current point in design/parameter space
             iteration: (int or tupple): current iteration or current
                 generation and individual index within generation
+            usecache (bool): if False, the point is evaluated even if the
+                cache holds it, e.g. to produce its model
 
         Return:
             fitness (float): global fitness of the current design point
         """
+        # Look up previous evaluations at the same point
+        if usecache and self.cache is not None and parametervalues is not None:
+            cached = self.cache.get(parametervalues)
+            if cached is not None:
+                cost, _ = cached
+                self.logger.info('Iteration %s: cached cost %s', iteration,
+                                 cost)
+                return np.atleast_1d(cost)
+        cost, objvfitness = self._evaluate(parametervalues, iteration)
+        if self.cache is not None and parametervalues is not None:
+            self.cache.put(parametervalues, objvfitness, cost)
+        return np.atleast_1d(cost)
+
+    def evaluate_batch(self, points, iterations=None, nworkers=1,
+                       pool='process'):
+        """Evaluate a batch of points in parameter space.
+
+        Points found in the cache (if enabled) are not evaluated, and nor
+        are repeated points within the batch. The rest are evaluated by
+        `nworkers` processes (or threads, if `pool` is 'thread'), which
+        are kept for subsequent batches, until `close()`.
+        If the evaluator is vectorised, they are evaluated at once by
+        a single execution of the tasks, in the calling process.
+        The cache is consulted and updated by the calling process only.
+
+        Args:
+            points (list): points in parameter space
+            iterations (list): iteration of each point; default is the
+                index of the point in the batch
+            nworkers (int): number of concurrent evaluations
+            pool (str): 'process' or 'thread'
+
+        Return:
+            costs (array): global fitness of each point, shape (npoints,)
+            fitness (array): fitness of each objective, at each point,
+                shape (npoints, nobjectives)
+        """
+        if iterations is None:
+            iterations = list(range(len(points)))
+        costs = np.empty(len(points))
+        fitness = np.empty((len(points), len(self.objectives)))
+        # find what must be evaluated; repeated points go with their first
+        pending = {}
+        firsts = {}
+        for i, (point, iteration) in enumerate(zip(points, iterations)):
+            if self.cache is None or point is None:
+                pending[i] = [i]
+                continue
+            key = self.cache.key(point)
+            if key in firsts:
+                pending[firsts[key]].append(i)
+                continue
+            cached = self.cache.get(point)
+            if cached is not None:
+                costs[i], fitness[i] = cached
+                self.logger.info('Iteration %s: cached cost %s', iteration,
+                                 costs[i])
+                continue
+            firsts[key] = i
+            pending[i] = [i]
+        todo = list(pending)
+        args = [(points[i], iterations[i]) for i in todo]
+        if self.vectorised and todo:
+            results = self._evaluate_stacked([arg[0] for arg in args],
+                                             [arg[1] for arg in args])
+        elif nworkers > 1 and len(todo) > 1:
+            if pool == 'thread':
+                results = self._get_workers(nworkers, pool).\
+                    starmap(self._evaluate, args)
+            else:
+                results = self._get_workers(nworkers, pool).\
+                    starmap(_evaluate_in_worker, args)
+        else:
+            results = [self._evaluate(*arg) for arg in args]
+        for i, (cost, objvfitness) in zip(todo, results):
+            for j in pending[i]:
+                costs[j], fitness[j] = cost, objvfitness
+            if self.cache is not None and points[i] is not None:
+                self.cache.put(points[i], objvfitness, cost)
+        return costs, fitness
+
+    def evaluate_residuals(self, points, iterations=None, nworkers=1,
+                           pool='process'):
+        """Evaluate the weighted residual vectors of a batch of points.
+
+        The residuals are not cached, so every point is evaluated; the
+        cost is stored in the cache (if enabled), as by `evaluate_batch()`.
+        See `eval_residuals()` for the relation to the global cost.
+
+        Return:
+            costs (array): global fitness of each point, shape (npoints,)
+            residuals (array): weighted residuals of each point,
+                shape (npoints, nresiduals)
+        """
+        if iterations is None:
+            iterations = list(range(len(points)))
+        args = [(point, iteration, True)
+                for point, iteration in zip(points, iterations)]
+        if self.vectorised and args:
+            results = self._evaluate_stacked(points, iterations, True)
+        elif nworkers > 1 and len(args) > 1:
+            if pool == 'thread':
+                results = self._get_workers(nworkers, pool).\
+                    starmap(self._evaluate, args)
+            else:
+                results = self._get_workers(nworkers, pool).\
+                    starmap(_evaluate_in_worker, args)
+        else:
+            results = [self._evaluate(*arg) for arg in args]
+        if self.cache is not None:
+            for point, (cost, objvfitness, _) in zip(points, results):
+                if point is not None:
+                    self.cache.put(point, objvfitness, cost)
+        return (np.array([cost for cost, _, _ in results]),
+                np.array([resid for _, _, resid in results]))
+
+    def _get_workers(self, nworkers, pool='process'):
+        """Return a pool of workers, creating a new one if necessary"""
+        workers = getattr(self, '_workers', None)
+        if workers is not None and self._workerspec == (nworkers, pool):
+            return workers
+        self.close()
+        if pool == 'thread':
+            self._workers = ThreadPool(nworkers)
+        else:
+            # the evaluator is sent once to each worker process, so it must
+            # be picklable (without its own pool of workers)
+            self._workers = Pool(nworkers, initializer=_init_worker,
+                                 initargs=(self,))
+        self._workerspec = (nworkers, pool)
+        return self._workers
+
+    def get_executor(self, nworkers=1, pool='process'):
+        """Return an executor for asynchronous evaluations via `submit()`.
 
-        # Create individual working directory for each evaluation
-        origdir = os.getcwd()
+        Worker processes receive the evaluator once, upon their start.
+        """
+        if pool == 'thread':
+            return ThreadPoolExecutor(nworkers)
+        return ProcessPoolExecutor(nworkers, initializer=_init_worker,
+                                   initargs=(self,))
+
+    def submit(self, executor, parametervalues, iteration=None):
+        """Submit an evaluation to an executor from `get_executor()`.
+
+        Return a future of the cost, as returned by `evaluate()`. The cache
+        is consulted before submission, and updated upon completion, by
+        the calling process.
+        """
+        future = Future()
+        if self.cache is not None and parametervalues is not None:
+            cached = self.cache.get(parametervalues)
+            if cached is not None:
+                self.logger.info('Iteration %s: cached cost %s', iteration,
+                                 cached[0])
+                future.set_result(np.atleast_1d(cached[0]))
+                return future
+        if isinstance(executor, ProcessPoolExecutor):
+            inner = executor.submit(_evaluate_in_worker, parametervalues,
+                                    iteration)
+        else:
+            inner = executor.submit(self._evaluate, parametervalues, iteration)
+        def complete(inner):
+            """Pass the result of the evaluation on to the future"""
+            try:
+                cost, objvfitness = inner.result()
+            except BaseException as exc:
+                future.set_exception(exc)
+                return
+            if self.cache is not None and parametervalues is not None:
+                self.cache.put(parametervalues, objvfitness, cost)
+            future.set_result(np.atleast_1d(cost))
+        inner.add_done_callback(complete)
+        return future
+
+    def close(self):
+        """Terminate the workers of batch evaluations, if any"""
+        workers = getattr(self, '_workers', None)
+        if workers is not None:
+            workers.close()
+            workers.join()
+        self._workers = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_workers'] = None
+        return state
+
+    def _evaluate(self, parametervalues, iteration=None, residuals=False):
+        """Execute the tasks and evaluate the objectives at a given point.
+
+        Return:
+            cost (float): global fitness of the point
+            objvfitness (array): fitness of the individual objectives
+            residuals (array): weighted residuals, only if `residuals`
+        """
+        if self.vectorised:
+            return self._evaluate_stacked([parametervalues], [iteration],
+                                          residuals)[0]
+        # Create individual working directory for each evaluation.
+        # Note that the current directory of the process is never changed,
+        # and tasks resolve their paths with respect to env['workroot'].
         workroot = self.config['workroot']
         if workroot is None:
-            workdir = origdir
+            workdir = os.getcwd()
+        elif self.workdirpool is not None:
+            workdir = self.workdirpool.acquire()
         else:
             workdir = get_workdir(iteration, workroot)
-            create_workdir(workdir, self.config['templatedir'])
+            create_workdir(workdir, self.config['templatedir'],
+                           self.config.get('materialise', 'copy'),
+                           self.config.get('writable', None))
 
         # Initialise model database
         self.logger.info('Initialising ModelDataBase.')
@@ -161,39 +498,90 @@ class Evaluator():
                'parametervalues': parametervalues,
                'iteration': iteration,
                'taskdict': self.taskdict,
-               'objectives': self.objectives
+               'objectives': self.objectives,
+               'taskstore': self.taskstore,
               }
-        # Initialise and then execute the tasks
-        tasks = initialise_tasks(self.tasklist, self.taskdict, report=False)
+        # Execute the tasks
         self.logger.info('Iteration %s', iteration)
         self.logger.info('===========================')
         if self.parnames:
             parstr = ['{:s}({:.4g})'.format(name, val) for
                       name, val in zip(self.parnames, parametervalues)]
             self.logger.info('Parameters: {:s}'.format(' '.join(parstr)))
-#        do we really need to pass workdir and to os.chdir???
-#        move the for loop to a function.
-#        execute_tasks(tasks, env, database, workdir, logger)
-        for i, task in enumerate(tasks):
-            os.chdir(workdir)
-            try:
-                task(env, database)
-            except:
-                self.logger.critical('Task %i FAILED:\n%s', i, task)
-                raise
+        try:
+            execute_tasks(self.tasks, env, database,
+                          self.config.get('taskworkers', 1), self.logger)
+        finally:
+            # A pool directory is reset upon its next acquisition, so
+            # the outputs of the last evaluation remain for inspection
+            if self.workdirpool is not None and workroot is not None:
+                self.workdirpool.release(workdir)
 
         # Evaluate individual fitness for each objective
-        objvfitness = eval_objectives(self.objectives, database)
+        with OBJECTIVES_LOCK:
+            objvfitness = eval_objectives(self.objectives, database)
+            if residuals:
+                objvresiduals = eval_residuals(self.objectives, self.weights)
         # Evaluate global fitness
         cost = self.costf(self.utopia, objvfitness, self.weights)
         self._msg('{:<15s}: {}\n'.format('Overall cost', cost))
 
         # Remove iteration-specific working dir if not needed:
-        if (not self.config['keepworkdirs']) and (workroot is not None):
+        if (not self.config['keepworkdirs']) and (workroot is not None) and\
+                self.workdirpool is None:
             destroy_workdir(workdir)
-        os.chdir(origdir)
 
-        return np.atleast_1d(cost)
+        if residuals:
+            return cost, objvfitness, objvresiduals
+        return cost, objvfitness
+
+    def _evaluate_stacked(self, points, iterations, residuals=False):
+        """Execute vectorised tasks once for all points, and evaluate them.
+
+        The tasks find the points as rows of env['parametervalues'], an
+        array of shape (npoints, nparameters), and the iterations as a
+        list in env['iteration']; they must put in the model database
+        the data of all points, stacked along the first axis.
+        No iteration-specific working directory is created: the tasks
+        run in the workroot (or the current directory if it is None).
+
+        Return:
+            list of (cost, objvfitness) tuples, or of (cost, objvfitness,
+            residuals) if `residuals`, one per point, as from `_evaluate()`
+        """
+        workdir = self.config['workroot']
+        if workdir is None:
+            workdir = os.getcwd()
+        else:
+            os.makedirs(workdir, exist_ok=True)
+        database = Database()
+        parametervalues = np.array(points, dtype=float).reshape(len(points),
+                                                                -1)
+        env = {'workroot': workdir,
+               'logger': self.logger,
+               'parameternames': self.parnames,
+               'parametervalues': parametervalues,
+               'iteration': list(iterations),
+               'taskdict': self.taskdict,
+               'objectives': self.objectives,
+               'taskstore': self.taskstore,
+              }
+        self.logger.info('Iterations %s to %s: vectorised evaluation of '
+                         '%d points', iterations[0], iterations[-1],
+                         len(points))
+        execute_tasks(self.tasks, env, database,
+                      self.config.get('taskworkers', 1), self.logger)
+        with OBJECTIVES_LOCK:
+            objvfitness = eval_objectives_stacked(self.objectives, database,
+                                                  len(points))
+            if residuals:
+                objvresiduals = eval_residuals_stacked(self.objectives,
+                                                       self.weights)
+        costs = [self.costf(self.utopia, fitness, self.weights)
+                 for fitness in objvfitness]
+        if residuals:
+            return list(zip(costs, objvfitness, objvresiduals))
+        return list(zip(costs, objvfitness))
 
     def __call__(self, parametervalues, iteration=None):
         return self.evaluate(parametervalues, iteration)
@@ -203,8 +591,8 @@ class Evaluator():
         srepr.append('Evaluator:')
         srepr.append('\n-- Tasks:')
         srepr.append('--------------------')
-#        for item in self.tasks:
-#            srepr.append(item.__repr__())
+        for item in self.tasks:
+            srepr.append(item.__repr__())
         srepr.append('\n-- Objectives:')
         srepr.append('--------------------')
         for item in self.objectives:
@@ -213,37 +601,3 @@ class Evaluator():
         srepr.append('--------------------')
         srepr.append(self.costf.__name__)
         return '\n'.join(srepr)
-
-
-def get_workdir(iteration, workroot):
-    """Find what is the root of the work-tree at a given iteration"""
-    if workroot is None:
-        workdir = None
-    else:
-        if iteration is None:
-            myworkdir = 'noiter'
-        else:
-            try:
-                myworkdir = '-'.join([str(it) for it in iteration])
-            except TypeError:
-                myworkdir = str(iteration)
-        workdir = os.path.abspath(os.path.join(workroot, myworkdir))
-    return workdir
-
-
-def create_workdir(workdir, templatedir):
-    """Create a new and clean work directory tree from template"""
-    if workdir is None:
-        return
-    if os.path.exists(workdir):
-        shutil.rmtree(workdir)
-    if templatedir is not None:
-        shutil.copytree(templatedir, workdir, symlinks=True)
-    else:
-        os.mkdir(workdir)
-
-
-def destroy_workdir(workdir):
-    """Remove the entire work directory tree"""
-    if workdir is not None:
-        shutil.rmtree(workdir)
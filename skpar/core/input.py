@@ -2,6 +2,7 @@
 Routines to handle the input file of skpar
 """
 import os
+import sys
 import json
 import yaml
 import skpar.core.taskdict as coretd
@@ -11,6 +12,8 @@ from skpar.core.tasks      import get_tasklist, check_taskdict
 from skpar.core.tasks      import initialise_tasks
 from skpar.core.optimise   import get_optargs
 from skpar.core.usertasks  import update_taskdict
+from skpar.core.evalcache  import DEFAULT_CACHE_FILE, DEFAULT_CACHE_CONFIG
+from skpar.core.workdir    import MATERIALISE_MODES
 
 LOGGER = get_logger(__name__)
 
@@ -87,9 +90,55 @@ def get_config(userinp, report=True):
         templatedir = os.path.abspath(os.path.expanduser(templatedir))
     config['templatedir'] = templatedir
     config['keepworkdirs'] = userinp.get('keepworkdirs', False)
+    # how the template is replicated in individual work directories
+    materialise = userinp.get('materialise', 'copy').lower()
+    if materialise not in MATERIALISE_MODES:
+        LOGGER.critical('Unsupported materialise: %s; use one of %s',
+                        materialise, MATERIALISE_MODES)
+        sys.exit(2)
+    config['materialise'] = materialise
+    writable = userinp.get('writable', None)
+    if isinstance(writable, str):
+        writable = [writable]
+    config['writable'] = writable
+    # number of work directories recycled by evaluations; 0 means
+    # a new directory is created and destroyed by each evaluation
+    config['workdirpool'] = int(userinp.get('workdirpool', 0))
+    # number of tasks of an evaluation that may run concurrently
+    config['taskworkers'] = int(userinp.get('taskworkers', 1))
+    # directory storing outputs of memoised tasks; default is under workroot
+    taskstore = userinp.get('taskstore', None)
+    if taskstore is not None:
+        taskstore = os.path.abspath(os.path.join(workroot or '.',
+                                                 os.path.expanduser(taskstore)))
+    config['taskstore'] = taskstore
+    config['cache'] = get_cacheconfig(userinp.get('cache', None), workroot)
     # related to interpretation of input file
     if report:
         LOGGER.info('The following configuration was understood:')
         for key, val in config.items():
             LOGGER.info('%s: %s', key, val)
     return config
+
+def get_cacheconfig(userinp, workroot=None):
+    """Parse the 'cache' key of 'config' in user input.
+
+    The cache may be enabled by `cache: true` or by a dictionary with
+    optional `file`, `tolerance` and `maxsize` keys. The default file is
+    under workroot, and relative paths are taken with respect to it too.
+    """
+    if not userinp:
+        return None
+    cacheconfig = DEFAULT_CACHE_CONFIG.copy()
+    if isinstance(userinp, dict):
+        cacheconfig.update(userinp)
+    if workroot is None:
+        workroot = '.'
+    filename = cacheconfig['file']
+    if filename is None:
+        filename = DEFAULT_CACHE_FILE
+    filename = os.path.join(workroot, os.path.expanduser(filename))
+    cacheconfig['file'] = os.path.abspath(filename)
+    cacheconfig['tolerance'] = float(cacheconfig['tolerance'])
+    cacheconfig['maxsize'] = int(cacheconfig['maxsize'])
+    return cacheconfig
@@ -0,0 +1,164 @@
+"""
+Least-squares optimisation of the residual vector (LSQ)
+======================================================================
+
+The global cost is a weighted RMS of the deviations of model data from
+reference data, i.e. the norm of the vector of weighted residuals
+exposed by `Evaluator.evaluate_residuals()`. This engine minimises it by
+`scipy.optimize.least_squares`, a trust-region method using the
+Jacobian of the residuals, which converges in a few iterations from a
+good starting point, e.g. the result of a PSO run.
+
+The Jacobian is obtained by forward finite differences, all of whose
+columns -- one displaced point per parameter -- are evaluated as a
+single batch, concurrently if `nworkers` > 1. Displacements are taken
+backwards for points close to the upper bound of a parameter.
+
+The engine works in parameters normalised to [-1, 1] within their
+ranges (so `diff_step` and `xtol` apply alike to all parameters), and
+starts from the initial values of the parameters, or from the centre of
+their range. If `evaluate` is a plain function rather than an Evaluator,
+it must return the residual vector.
+Iterations are tagged by ('lsq', evaluation) and, for the Jacobian, by
+('jac', jacobian evaluation, parameter).
+"""
+import functools
+import numpy as np
+from scipy.optimize import least_squares
+from skpar.core.utils import get_logger
+from skpar.core.engine import BatchEngine, get_ranges, run_batches
+from skpar.core.engine import report_stats, report_parameters
+from skpar.core.engine import get_normalisation, normalise_initial
+from skpar.core.checkpoint import save_checkpoint, load_checkpoint
+
+module_logger = get_logger('skpar.lsq')
+
+LSQ_METHODS = ['trf', 'dogbox']
+
+
+class LSQ(BatchEngine):
+    """
+    Class defining a least-squares optimiser with a batch Jacobian.
+    """
+    name = 'LSQ'
+    statekeys = BatchEngine.statekeys + ['nfev', 'njev']
+
+    def __init__(self, parameters, evaluate, objective_weights=(-1,),
+                 *args, **kwargs):
+        """
+        Set the starting point and the options of the solver
+        """
+        super().__init__(evaluate, objective_weights, **kwargs)
+        self.logger = module_logger
+        self.parnames, parrange, initial = get_ranges(parameters, self.name)
+        self.method = kwargs.get('method', 'trf').lower()
+        if self.method not in LSQ_METHODS:
+            self.logger.critical('Unsupported least-squares method %s; use '
+                                 'one of %s (bounds are always applied)',
+                                 self.method, LSQ_METHODS)
+            raise ValueError('Unsupported method {}'.format(self.method))
+        # the solver stops by its tolerances and maxeval, rather than by
+        # the criteria of skpar.core.stopping
+        self.maxeval = kwargs.get('maxeval', None)
+        self.diff_step = kwargs.get('diff_step', 1.e-3)
+        self.tolerances = {key: kwargs.get(key, 1.e-8)
+                           for key in ['ftol', 'xtol', 'gtol']}
+        self.norm, self.shift = get_normalisation(parrange)
+        self.x0 = normalise_initial(initial, parrange, self.norm, self.shift)
+        self.nfev = 0
+        self.njev = 0
+        self.result = None
+
+    def _evaluate(self, points, iterations, mapper):
+        """Return the costs and residual vectors at normalised points"""
+        positions = np.atleast_2d(points) / self.norm + self.shift
+        if hasattr(self.evaluate, 'evaluate_residuals'):
+            costs, residuals = self.evaluate.evaluate_residuals(
+                list(positions), iterations, self.nworkers, self.pool)
+        else:
+            residuals = np.array(list(mapper(self.evaluate,
+                                             zip(list(positions), iterations))),
+                                 dtype=float)
+            costs = np.sqrt(np.sum(residuals**2, axis=1))
+        fitness = np.reshape(costs, (-1, 1))
+        self.update_best(fitness, self.get_score(fitness), positions,
+                         iterations)
+        return costs, residuals
+
+    def optimise(self, resume=False, **kwargs):
+        """
+        Minimise the norm of the residuals by scipy's least_squares.
+
+        If `resume` is True, the search restarts from the best point
+        stored in the checkpoint file.
+        """
+        x0 = self.x0
+        if resume:
+            self.restore()
+            x0 = np.clip((self.gbest - self.shift) * self.norm, -1., 1.)
+        else:
+            self.stats_record = []
+            self.nfev = self.njev = 0
+        run_batches(functools.partial(self._optimise, x0), self.evaluate,
+                    self.nworkers, self.pool, 'evaluate_residuals')
+        return self.gbest, self.stats_record
+
+    def _optimise(self, x0, mapper=None):
+        """Run the solver, with residuals and Jacobian by batch evaluation"""
+        # the residuals at the point of the last call of fun, needed
+        # for the finite differences of jac at the same point
+        last = {}
+        def fun(xval):
+            """Residuals at a normalised point"""
+            costs, residuals = self._evaluate([xval], [('lsq', self.nfev)],
+                                              mapper)
+            self.nfev += 1
+            last['x'], last['r'] = np.array(xval), residuals[0]
+            self.stats_record.append({'Fitness': {
+                'Avg': costs[0], 'Std': 0., 'Min': costs[0],
+                'Max': costs[0]}})
+            return residuals[0]
+        def jac(xval):
+            """Forward differences, evaluated as one batch"""
+            if 'x' not in last or not np.array_equal(last['x'], xval):
+                fun(xval)
+            step = np.where(xval + self.diff_step > 1., -self.diff_step,
+                            self.diff_step)
+            points = xval + np.diag(step)
+            iterations = [('jac', self.njev, j) for j in range(len(xval))]
+            _, residuals = self._evaluate(points, iterations, mapper)
+            self.njev += 1
+            if self.checkpoint and self.njev % self.checkpoint == 0:
+                self.save()
+            return ((residuals - last['r']) / step[:, None]).T
+        self.result = least_squares(fun, x0, jac=jac, bounds=(-1., 1.),
+                                    method=self.method,
+                                    max_nfev=self.maxeval, **self.tolerances)
+        self.logger.info('Least squares: %s', self.result.message)
+        if self.checkpoint:
+            self.save()
+
+    def save(self, filename=None):
+        """Write the best point and the statistics to a checkpoint file"""
+        if filename is None:
+            filename = self.checkpointfile
+        state = {key: getattr(self, key) for key in self.statekeys}
+        save_checkpoint(filename, state)
+
+    def restore(self, filename=None):
+        """Restore the best point and the statistics from a checkpoint file"""
+        if filename is None:
+            filename = self.checkpointfile
+        for key, val in load_checkpoint(filename).items():
+            setattr(self, key, val)
+        self.logger.info('Resuming LSQ from the best point of %d evaluations',
+                         self.nfev)
+
+    def report(self):
+        report_stats(self.stats_record)
+        self.logger.info("GBest iteration   : {}".format(self.gbest_iteration))
+        self.logger.info("GBest fitness     : {}".format(self.gbestfit))
+        report_parameters(self.logger, "GBest parameters", self.gbest,
+                          self.parnames)
+        self.logger.info("Evaluations       : {} of residuals, {} of the "
+                         "Jacobian".format(self.nfev, self.njev))
@@ -0,0 +1,239 @@
+"""
+Multi-objective optimisation by NSGA-II
+======================================================================
+
+The Evaluator collapses the fitness of all objectives into one global
+cost, with fixed weights. This engine instead optimises the vector of
+the fitness of the individual objectives by the non-dominated sorting
+genetic algorithm, NSGA-II (K. Deb et al., IEEE Trans. Evol. Comput. 6,
+182 (2002)), with the selection operators of DEAP, simulated binary
+crossover and polynomial mutation. The outcome is the Pareto front --
+the points for which no objective can be improved without worsening
+another -- which is written to a file after every generation, so that
+any weighting of the objectives may be chosen afterwards, without new
+evaluations.
+
+Each generation of offspring is evaluated as a single batch --
+concurrently, if `nworkers` > 1. If `evaluate` is an Evaluator, the
+fitness of the objectives is taken from its batch evaluation; otherwise
+`evaluate` must return the vector of the fitness of the objectives.
+As in PSO, parameters are normalised to [-1, +1] within their ranges,
+and the renormalised values are passed for evaluation. An iteration is
+tagged by (generation, individual).
+"""
+import os
+import random
+import numpy as np
+from deap import base
+from deap import tools
+from skpar.core.utils import get_logger
+from skpar.core.engine import BatchEngine, get_ranges, get_stats
+from skpar.core.engine import get_normalisation, report_stats
+from skpar.core.engine import report_parameters
+
+module_logger = get_logger('skpar.nsga2')
+
+DEFAULT_PARETO_FILE = 'skpar_pareto.dat'
+
+
+class Individual(list):
+    """Index of a member, with a fitness, as handled by DEAP selection"""
+    fitness = None
+
+
+def get_individuals(fitness, weights):
+    """Return DEAP individuals standing for members of given fitness"""
+    fitclass = type('MOFitness', (base.Fitness,), {'weights': tuple(weights)})
+    individuals = []
+    for i, values in enumerate(fitness):
+        ind = Individual([i])
+        ind.fitness = fitclass(tuple(values))
+        individuals.append(ind)
+    return individuals
+
+def select_nsga2(fitness, k, weights):
+    """Return indices of the k members selected by NSGA-II"""
+    selected = tools.selNSGA2(get_individuals(fitness, weights), k)
+    return [ind[0] for ind in selected]
+
+def select_parents(fitness, weights):
+    """Return indices of parents, by tournaments on dominance and crowding"""
+    individuals = get_individuals(fitness, weights)
+    # assign crowding distances
+    individuals = tools.selNSGA2(individuals, len(individuals))
+    parents = tools.selTournamentDCD(individuals, len(individuals))
+    return [ind[0] for ind in parents]
+
+def nondominated(fitness, weights):
+    """Return a mask of the points of fitness not dominated by any other"""
+    wfit = np.asarray(fitness) * np.asarray(weights)
+    noworse = np.all(wfit[:, None, :] >= wfit[None, :, :], axis=-1)
+    better = np.any(wfit[:, None, :] > wfit[None, :, :], axis=-1)
+    # dominated[j, i] is True if point j dominates point i
+    dominated = noworse & better
+    return ~np.any(dominated, axis=0)
+
+
+class NSGA2(BatchEngine):
+    """
+    Class defining a multi-objective genetic algorithm, NSGA-II.
+    """
+    name = 'NSGA2'
+    statekeys = ['population', 'popfit', 'front'] + BatchEngine.statekeys
+
+    def __init__(self, parameters, evaluate, npop=40, ngen=100,
+                 objective_weights=(-1,), ErrTol=0.001, *args, **kwargs):
+        """
+        Create a random population
+        """
+        # the best point is that of the best global cost, and ErrTol
+        # applies to it
+        super().__init__(evaluate, (-1,), ngen, ErrTol, **kwargs)
+        self.logger = module_logger
+        self.parnames, parrange, _ = get_ranges(parameters, self.name)
+        if npop % 4:
+            self.logger.critical('NSGA2 needs a population size divisible '
+                                 'by 4; got %d', npop)
+            raise ValueError('npop must be divisible by 4')
+        # the same weight for every objective, unless given for each
+        self.objective_weights = tuple(objective_weights)
+        self.npop = npop
+        self.cxpb = kwargs.get('cxpb', 0.9)
+        self.eta = kwargs.get('eta', 20.)
+        self.mutpb = kwargs.get('mutpb', None) or 1. / len(parrange)
+        self.paretofile = kwargs.get('paretofile', DEFAULT_PARETO_FILE)
+        # the operators of DEAP use the generator of the random module
+        seed = kwargs.get('seed', None)
+        if seed is not None:
+            random.seed(seed)
+        self.norm, self.shift = get_normalisation(parrange)
+        self.population = np.array([[random.uniform(-1, 1) for _ in parrange]
+                                    for _ in range(npop)])
+        self.popfit = None
+        # the Pareto front of all points evaluated: fitness of objectives,
+        # parameter values and iteration
+        self.front = ([], [], [])
+
+    def get_weights(self, nobjectives):
+        """Return the weight of each objective"""
+        if len(self.objective_weights) == nobjectives:
+            return np.array(self.objective_weights, dtype=float)
+        return np.full(nobjectives, self.objective_weights[0], dtype=float)
+
+    def _evaluate(self, points, iterations, mapper):
+        """Return the global costs and the fitness of objectives at points"""
+        positions = list(points / self.norm + self.shift)
+        if hasattr(self.evaluate, 'evaluate_batch'):
+            costs, fitness = self.evaluate.evaluate_batch(
+                positions, iterations, self.nworkers, self.pool)
+        else:
+            fitness = np.array(list(mapper(self.evaluate,
+                                           zip(positions, iterations))),
+                               dtype=float).reshape(len(positions), -1)
+            # global RMS cost with equal weights of the objectives
+            costs = np.sqrt(np.mean(fitness**2, axis=1))
+        return np.asarray(costs), np.asarray(fitness)
+
+    def vary(self, parents):
+        """Return offspring by SBX crossover and polynomial mutation"""
+        offspring = [list(self.population[i]) for i in parents]
+        for child1, child2 in zip(offspring[::2], offspring[1::2]):
+            if random.random() <= self.cxpb:
+                tools.cxSimulatedBinaryBounded(child1, child2, self.eta,
+                                               -1., 1.)
+        for child in offspring:
+            tools.mutPolynomialBounded(child, self.eta, -1., 1., self.mutpb)
+        return np.array(offspring)
+
+    def update_front(self, fitness, positions, iterations, weights):
+        """Merge evaluated points into the Pareto front"""
+        ffront, pfront, itfront = self.front
+        fitness = [tuple(ff) for ff in fitness] + list(ffront)
+        positions = [list(pp) for pp in positions] + list(pfront)
+        iterations = list(iterations) + list(itfront)
+        # drop repeated points, e.g. re-evaluated after crossover
+        unique = {}
+        for i, pp in enumerate(positions):
+            unique.setdefault(tuple(pp), i)
+        keep = sorted(unique.values())
+        mask = nondominated([fitness[i] for i in keep], weights)
+        keep = [i for i, isfront in zip(keep, mask) if isfront]
+        self.front = ([fitness[i] for i in keep], [positions[i] for i in keep],
+                      [iterations[i] for i in keep])
+
+    def write_front(self, filename=None):
+        """Write the Pareto front: fitness of objectives, then parameters"""
+        if filename is None:
+            filename = self.paretofile
+        ffront, pfront, itfront = self.front
+        if not ffront:
+            return
+        nobj = len(ffront[0])
+        names = ['f{}'.format(k) for k in range(nobj)] +\
+            (self.parnames or ['p{}'.format(k) for k in range(len(pfront[0]))])
+        header = ['Pareto front of {} points'.format(len(ffront))]
+        for k, objv in enumerate(getattr(self.evaluate, 'objectives', [])):
+            header.append('f{}: {}'.format(k, getattr(objv, 'doc', objv)))
+        header.append(' '.join(names))
+        order = np.argsort([ff[0] for ff in ffront], kind='stable')
+        data = np.array([list(ffront[i]) + list(pfront[i]) for i in order])
+        tmpfile = filename + '.tmp'
+        np.savetxt(tmpfile, data, header='\n'.join(header))
+        os.replace(tmpfile, filename)
+
+    def get_output(self):
+        return self.front
+
+    def get_random_state(self):
+        return random.getstate()
+
+    def set_random_state(self, state):
+        random.setstate(state)
+
+    def _evolve(self, ngen, mapper=None):
+        """Evaluate offspring and select the population for ngen generations."""
+        for g in range(self.gen0, ngen):
+            if self.popfit is None:
+                points = self.population
+            else:
+                weights = self.get_weights(self.popfit.shape[1])
+                points = self.vary(select_parents(self.popfit, weights))
+            iterations = [(g, i) for i in range(len(points))]
+            costs, fitness = self._evaluate(points, iterations, mapper)
+            weights = self.get_weights(fitness.shape[1])
+            if self.popfit is None:
+                self.popfit = fitness
+            else:
+                # elitist selection among parents and offspring
+                population = np.vstack([self.population, points])
+                popfit = np.vstack([self.popfit, fitness])
+                selected = select_nsga2(popfit, self.npop, weights)
+                self.population = population[selected]
+                self.popfit = popfit[selected]
+            positions = points / self.norm + self.shift
+            self.update_front(fitness, positions, iterations, weights)
+            self.write_front()
+            fcost = costs.reshape(-1, 1)
+            self.update_best(fcost, self.get_score(fcost), positions,
+                             iterations)
+            self.stats_record.append(get_stats(costs))
+            self.logger.debug('Generation %d: %d points in the Pareto front',
+                              g, len(self.front[0]))
+            if self.end_generation(g, ngen, points):
+                break
+
+    def report(self):
+        report_stats(self.stats_record)
+        ffront = np.array(self.front[0])
+        self.logger.info("Pareto front      : {} points, written to {}".
+                         format(len(ffront), self.paretofile))
+        if len(ffront):
+            self.logger.info("Objective ranges over the front:\n"+
+                "\n".join(["{:>20s}  {:.6g} .. {:.6g}".format(
+                    'f{}'.format(k), np.min(ffront[:, k]),
+                    np.max(ffront[:, k])) for k in range(ffront.shape[1])]))
+        self.logger.info("Best global cost  : {} at iteration {}".
+                         format(self.gbestfit, self.gbest_iteration))
+        report_parameters(self.logger, "Parameters of the best global cost",
+                          self.gbest, self.parnames)
+        self.logger.info(self.stopping)
@@ -237,7 +237,13 @@ class Objective(object):
 
     Instances are callable, and return a triplet of model data, reference data,
     and sub-weights of relative importance of the items within each data.
+
+    Objectives that are `vectorised` may also be evaluated at many points
+    at once, from model data stacked along the first axis of the arrays in
+    the database, via `evaluate_stacked()`.
     """
+    vectorised = False
+
     def __init__(self, spec, **kwargs):
         """Instantiate the objective and set non-specific attributes.
 
@@ -297,10 +303,55 @@ class Objective(object):
         """Evaluate objective, i.e. fitness of the current model against the reference."""
         model, ref, weights = self.get(database)
         self.fitness = self.costf(ref, model, weights, self.errf)
+        self.evaluated = (model, ref, weights)
         self.summarise()
         return self.fitness
 
+    def residuals(self):
+        """Return the weighted errors of the last evaluation, as a 1D array.
+
+        For the RMS cost, the fitness is the norm of this vector.
+        """
+        model, ref, weights = self.evaluated
+        return np.ravel(np.sqrt(weights) * self.errf(ref, model))
+
+    def get_stacked(self, database, npoints):
+        """Return the model data of npoints, shape (npoints,)+ref_data.shape.
+
+        This method must be overloaded in a vectorised child-class.
+        """
+        raise NotImplementedError
+
+    def evaluate_stacked(self, database, npoints):
+        """Evaluate the fitness at npoints from stacked model data.
+
+        Return:
+            fitness (array): shape (npoints,)
+        """
+        model = self.get_stacked(database, npoints)
+        ref = np.broadcast_to(self.ref_data, model.shape)
+        weights = np.broadcast_to(self.subweights, model.shape)
+        fitness = self.costf(ref, model, weights, self.errf,
+                             axis=tuple(range(1, model.ndim)))
+        self.evaluated = (model, ref, weights)
+        return fitness
+
+    def residuals_stacked(self):
+        """Return the weighted errors of the last stacked evaluation.
+
+        Return:
+            residuals (array): shape (npoints, ndata)
+        """
+        model, ref, weights = self.evaluated
+        return (np.sqrt(weights) * self.errf(ref, model)).\
+            reshape(len(model), -1)
+
     def summarise(self):
+        # formatting of arrays is costly, and done at each evaluation,
+        # so skip it if the message is not going to be logged anyway
+        level = logging.INFO if self.verbose else logging.DEBUG
+        if not self.logger.isEnabledFor(level):
+            return
         s = []
         s.append("{:<15s}: {}".format("Objective:", pformat(self.doc)))
         s.append("{:9s}{:<15s}: {}".format("", "Reference data",
@@ -347,6 +398,8 @@ class Objective(object):
 class ObjValues(Objective):
     """
     """
+    vectorised = True
+
     def __init__(self, spec, **kwargs):
         super().__init__(spec, **kwargs)
         # if we check len(self.model_names), it returns the string length
@@ -410,10 +463,25 @@ class ObjValues(Objective):
                 "{} {}".format(self.model_data.shape, self.subweights.shape)
         return super().get()
 
+    def get_stacked(self, database, npoints):
+        """Get the model data of npoints, and align each of them.
+        """
+        data = np.asarray(self.query(database), dtype=float)
+        if isinstance(self.model_names, list):
+            # one stacked array per model; models make the data items
+            data = data.T
+        model = data.reshape((npoints,) + self.ref_data.shape)
+        if self.align_model is not None:
+            model = model - np.array([get_refval_1d(row, self.align_model)
+                                      for row in model])[:, None]
+        return model
+
 
 class ObjKeyValuePairs(Objective):
     """
     """
+    vectorised = True
+
     def __init__(self, spec, **kwargs):
         super().__init__(spec, **kwargs)
         # parse reference data options
@@ -449,10 +517,16 @@ class ObjKeyValuePairs(Objective):
             self.model_data[ix] = (query(database))
         return super().get()
 
+    def get_stacked(self, database, npoints):
+        return np.column_stack([np.asarray(query(database), dtype=float).
+                                reshape(npoints) for query in self.queries])
+
 
 class ObjWeightedSum(Objective):
     """
     """
+    vectorised = True
+
     def get(self, database):
         """
         """
@@ -461,6 +535,13 @@ class ObjWeightedSum(Objective):
         self.model_data = np.atleast_1d(np.dot(summands, self.model_weights))
         return super().get()
 
+    def get_stacked(self, database, npoints):
+        summands = np.asarray(self.query(database), dtype=float)
+        assert len(summands) == len(self.model_weights)
+        return np.dot(self.model_weights, summands.reshape(
+            len(self.model_weights), npoints)).reshape(
+                (npoints,) + self.ref_data.shape)
+
 
 def get_subset_ind(rangespec):
     """Return an index array based on a spec -- a list of ranges.
@@ -1,18 +1,35 @@
 """Defines a wrapper around user selectable optimisation engines.
 """
+import os
 import sys
+import numpy as np
 from deap.base import Toolbox
 # skpar
 from skpar.core.utils import get_logger
 from skpar.core.evaluate import Evaluator
 from skpar.core.pso import PSO
+from skpar.core.vpso import VPSO
+from skpar.core.cmaes import CMAES
+from skpar.core.de import DE
+from skpar.core.bo import BO
+from skpar.core.lsq import LSQ
+from skpar.core.nsga2 import NSGA2, DEFAULT_PARETO_FILE
 from skpar.core.pscan import PSCAN
+from skpar.core.sampling import SAMPLING
 from skpar.core.parameters import get_parameters
+from skpar.core.checkpoint import DEFAULT_CHECKPOINT_FILE
+from skpar.core.refine import get_refine_options, get_halloffame, refine
+from skpar.core.refine import get_refined, report_refinement
 
-OPTENGINES = {'pso': PSO, 'pscan': PSCAN}
+OPTENGINES = {'pso': PSO, 'vpso': VPSO, 'cmaes': CMAES,
+              'de': DE, 'bo': BO, 'lsq': LSQ, 'nsga2': NSGA2, 'pscan': PSCAN,
+              'sampling': SAMPLING}
 
 LOGGER = get_logger(__name__)
 
+# iteration tag of the final evaluation at the refined best point
+REFINED_ITERATION = ('refine', 'best')
+
 def get_optargs(userinp):
     """Parse user input for optimisation related arguments."""
     try:
@@ -43,6 +60,32 @@ class Optimiser(object):
         self.parameters = parameters
         if options is None:
             options = {}
+        # checkpoint files go under the workroot of the evaluator, unless
+        # given by an absolute path
+        options = dict(options)
+        try:
+            workroot = evaluate.config['workroot']
+        except (AttributeError, KeyError, TypeError):
+            workroot = None
+        if workroot is None:
+            workroot = '.'
+        checkpointfile = options.get('checkpointfile', DEFAULT_CHECKPOINT_FILE)
+        options['checkpointfile'] = os.path.abspath(
+            os.path.join(workroot, os.path.expanduser(checkpointfile)))
+        if algo == 'nsga2':
+            paretofile = options.get('paretofile', DEFAULT_PARETO_FILE)
+            options['paretofile'] = os.path.abspath(
+                os.path.join(workroot, os.path.expanduser(paretofile)))
+        for key in ['scanfile', 'fitnessfile', 'samplefile']:
+            if options.get(key):
+                options[key] = os.path.abspath(
+                    os.path.join(workroot, os.path.expanduser(options[key])))
+        # optional local refinement from the hall of fame of the engine
+        self.refine_options = get_refine_options(options.pop('refine', None))
+        self.refinement = None
+        # (fitness, parameter values, iteration) of the best point found,
+        # the refined one if refinement improves on the engine
+        self.best = None
         self.optimise = OPTENGINES[algo](self.parameters, self.evaluate,
                                          **options)
         self.logger = LOGGER
@@ -56,9 +99,43 @@ class Optimiser(object):
             log(item)
 
     def __call__(self, **kwargs):
+        """Run the optimiser; e.g. resume=True continues from a checkpoint.
+
+        Return the output of the engine; the best point found, refined or
+        not, is recorded in `best`.
+        """
         output = self.optimise(**kwargs)
+        halloffame = get_halloffame(self.optimise)
+        self.best = halloffame[0] if halloffame else None
+        if self.refine_options is not None:
+            try:
+                bounds = [(p.minv, p.maxv) for p in self.parameters]
+            except AttributeError:
+                bounds = self.parameters
+            self.refinement = refine(self.evaluate, halloffame, bounds,
+                                     self.refine_options)
+            refined = get_refined(self.refinement, self.best)
+            if refined is not None:
+                self.best = self.evaluate_final(refined['x'])
         return output
 
+    def evaluate_final(self, parametervalues):
+        """Evaluate the model at the refined best point; return its entry.
+
+        The evaluation bypasses the cache of the evaluator, so that the
+        model of the best point is produced, under REFINED_ITERATION.
+        """
+        if isinstance(self.evaluate, Evaluator):
+            cost = self.evaluate.evaluate(parametervalues, REFINED_ITERATION,
+                                          usecache=False)
+        else:
+            # a plain function as evaluator
+            cost = self.evaluate(parametervalues, REFINED_ITERATION)
+        self.logger.info('Final evaluation at the refined point: cost %s',
+                         cost)
+        return (tuple(np.ravel(cost)), list(parametervalues),
+                REFINED_ITERATION)
+
     def report(self, *args, **kwargs):
         """Report optimiser state."""
         try:
@@ -66,3 +143,11 @@ class Optimiser(object):
         except AttributeError:
             # assume optimiser does not have a report method
             pass
+        if self.refinement:
+            halloffame = get_halloffame(self.optimise)
+            try:
+                parnames = [p.name for p in self.parameters]
+            except AttributeError:
+                parnames = None
+            report_refinement(self.refinement, halloffame[0][0][0], parnames,
+                              self.refine_options['method'])
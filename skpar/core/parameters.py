@@ -23,6 +23,12 @@ from skpar.core.utils import get_logger
 
 LOGGER = get_logger('__name__')
 
+# Contents of templates, by path relative to the work root and signature
+# (size, modification time) of the file. The copies of a template in the
+# work directories of successive evaluations keep its signature, so a
+# template is read from file once per run, unless it is modified.
+TEMPLATES = {}
+
 def get_parameters(userinp):
     """Parse user input for definitions of parameters.
 
@@ -144,7 +150,26 @@ class Parameter(object):
                    minv=self.minv, maxv=self.maxv)
 
 
-def substitute_template(parameters, parnames, templatefile, resultfile):
+def read_template(templatefile, relpath):
+    """Return the contents of a template, read from file if not cached.
+
+    Args:
+        templatefile (str): Name of template file with substitution patterns.
+        relpath (str): Name of the template relative to the work root,
+            under which its contents are cached.
+    """
+    stat = os.stat(templatefile)
+    key = (relpath, stat.st_size, stat.st_mtime_ns)
+    template = TEMPLATES.get(key, None)
+    if template is None:
+        with open(templatefile, 'r') as fin:
+            template = fin.read()
+        TEMPLATES[key] = template
+    return template
+
+
+def substitute_template(parameters, parnames, templatefile, resultfile,
+                        template=None):
     """Substitute a template with actual parameter values.
 
     Args:
@@ -154,9 +179,11 @@ def substitute_template(parameters, parnames, templatefile, resultfile):
             parnames is the list of corresponding names.
         templatefile (str): Name of template file with substitution patterns.
         resultfile (str): Name of file to contain the substituted result.
+        template (str): Contents of the template file, if already read.
     """
-    with open(templatefile, 'r') as fin:
-        template = fin.read()
+    if template is None:
+        with open(templatefile, 'r') as fin:
+            template = fin.read()
     try:
         pardict = dict([(p.name, p.value) for p in parameters])
     except AttributeError:
@@ -224,4 +251,5 @@ def update_parameters(workroot, templates, parameters, parnames=None):
             path, templname = os.path.split(fin)
             name = templname.replace('template.', '')
             fout = os.path.join(path, name)
-            substitute_template(parvalues, parnames, fin, fout)
+            substitute_template(parvalues, parnames, fin, fout,
+                                read_template(fin, os.path.normpath(ftempl)))
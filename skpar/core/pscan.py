@@ -21,22 +21,81 @@ While there is no encoded limitation on the number of parameters to
 use in a scan, practically, for more than 2 or three parameters, the
 computational effort will be excessive, in comparison to optimisation
 based on the PSO.
+
+Points of the grid are never stored: a point is created on demand from
+its flat (C-order) index, by numpy.unravel_index, and the scan proceeds
+in chunks of `chunksize` consecutive points, each evaluated as a single
+batch (concurrently, if `nworkers` > 1). The fitness of all points is
+kept in an array shaped like the grid, memory-mapped to a file
+(`fitnessfile`), and each chunk may be appended to a text file
+(`scanfile`) as soon as it is evaluated; statistics and the hall of fame
+are accumulated chunk by chunk. The memory needed by a scan is then of
+the order of a chunk rather than of the grid.
+
+In the adaptive mode (`adaptive` = L > 0 levels of refinement), the
+grid given by the parameters is only the coarse one. After it is
+scanned, the cells around the `nbest` best points found so far are
+subdivided, i.e. the points at half the current spacing within one
+coarse spacing of each best point are scanned, and so on, L times.
+All points lie on the fine grid with 2**L times as many intervals per
+parameter, by whose flat index they are identified, so that points
+already evaluated at a coarser level are reused, and the fine
+resolution is reached near the minimum at a fraction of the cost of a
+scan of the fine grid.
 """
+import os
+import itertools
+import yaml
 import numpy as np
 from deap import base
 from deap import creator
-from deap import tools
 from skpar.core.utils import get_logger
+from skpar.core.evaluate import batch_evaluate
+from skpar.core.engine import merge_halloffame, run_batches, report_stats
+from skpar.core.checkpoint import save_checkpoint, load_checkpoint
+from skpar.core.checkpoint import DEFAULT_CHECKPOINT_FILE
 
 module_logger = get_logger('skpar.pscan')
 
+DEFAULT_FITNESS_FILE = 'pscan_fitness.npy'
+
 def declareTypes(weights=(-1,)):
     """Declare a types relevant to PSCAN.
     """
     creator.create("pFitness", base.Fitness, weights=weights)
-    creator.create("Population", list, inext=None, best=None, ibest=None)
     creator.create("Point", list, ind=None, fitness=creator.pFitness)
 
+
+class Grid(object):
+    """Lazy sequence of the points of a multidimensional grid.
+
+    The grid is formed by `numpts` equally spaced values over each of
+    `ranges`, end-points inclusive. The point of flat index `ind` is
+    obtained by unravelling the index over the shape of the grid, the
+    last range varying fastest.
+    """
+    def __init__(self, ranges, numpts):
+        self.linspaces = [np.linspace(rng[0], rng[1], num=int(num),
+                                      endpoint=True)
+                          for rng, num in zip(ranges, numpts)]
+        self.shape = tuple(int(num) for num in numpts)
+
+    def __len__(self):
+        return int(np.prod(self.shape, dtype=np.int64))
+
+    def __getitem__(self, ind):
+        if not -len(self) <= ind < len(self):
+            raise IndexError('grid index {} out of range'.format(ind))
+        return tuple(float(lins[i]) for lins, i in
+                     zip(self.linspaces, np.unravel_index(ind % len(self),
+                                                          self.shape)))
+
+    def points(self, start, stop):
+        """Return the array of points of flat indexes in [start, stop)"""
+        indexes = np.unravel_index(np.arange(start, stop), self.shape)
+        return np.column_stack([lins[i] for lins, i in
+                                zip(self.linspaces, indexes)])
+
 def create_positions(ranges, numpts):
     """Create a sequence of np.prod(nupmts) over the ranges.
     
@@ -47,18 +106,13 @@ def create_positions(ranges, numpts):
     Returns:
         A sequence of all points on the multidimensional grid formed by
         numpts along each of ranges. Note that NOT a grid structure, but
-        a linear sequence is returned, i.e. a list of N-tuples, each tuple
-        being the coordinate of a point, N being the number of ranges.
+        a linear sequence is returned, i.e. a Grid yielding N-tuples, each
+        tuple being the coordinate of a point, N being the number of ranges.
+        Points are created on demand, and not stored.
         Numpy linspace is underlying the division of the ranges, end-points
         inclusive.
     """
-    linsp = []
-    for rng, num in zip(ranges, numpts):
-        linsp.append(np.linspace(rng[0], rng[1], num=int(num), endpoint=True))
-    grid = np.meshgrid(*linsp, sparse=False)    # list of arrays making up the grid
-    _positions = np.vstack(map(np.ravel, grid)) # this creates list of lists (one per direction)
-    positions = list(zip(*_positions))          # now we have a sequence of tuples
-    return positions
+    return Grid(ranges, numpts)
 
 def create_point(positions, ind):
     """Return a Point object from a sequence of positions, assigning an index.
@@ -83,47 +137,179 @@ def pformat(point):
     ss.append('Fitness:   {}'.format(point.fitness))
     return '\n'.join(ss)
 
-def create_population(positions):
+
+class Population(object):
+    """Points of a grid, created on demand, with their fitness.
+
+    The population covers the points of flat index in [start, stop),
+    i.e. the whole grid by default, or a shard of it.
+    `fitness` is an array shaped like the grid (or flat, for a shard),
+    with one more axis for the components of the fitness, allocated upon
+    the first evaluation; points not evaluated yet have NaN fitness.
+    In an adaptive scan, `fitness` is not allocated, and the fitness of
+    the points scanned is in the dictionary `evaluated` instead, by index.
+    `inext` is the index of the next point to be scanned, `best` and
+    `ibest` are the best point found and its index.
+    """
+    def __init__(self, grid, start=0, stop=None):
+        self.grid = grid
+        self.start = start
+        self.stop = len(grid) if stop is None else stop
+        self.fitness = None
+        self.evaluated = None
+        self.inext = start
+        self.best = None
+        self.ibest = None
+
+    def __len__(self):
+        return len(self.grid)
+
+    def __getitem__(self, ind):
+        point = create_point(self.grid, ind)
+        if self.evaluated is not None and ind in self.evaluated:
+            point.fitness.values = self.evaluated[ind]
+        elif self.start <= ind < self.inext and self.fitness is not None:
+            flat = self.fitness.reshape(-1, self.fitness.shape[-1])
+            point.fitness.values = tuple(flat[ind - self.start])
+        return point
+
+    def allocate(self, nfitness, filename=None):
+        """Allocate the fitness array, memory-mapped to filename if given"""
+        if self.start == 0 and self.stop == len(self.grid):
+            shape = self.grid.shape + (nfitness,)
+        else:
+            shape = (self.stop - self.start, nfitness)
+        if filename:
+            self.fitness = np.lib.format.open_memmap(filename, mode='w+',
+                                                     dtype=float, shape=shape)
+        else:
+            self.fitness = np.empty(shape)
+        self.fitness[...] = np.nan
+
+    def set_fitness(self, start, fitness):
+        """Store the fitness of consecutive points from index start"""
+        flat = self.fitness.reshape(-1, self.fitness.shape[-1])
+        flat[start - self.start:start - self.start + len(fitness)] = fitness
+
+def create_population(positions, start=0, stop=None):
     """Return a Population object of Point objects from a sequence of positions.
 
-    Reset the 'inext' index to 0.
+    Reset the 'inext' index to `start`.
     """
-    population = creator.Population([create_point(positions, ind) 
-                                     for ind in range(len(positions))])
-    population.inext = 0
-    return population
+    return Population(positions, start, stop)
+
+def get_shard(userinp, npoints):
+    """Return (i, N, start, stop) of the i-th of N shards of npoints.
 
-def report_stats(stats):
+    `userinp` is 'i/N' or [i, N], with 1 <= i <= N; shards are
+    consecutive slices of nearly equal size.
     """
+    if isinstance(userinp, str):
+        userinp = userinp.split('/')
+    try:
+        ishard, nshards = [int(item) for item in userinp]
+    except (TypeError, ValueError):
+        module_logger.critical('Shard must be given as i/N; got %s', userinp)
+        raise ValueError('Invalid shard {}'.format(userinp))
+    if not 1 <= ishard <= nshards:
+        module_logger.critical('Shard %d/%d out of range', ishard, nshards)
+        raise ValueError('Invalid shard {}/{}'.format(ishard, nshards))
+    return (ishard, nshards, (ishard - 1) * npoints // nshards,
+            ishard * npoints // nshards)
+
+def add_suffix(filename, suffix):
+    """Return filename with suffix inserted before its extension"""
+    base, ext = os.path.splitext(filename)
+    return base + suffix + ext
+
+def get_fine_numpts(numpts, levels):
+    """Return the number of points of the grid refined `levels` times"""
+    return [(int(num) - 1) * 2**levels + 1 for num in numpts]
+
+def get_coarse_indexes(shape, step):
+    """Return flat indexes of the points of every step-th point of a grid"""
+    lattice = np.meshgrid(*[np.arange(0, num, step) for num in shape],
+                          indexing='ij')
+    return np.ravel_multi_index([ll.ravel() for ll in lattice], shape)
+
+def get_refined_indexes(shape, centres, step):
+    """Return flat indexes of the points within 2*step of the centres.
+
+    The points are spaced by step, i.e. they subdivide the cells of
+    spacing 2*step around each centre; points beyond the grid are dropped.
     """
-    logger = module_logger
-    statsHeader = "".join([
-    '{0:>10s}'.format('Min.'),
-    '{0:>10s}'.format('Max.'),
-    '{0:>10s}'.format('Avg.'),
-    '{0:>10s}'.format('Std.'),
-    ])
-    logger.info('')
-    logger.info("Fitness statistics follow:")
-    logger.info(statsHeader)
-    logger.info('============================================================')
-    s = stats[0]
-    logger.info("".join([
-    '{0:>10.4f}'.format(s['Fitness']['Min']),
-    '{0:>10.4f}'.format(s['Fitness']['Max']),
-    '{0:>10.4f}'.format(s['Fitness']['Avg']),
-    '{0:>10.4f}'.format(s['Fitness']['Std']),
-        ]))
-    logger.info('============================================================')
+    ndim = len(shape)
+    offsets = np.array(list(itertools.product(range(-2, 3), repeat=ndim)))
+    points = (np.array(np.unravel_index(centres, shape)).T[:, None, :] +
+              step * offsets[None, :, :]).reshape(-1, ndim)
+    inside = np.all((points >= 0) & (points < np.array(shape)), axis=1)
+    return np.unique(np.ravel_multi_index(points[inside].T, shape))
 
+def get_metafile(fitnessfile):
+    """Return the name of the metadata file accompanying a fitness file"""
+    return os.path.splitext(fitnessfile)[0] + '.yaml'
 
+def merge_shards(filenames, outfile=None):
+    """Merge the fitness of the shards of a scan into the fitness grid.
+
+    Args:
+        filenames: fitness (.npy) or metadata (.yaml) files of the shards
+        outfile: if given, the merged grid is written there (.npy)
+
+    Returns:
+        fitness: array shaped like the grid, with one more axis for the
+            components of the fitness; NaN for points not scanned
+        ibest: flat index of the best point, by the objective weights
+        best: parameter values of the best point
+        meta: metadata of the scan, including the number of missing points
+    """
+    meta = None
+    fitness = None
+    for filename in filenames:
+        with open(get_metafile(filename)) as fin:
+            shardmeta = yaml.safe_load(fin)
+        if meta is None:
+            meta = shardmeta
+            grid = Grid(meta['ranges'], meta['numpts'])
+        elif [shardmeta[key] for key in ['ranges', 'numpts', 'nshards']] !=\
+                [meta[key] for key in ['ranges', 'numpts', 'nshards']]:
+            module_logger.critical('Shard %s is of a different scan', filename)
+            raise ValueError('Inconsistent shard {}'.format(filename))
+        if shardmeta['inext'] < shardmeta['stop']:
+            module_logger.warning('Shard %d/%d is incomplete: %d of %d points',
+                                  shardmeta['shard'], shardmeta['nshards'],
+                                  shardmeta['inext'] - shardmeta['start'],
+                                  shardmeta['stop'] - shardmeta['start'])
+        if shardmeta['inext'] == shardmeta['start']:
+            continue
+        shardfit = np.load(shardmeta['fitnessfile'], mmap_mode='r')
+        if fitness is None:
+            shape = grid.shape + (shardfit.shape[-1],)
+            if outfile:
+                fitness = np.lib.format.open_memmap(outfile, mode='w+',
+                                                    dtype=float, shape=shape)
+            else:
+                fitness = np.empty(shape)
+            fitness[...] = np.nan
+        flat = fitness.reshape(-1, fitness.shape[-1])
+        flat[shardmeta['start']:shardmeta['stop']] = shardfit
+    if fitness is None:
+        raise ValueError('No points scanned in shards {}'.format(filenames))
+    flat = fitness.reshape(-1, fitness.shape[-1])
+    score = flat.dot(np.asarray(meta['weights'])[:flat.shape[1]])
+    ibest = int(np.nanargmax(score))
+    meta['missing'] = int(np.count_nonzero(np.isnan(score)))
+    if isinstance(fitness, np.memmap):
+        fitness.flush()
+    return fitness, ibest, grid[ibest], meta
 
 class PSCAN(object):
     """Class defining a scanner over a set of positions.
 
     Executing it performs a linear scan over the parameter space by dividing 
     the range of each parameter in a number points as dictated by user.
-    The resulting sequence of points is scanned linearly, i.e. point by point.
+    The resulting sequence of points is scanned linearly, i.e. point by point,
+    in chunks of `chunksize` points evaluated as a batch.
 
     There is an implicit assumption in how parameter definition is
     interpreted at present, which is merely to avoid modifying the 
@@ -135,9 +321,7 @@ class PSCAN(object):
     The interpretation of min/max parameter values remains the same as 
     usual.
     """
-    toolbox = base.Toolbox()
     nBestKept = 10
-    halloffame = tools.HallOfFame(nBestKept)
     
     def __init__(self, parameters, evaluate, objective_weights=(-1,), *args, **kwargs):
         """Create a set of positions to scan over based on given parameters.
@@ -164,39 +348,279 @@ class PSCAN(object):
             ranges = [(p[1], p[2]) for p in parameters]
         # declare the Point type and the methods associated with it
         declareTypes(objective_weights)
-        # create a sequence of points on the grid to sample
+        self.weights = np.asarray(objective_weights, dtype=float)
+        # the grid of points to sample, created lazily;
         # treat the parameter.value as the desired number of points to scan
-        positions = create_positions(ranges, numpts)
-        # register the methods to obtain a point and evaluate it
-        self.toolbox.register('create', create_point, positions=positions)
-        self.toolbox.register('population', create_population, positions=positions)
-        self.toolbox.register('evaluate', evaluate)
-        self.population = self.toolbox.population()
-        # Provide statistics collector (fitness statistics)
-        fit_stats = tools.Statistics(key=lambda ind: ind.fitness.values)
-        fit_stats.register("Avg", np.mean)
-        fit_stats.register("Std", np.std)
-        fit_stats.register("Min", np.min)
-        fit_stats.register("Max", np.max)
-        self.mstats = tools.MultiStatistics(Fitness=fit_stats)
+        self.evaluate = evaluate
+        self.ranges = [[float(lo), float(hi)] for lo, hi in ranges]
+        self.numpts = [int(num) for num in numpts]
+        # in adaptive mode, the grid of the parameters is the coarse one,
+        # and points are indexed on the grid refined `adaptive` times
+        self.levels = int(kwargs.get('adaptive', 0) or 0)
+        self.nbest = kwargs.get('nbest', 3)
+        self.level0 = 0
+        grid = create_positions(self.ranges,
+                                get_fine_numpts(self.numpts, self.levels))
+        # number of consecutive points evaluated as a batch, by `nworkers`
+        # processes (or threads, if `pool` is 'thread')
+        self.chunksize = kwargs.get('chunksize', 1000)
+        self.nworkers = kwargs.get('nworkers', 1)
+        self.pool = kwargs.get('pool', 'process').lower()
+        # files: fitness array memory-mapped to `fitnessfile` (.npy, by
+        # default in the directory of the checkpoint file), and optional
+        # rows of index, parameters and fitness in `scanfile`
+        self.fitnessfile = kwargs.get('fitnessfile', None)
+        self.scanfile = kwargs.get('scanfile', None)
+        # running sums for statistics over all fitness values:
+        # count, sum, sum of squares, min, max
+        self.sums = [0, 0., 0., np.inf, -np.inf]
+        self.bestscore = -np.inf
+        # list of (fitness, parameters, index), the best first
+        self.halloffame = []
         self.stats_record = []
-        
-    def optimise(self):
+        # write the indexes of scanned points and their fitness every
+        # `checkpoint` evaluations (never if 0), so that a scan may be resumed
+        self.checkpoint = kwargs.get('checkpoint', 0)
+        self.checkpointfile = kwargs.get('checkpointfile',
+                                         DEFAULT_CHECKPOINT_FILE)
+        # with `shard: i/N`, only the i-th of N consecutive slices of the
+        # grid is scanned, for the shards to be run by independent
+        # processes; each shard keeps its own files, and the fitness of
+        # shards is merged by `skpar pscan-merge`
+        self.shard = kwargs.get('shard', None)
+        if self.shard and self.levels:
+            self.logger.critical('Sharding is not supported by an adaptive '
+                                 'scan')
+            raise ValueError('shard and adaptive are exclusive')
+        if self.shard:
+            ishard, nshards, start, stop = get_shard(self.shard, len(grid))
+            self.shard = (ishard, nshards)
+            suffix = '_shard_{}_of_{}'.format(ishard, nshards)
+            if self.fitnessfile is None:
+                self.fitnessfile = os.path.join(
+                    os.path.dirname(os.path.abspath(self.checkpointfile)),
+                    'pscan' + suffix + '.npy')
+            else:
+                self.fitnessfile = add_suffix(self.fitnessfile, suffix)
+            if self.scanfile:
+                self.scanfile = add_suffix(self.scanfile, suffix)
+            self.checkpointfile = add_suffix(self.checkpointfile, suffix)
+            self.logger.info('Scanning shard %d/%d: points %d to %d of %d',
+                             ishard, nshards, start, stop - 1, len(grid))
+        else:
+            start, stop = 0, len(grid)
+        if self.fitnessfile is None and not self.levels:
+            # the fitness of the grid is kept on disk rather than in memory,
+            # and the checkpoint needs only the name of the file
+            self.fitnessfile = os.path.join(
+                os.path.dirname(os.path.abspath(self.checkpointfile)),
+                DEFAULT_FITNESS_FILE)
+        self.population = create_population(grid, start, stop)
+        if self.levels:
+            self.population.evaluated = {}
+
+    def optimise(self, resume=False):
         """Let the scan process execute, looping over all points.
+
+        If `resume` is True, the points already scanned are restored
+        from the checkpoint file and the scan continues from
+        `population.inext`.
         """
-        for ind, pos in enumerate(self.population):
-            self.population.inext = ind + 1
-            pos.fitness.values = self.toolbox.evaluate(pos, ind)
-            if not self.population.best or self.population.best.fitness < pos.fitness:
-                self.population.ibest = pos.ind
-                self.population.best = self.toolbox.create(ind=ind)
-                self.population.best.fitness = pos.fitness
-                self.halloffame.update(self.population)
-        self.stats_record.append(self.mstats.compile(self.population))
+        if resume:
+            self.restore()
+        elif self.scanfile:
+            self.write_header()
+        if self.shard:
+            self.write_meta()
+        scan = self._scan_adaptive if self.levels else self._scan
+        run_batches(scan, self.evaluate, self.nworkers, self.pool)
+        count, total, totalsq, fmin, fmax = self.sums
+        if count:
+            mean = total / count
+            std = np.sqrt(max(totalsq / count - mean**2, 0.))
+        else:
+            # e.g. a shard of no points, if there are more shards than
+            # points, or a resumed scan with no points left
+            self.logger.warning('No fitness values; statistics are NaN')
+            mean = std = fmin = fmax = np.nan
+        self.stats_record = [{'Fitness': {
+            'Avg': mean, 'Std': std, 'Min': fmin, 'Max': fmax}}]
+        if self.checkpoint:
+            self.save()
+        elif self.shard:
+            if isinstance(self.population.fitness, np.memmap):
+                self.population.fitness.flush()
+            self.write_meta()
         return self.population, self.stats_record
+
+    def _scan(self, mapper=None):
+        """Evaluate the remaining points, chunk by chunk."""
+        population = self.population
+        while population.inext < population.stop:
+            start = population.inext
+            stop = min(start + self.chunksize, population.stop)
+            # chunks end at checkpoints
+            if self.checkpoint:
+                stop = min(stop, (start // self.checkpoint + 1) *
+                           self.checkpoint)
+            points = population.grid.points(start, stop)
+            indexes = list(range(start, stop))
+            fitness = np.array(batch_evaluate(self.evaluate,
+                                              [list(pp) for pp in points],
+                                              indexes, self.nworkers,
+                                              self.pool, mapper),
+                               dtype=float).reshape(len(points), -1)
+            if population.fitness is None:
+                population.allocate(fitness.shape[1], self.fitnessfile)
+            population.set_fitness(start, fitness)
+            population.inext = stop
+            self.update(fitness, points, indexes)
+            if self.scanfile:
+                self.write_chunk(fitness, points, indexes)
+            if self.checkpoint and stop % self.checkpoint == 0:
+                self.save()
+
+    def _scan_adaptive(self, mapper=None):
+        """Scan the coarse grid, then refine around the best points."""
+        population = self.population
+        shape = population.grid.shape
+        for level in range(self.level0, self.levels + 1):
+            step = 2**(self.levels - level)
+            if level == 0:
+                indexes = get_coarse_indexes(shape, step)
+            else:
+                scanned = np.array(list(population.evaluated.keys()))
+                fitness = np.array(list(population.evaluated.values()))
+                score = fitness.dot(self.weights[:fitness.shape[1]])
+                centres = scanned[np.argsort(-score, kind='stable')
+                                  [:self.nbest]]
+                indexes = get_refined_indexes(shape, centres, step)
+            indexes = [int(ind) for ind in indexes
+                       if ind not in population.evaluated]
+            self.logger.info('Adaptive scan, level %d: %d new points',
+                             level, len(indexes))
+            for ichunk in range(0, len(indexes), self.chunksize):
+                chunk = indexes[ichunk:ichunk + self.chunksize]
+                points = np.array([population.grid[ind] for ind in chunk])
+                fitness = np.array(batch_evaluate(self.evaluate,
+                                                  [list(pp) for pp in points],
+                                                  chunk, self.nworkers,
+                                                  self.pool, mapper),
+                                   dtype=float).reshape(len(points), -1)
+                for ind, fit in zip(chunk, fitness):
+                    population.evaluated[ind] = tuple(fit)
+                population.inext = len(population.evaluated)
+                self.update(fitness, points, chunk)
+                if self.scanfile:
+                    self.write_chunk(fitness, points, chunk)
+            self.level0 = level + 1
+            if self.checkpoint:
+                self.save()
+
+    def update(self, fitness, points, indexes):
+        """Accumulate statistics, the best point and the hall of fame"""
+        self.sums[0] += fitness.size
+        self.sums[1] += np.sum(fitness)
+        self.sums[2] += np.sum(fitness**2)
+        self.sums[3] = min(self.sums[3], np.min(fitness))
+        self.sums[4] = max(self.sums[4], np.max(fitness))
+        score = fitness.dot(self.weights[:fitness.shape[1]])
+        ibest = int(np.argmax(score))
+        if score[ibest] > self.bestscore:
+            self.bestscore = score[ibest]
+            self.set_best(indexes[ibest])
+        self.halloffame = merge_halloffame(self.halloffame, fitness, score,
+                                           points, indexes, self.weights,
+                                           self.nBestKept)
+
+    def set_best(self, ind):
+        """Make the point of index ind the best one"""
+        self.population.ibest = ind
+        self.population.best = self.population[ind]
+
+    def write_header(self):
+        """Start the scan file with a header naming the columns"""
+        names = self.parnames or ['p{}'.format(k) for k in
+                                  range(len(self.population.grid.shape))]
+        with open(self.scanfile, 'w') as fout:
+            fout.write('# index {} fitness\n'.format(' '.join(names)))
+
+    def write_chunk(self, fitness, points, indexes):
+        """Append the index, parameters and fitness of points to the scan file"""
+        with open(self.scanfile, 'a') as fout:
+            np.savetxt(fout, np.column_stack([indexes, points, fitness]),
+                       fmt=['%d'] + ['%.10g'] * (points.shape[1] +
+                                                 fitness.shape[1]))
+
+    def save(self, filename=None):
+        """Write the scanned points and their fitness to a checkpoint file"""
+        if filename is None:
+            filename = self.checkpointfile
+        population = self.population
+        state = {'inext': population.inext,
+                 'ibest': population.ibest,
+                 'bestscore': self.bestscore,
+                 'sums': self.sums,
+                 'halloffame': self.halloffame}
+        if self.levels:
+            state['evaluated'] = population.evaluated
+            state['level'] = self.level0
+        else:
+            if isinstance(population.fitness, np.memmap):
+                population.fitness.flush()
+            state['fitnessfile'] = os.path.abspath(self.fitnessfile)
+        if self.scanfile:
+            # rows written after the checkpoint are dropped upon resume
+            state['scanfilesize'] = os.path.getsize(self.scanfile)
+        save_checkpoint(filename, state)
+        if self.shard:
+            self.write_meta()
+
+    def write_meta(self):
+        """Write the metadata of a shard, needed to merge it with others"""
+        population = self.population
+        meta = {'shard': self.shard[0], 'nshards': self.shard[1],
+                'start': population.start, 'stop': population.stop,
+                'inext': population.inext, 'ranges': self.ranges,
+                'numpts': self.numpts, 'parnames': self.parnames,
+                'weights': [float(ww) for ww in self.weights],
+                'fitnessfile': os.path.abspath(self.fitnessfile)}
+        metafile = get_metafile(self.fitnessfile)
+        with open(metafile + '.tmp', 'w') as fout:
+            yaml.safe_dump(meta, fout, default_flow_style=None)
+        os.replace(metafile + '.tmp', metafile)
+
+    def restore(self, filename=None):
+        """Restore the scanned points and their fitness from a checkpoint file"""
+        if filename is None:
+            filename = self.checkpointfile
+        state = load_checkpoint(filename)
+        population = self.population
+        population.inext = state['inext']
+        if 'evaluated' in state:
+            population.evaluated = state['evaluated']
+            self.level0 = state['level']
+        elif population.inext > population.start:
+            population.fitness = np.load(state['fitnessfile'], mmap_mode='r+')
+        self.bestscore = state['bestscore']
+        self.sums = state['sums']
+        self.halloffame = state['halloffame']
+        if state['ibest'] is not None:
+            self.set_best(state['ibest'])
+        if self.scanfile:
+            if 'scanfilesize' in state:
+                with open(self.scanfile, 'r+') as fout:
+                    fout.truncate(state['scanfilesize'])
+            else:
+                self.write_header()
+        self.logger.info('Resuming PSCAN from point %d of %d',
+                         population.inext, len(population))
             
     def report(self):
         report_stats(self.stats_record)
+        if self.population.best is None:
+            self.logger.info("No points scanned")
+            return
         self.logger.info("Best position    : {}".format(self.population.ibest))
         self.logger.info("Best fitness     : {}".format(self.population.best.fitness.values))
         if self.parnames:
@@ -205,6 +629,12 @@ class PSCAN(object):
                 for (name, val) in zip(self.parnames, self.population.best)]))
         else:
             self.logger.info("Best parameters  : {}".format(self.population.best))
+        if self.levels:
+            self.logger.info("Points scanned   : {} of {} on the finest grid".
+                             format(self.population.inext,
+                                    len(self.population)))
+        if self.scanfile:
+            self.logger.info("Scan written to  : {}".format(self.scanfile))
 
     def __call__(self, *args, **kwargs):
         return self.optimise(*args, **kwargs)
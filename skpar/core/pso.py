@@ -76,6 +76,10 @@ The swarm is declared, created and let to evolve with the help of the ``PSO`` cl
 import random
 import operator
 import sys
+import itertools
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from concurrent.futures import wait, FIRST_COMPLETED
 import numpy as np
 
 from deap import base
@@ -83,6 +87,13 @@ from deap import creator
 from deap import tools
 
 from skpar.core.utils import get_logger
+from skpar.core.evaluate import batch_evaluate
+from skpar.core.engine import report_stats
+from skpar.core.evaluate import get_executor, submit_evaluation
+from skpar.core.surrogate import get_screen
+from skpar.core.stopping import get_stopping
+from skpar.core.checkpoint import save_checkpoint, load_checkpoint
+from skpar.core.checkpoint import DEFAULT_CHECKPOINT_FILE
 
 module_logger = get_logger('skpar.pso')
 
@@ -271,15 +282,22 @@ def evolveParticle(part, best, inertia=0.7298, acceleration=2.9922, degree=2):
 
 # init arguments: 
 pso_init_args = ["npart", "objectives", "parrange", "evaluate"]
-pso_optinit_args   = ['ngen', 'ErrTol', 'strict_bounds'] 
+pso_optinit_args   = ['ngen', 'ErrTol', 'strict_bounds', 'nworkers', 'pool',
+                      'checkpoint', 'checkpointfile', 'asynchronous',
+                      'statsinterval', 'surrogate', 'stall', 'mindiameter',
+                      'maxeval', 'maxtime'] 
 
 # call arguments
 pso_call_args      = []
-pso_optcall_args   = ['ngen', "ErrTol", ] 
+pso_optcall_args   = ['ngen', "ErrTol", 'resume', ] 
 
 pso_dflts = {'npart': 10, 'ngen': 200, 'ErrTol': 0.001, 
                 'objective_weights': (-1,), 
-                'strict_bounds': True, }
+                'strict_bounds': True, 'nworkers': 1, 'pool': 'process',
+                'checkpoint': 0, 'checkpointfile': DEFAULT_CHECKPOINT_FILE,
+                'asynchronous': False, 'statsinterval': None,
+                'surrogate': None, 'stall': None, 'mindiameter': None,
+                'maxeval': None, 'maxtime': None, }
 
 
 def pso_args(**kwargs):
@@ -311,35 +329,6 @@ def pso_args(**kwargs):
     return init_args, call_args, init_optional_args, call_optional_args
 
 
-def report_stats(stats):
-    """
-    """
-    logger = module_logger
-    statsHeader = "".join([
-    '{0:>5s}'.format('Gen.'),
-    '{0:>10s}'.format('Min.'),
-    '{0:>10s}'.format('Max.'),
-    '{0:>10s}'.format('Avg.'),
-    '{0:>10s}'.format('Std.'),
-    ])
-    logger.info('')
-    logger.info("Fitness statistics follow:")
-    logger.info(statsHeader)
-    logger.info('============================================================')
-    ngen = len(stats)
-    for gen in range(ngen):
-        s = stats[gen]
-        logger.info("".join([
-        '{0:>5d}'.format(gen),
-        '{0:>10.4f}'.format(s['Fitness']['Min']),
-        '{0:>10.4f}'.format(s['Fitness']['Max']),
-        '{0:>10.4f}'.format(s['Fitness']['Avg']),
-        '{0:>10.4f}'.format(s['Fitness']['Std']),
- #       '{0:>12.2f}'.format(s['WRE']['Min']*100),
-            ]))
-    logger.info('============================================================')
-
-
 class PSO(object):
     """
     Class defining Particle-Swarm Optimizer.
@@ -380,11 +369,40 @@ class PSO(object):
         self.toolbox.register("create", createParticle, prange=parrange, strict_bounds=strict_bounds)
         self.toolbox.register("evolve", evolveParticle, inertia=self.pInertia, acceleration=self.pAcceleration)
         self.toolbox.register("evaluate", evaluate)
+        self.evaluate = evaluate
         # create a swarm from particles with the above defined properties
         self.toolbox.register("swarm", tools.initRepeat, creator.Swarm, self.toolbox.create)
         self.swarm = self.toolbox.swarm(npart)
         self.ngen = ngen
         self.ErrTol = ErrTol
+        # number of workers evaluating the particles of a generation;
+        # with 1 (default) particles are evaluated one after another;
+        # workers are processes by default, but may be threads too
+        self.nworkers = kwargs.get('nworkers', 1)
+        self.pool = kwargs.get('pool', 'process').lower()
+        # write the complete state of the optimiser every `checkpoint`
+        # generations (never if 0), so that a run may be resumed
+        self.checkpoint = kwargs.get('checkpoint', 0)
+        self.checkpointfile = kwargs.get('checkpointfile',
+                                         DEFAULT_CHECKPOINT_FILE)
+        self.gen0 = 0
+        # in asynchronous mode, each particle is evolved and resubmitted
+        # as soon as its own evaluation returns, without waiting for the
+        # rest of the generation; statistics are then compiled over the
+        # last `statsinterval` evaluations (default npart)
+        self.asynchronous = kwargs.get('asynchronous', False)
+        self.statsinterval = kwargs.get('statsinterval', None) or npart
+        self.counts, self.recent = None, None
+        # optional pre-screening of particles by a surrogate model of the
+        # cost; only the promising ones are evaluated
+        self.screen = get_screen(kwargs.get('surrogate', None))
+        if self.screen is not None and self.asynchronous:
+            self.logger.warning('Surrogate pre-screening is not supported '
+                                'in asynchronous mode; ignored')
+            self.screen = None
+        # stop before ngen generations if the cost falls below ErrTol, or
+        # by the criteria of skpar.core.stopping given in kwargs
+        self.stopping = get_stopping(ErrTol, **kwargs)
         # Provide with statistics collector
         #  - fitness statistics
         fit_stats = tools.Statistics(key=lambda ind: ind.fitness.values)
@@ -396,41 +414,229 @@ class PSO(object):
         self.mstats = tools.MultiStatistics(Fitness=fit_stats)
         self.stats_record = []
 
-    def optimise(self, ngen=None, ErrTol=None):
+    def optimise(self, ngen=None, ErrTol=None, resume=False):
         """
         Let the swarm evolve for ngen (or self.ngen) generations.
+
+        If `resume` is True, the state of the optimiser is restored from
+        the checkpoint file and evolution continues from the generation
+        following the last completed one.
         """
         # ngen and ErrTol would typically be set during initialization
         if ngen is None:
             ngen = self.ngen
         if ErrTol is None:
             ErrTol = self.ErrTol
+        self.stopping.errtol = ErrTol
         #
-        self.stats_record = []
-        for g in range(ngen):
-            for i, part in enumerate(self.swarm):
-                iteration = (g, i)
-                part.fitness.values = self.toolbox.evaluate(part.renormalized, iteration)
-                if not part.best or part.best.fitness < part.fitness:
-                    part.best = creator.Particle(part)
-                    part.best.fitness.values = part.fitness.values
-
-                if not self.swarm.gbest or self.swarm.gbest.fitness < part.fitness:
-                    self.swarm.gbest_iteration = iteration
-                    self.swarm.gbest = creator.Particle(part)
-                    self.swarm.gbest.fitness.values = part.fitness.values
-                    self.swarm.gbest.renormalized = part.renormalized
-                    self.halloffame.update(self.swarm)
+        if resume:
+            self.restore()
+        else:
+            self.gen0 = 0
+            self.stats_record = []
+            self.counts, self.recent = None, None
+            self.stopping.reset()
+        if self.asynchronous:
+            self._evolve_async(ngen)
+        elif hasattr(self.evaluate, 'evaluate_batch'):
+            # the evaluator schedules the evaluations of a generation
+            try:
+                self._evolve_swarm(ngen)
+            finally:
+                self.evaluate.close()
+        elif self.nworkers > 1:
+            # evaluate all particles of a generation concurrently; note that
+            # `evaluate` must be picklable to be sent to worker processes,
+            # and thread-safe to be called from worker threads
+            workers = ThreadPool if self.pool == 'thread' else Pool
+            with workers(self.nworkers) as pool:
+                self.toolbox.register('map', pool.starmap)
+                self._evolve_swarm(ngen)
+        else:
+            self.toolbox.register('map', itertools.starmap)
+            self._evolve_swarm(ngen)
+        return self.swarm, self.stats_record
+
+    def _evolve_swarm(self, ngen):
+        """Evaluate and evolve the swarm for ngen generations.
+
+        Particles are dispatched for evaluation as a batch to the evaluator,
+        or via the `map` registered with the toolbox if the evaluation is
+        a plain function, but the best/gbest/hall-of-fame bookkeeping is
+        done in the order of the particles in the swarm, so that the
+        outcome does not depend on the order of completion of evaluations.
+        """
+        for g in range(self.gen0, ngen):
+            if self.screen is None:
+                selected = list(range(len(self.swarm)))
+            else:
+                selected = self.screen.select([list(part) for part in
+                                               self.swarm], random)
+                # particles not selected are not evaluated in this generation
+                for i, part in enumerate(self.swarm):
+                    if i not in selected:
+                        del part.fitness.values
+                self.logger.debug('Generation %d: %d of %d particles selected '
+                                  'for evaluation', g, len(selected),
+                                  len(self.swarm))
+            iterations = [(g, i) for i in selected]
+            positions = [self.swarm[i].renormalized for i in selected]
+            fitnesses = batch_evaluate(self.evaluate, positions, iterations,
+                                       self.nworkers, self.pool,
+                                       self.toolbox.map)
+            evaluated = [self.swarm[i] for i in selected]
+            for part, iteration, fitness in zip(evaluated, iterations,
+                                                fitnesses):
+                part.fitness.values = fitness
+                self._update_best(part, iteration)
+            if self.screen is not None:
+                self.screen.update([list(part) for part in evaluated],
+                                   [sum(part.fitness.wvalues)
+                                    for part in evaluated])
 
             # Update particles only after full evaluation of the swarm,
             # so that gbest possibly arise from the last generation.
+            points = [list(part) for part in self.swarm]
             for part in self.swarm:
                 self.toolbox.evolve(part, self.swarm.gbest)
 
             # Gather all the fitnesses and update the stats
-            self.stats_record.append(self.mstats.compile(self.swarm))
-
-        return self.swarm, self.stats_record
+            self.stats_record.append(self.mstats.compile(evaluated))
+
+            self.gen0 = g + 1
+            stop = self._check_stopping(points, len(evaluated))
+            if self.checkpoint and (self.gen0 % self.checkpoint == 0 or
+                                    self.gen0 == ngen or stop):
+                self.save()
+            if stop:
+                break
+
+    def _check_stopping(self, points, nevals):
+        """Return the stopping criterion met after nevals evaluations"""
+        fitness = self.swarm.gbest.fitness
+        # the tolerance applies to the cost of a minimisation
+        cost = fitness.values[0] if fitness.weights[0] < 0 else None
+        return self.stopping.check(cost, sum(fitness.wvalues), points, nevals)
+
+    def _update_best(self, part, iteration):
+        """Update the best of a particle, the global best and hall of fame"""
+        if not part.best or part.best.fitness < part.fitness:
+            part.best = creator.Particle(part)
+            part.best.fitness.values = part.fitness.values
+        if not self.swarm.gbest or self.swarm.gbest.fitness < part.fitness:
+            self.swarm.gbest_iteration = iteration
+            self.swarm.gbest = creator.Particle(part)
+            self.swarm.gbest.fitness.values = part.fitness.values
+            self.swarm.gbest.renormalized = part.renormalized
+            self.halloffame.update([pp for pp in self.swarm
+                                    if pp.fitness.valid])
+
+    def _evolve_async(self, ngen):
+        """Evolve each particle as soon as its own evaluation returns.
+
+        The budget is the same as for the synchronous mode, i.e. ngen
+        evaluations per particle on average; particles with faster
+        evaluations are evaluated more often. A particle is evolved with respect to
+        the global best known at the completion of its evaluation, and is
+        resubmitted immediately, so workers never wait for the slowest
+        evaluation of a generation.
+        The iteration of an evaluation is (evaluation of the particle,
+        particle index). Note that the outcome of a run with several
+        workers depends on the order of completion of evaluations.
+        The generation counter (`gen0`) counts completed evaluations here,
+        and stopping criteria are checked whenever statistics are compiled.
+        """
+        npart = len(self.swarm)
+        budget = ngen * npart
+        if self.stopping.maxeval:
+            budget = min(budget, self.stopping.maxeval)
+        stop = None
+        counts = self.counts or [0] * npart
+        recent = self.recent or []
+        completed = self.gen0
+        submitted = completed
+        executor = get_executor(self.evaluate, self.nworkers, self.pool)
+        try:
+            running = {}
+            # each particle has its current position evaluated at any time
+            for i, part in enumerate(self.swarm):
+                if submitted < budget:
+                    future = submit_evaluation(self.evaluate, executor,
+                                               part.renormalized,
+                                               (counts[i], i))
+                    running[future] = i
+                    submitted += 1
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                # in order of submission, for reproducibility with 1 worker
+                for future in [ff for ff in running if ff in done]:
+                    i = running.pop(future)
+                    part = self.swarm[i]
+                    part.fitness.values = future.result()
+                    self._update_best(part, (counts[i], i))
+                    counts[i] += 1
+                    completed += 1
+                    recent.append(part.fitness.values)
+                    self.toolbox.evolve(part, self.swarm.gbest)
+                    if submitted < budget and not stop:
+                        running[submit_evaluation(self.evaluate, executor,
+                                                  part.renormalized,
+                                                  (counts[i], i))] = i
+                        submitted += 1
+                    if len(recent) == self.statsinterval or \
+                            completed == budget:
+                        self.stats_record.append({'Fitness': {
+                            'Avg': np.mean(recent), 'Std': np.std(recent),
+                            'Min': np.min(recent), 'Max': np.max(recent)}})
+                        stop = self._check_stopping(
+                            [list(pp) for pp in self.swarm], len(recent))
+                        recent = []
+                    self.gen0, self.counts, self.recent =\
+                        completed, counts, recent
+                    if self.checkpoint and \
+                            (completed % (self.checkpoint * npart) == 0 or
+                             completed == budget or stop):
+                        self.save()
+                    if stop:
+                        # pending evaluations are abandoned
+                        running = {}
+                        break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def save(self, filename=None):
+        """Write the complete state of the optimiser to a checkpoint file"""
+        if filename is None:
+            filename = self.checkpointfile
+        state = {'generation': self.gen0,
+                 'swarm': self.swarm,
+                 'halloffame': self.halloffame,
+                 'stats_record': self.stats_record,
+                 'stopping': self.stopping,
+                 'random': random.getstate()}
+        if self.asynchronous:
+            # particles with pending evaluations are resubmitted upon resume
+            state['counts'] = self.counts
+            state['recent'] = self.recent
+        if self.screen is not None:
+            state['screen'] = self.screen
+        save_checkpoint(filename, state)
+
+    def restore(self, filename=None):
+        """Restore the state of the optimiser from a checkpoint file"""
+        if filename is None:
+            filename = self.checkpointfile
+        state = load_checkpoint(filename)
+        self.gen0 = state['generation']
+        self.swarm = state['swarm']
+        self.halloffame = state['halloffame']
+        self.stats_record = state['stats_record']
+        random.setstate(state['random'])
+        self.counts = state.get('counts', None)
+        self.recent = state.get('recent', None)
+        self.screen = state.get('screen', self.screen)
+        self.stopping.reset(state.get('stopping', None))
+        self.logger.info('Resuming PSO from generation %d', self.gen0)
 
     def report(self):
         report_stats(self.stats_record)
@@ -443,6 +649,9 @@ class PSO(object):
                 for (name, val) in zip(self.parnames, gbestpars)]))
         else:
             self.logger.info("GBest parameters  : {}".format(gbestpars))
+        if self.screen is not None:
+            self.logger.info(self.screen)
+        self.logger.info(self.stopping)
 
     def __call__(self, *args, **kwargs):
         return self.optimise(*args, **kwargs)
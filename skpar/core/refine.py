@@ -0,0 +1,162 @@
+"""Local refinement of the best points found by a global optimiser.
+
+Global optimisers such as PSO approach the optimum quickly, but then
+spend many generations jittering around it. A bounded local search
+(Nelder-Mead or Powell, by `scipy.optimize.minimize`) started from the
+entries of the hall of fame of the optimiser is then much cheaper.
+
+Each start is an independent sequence of evaluations; several starts are
+run concurrently in threads, each calling the evaluator, which handles
+concurrent evaluations in separate work directories under its workroot.
+Without a workroot, an Evaluator evaluates in the current directory, and
+the starts run one after the other instead. The search works in parameters normalised to
+[-1, 1] within their ranges, so that tolerances apply alike to all
+parameters, and minimises the first component of the fitness returned
+by the evaluator, i.e. the global cost.
+An iteration is tagged by ('refine', start, evaluation of the start).
+"""
+from multiprocessing.pool import ThreadPool
+import numpy as np
+from scipy.optimize import minimize
+from skpar.core.utils import get_logger
+
+LOGGER = get_logger(__name__)
+
+REFINE_METHODS = ['nelder-mead', 'powell']
+
+DEFAULT_REFINE = {
+    'method': 'nelder-mead',
+    'nstarts': 1,
+    'maxeval': 100,
+    'nworkers': None,
+    'xatol': 1.e-4,
+    'fatol': 1.e-6,
+}
+
+def get_refine_options(userinp):
+    """Return refinement options from user input, or None if not requested.
+
+    `userinp` may be True, a method name, or a dictionary overriding
+    DEFAULT_REFINE.
+    """
+    if not userinp:
+        return None
+    options = dict(DEFAULT_REFINE)
+    if isinstance(userinp, str):
+        options['method'] = userinp
+    elif isinstance(userinp, dict):
+        options.update(userinp)
+    options['method'] = options['method'].lower()
+    if options['method'] not in REFINE_METHODS:
+        LOGGER.critical('Unknown refinement method %s; use one of %s',
+                        options['method'], REFINE_METHODS)
+        raise ValueError('Unknown refinement method {}'.
+                         format(options['method']))
+    return options
+
+def get_halloffame(engine):
+    """Return (fitness, parameter values, iteration) of the best points.
+
+    Optimisers keep either a list of such tuples, or a DEAP hall of fame
+    of individuals, possibly with renormalised values.
+    """
+    entries = []
+    for item in getattr(engine, 'halloffame', None) or []:
+        if isinstance(item, tuple):
+            entries.append(item)
+        else:
+            entries.append((item.fitness.values,
+                            list(getattr(item, 'renormalized', item)), None))
+    return entries
+
+def refine_point(evaluate, start, x0, bounds, options):
+    """Minimise the cost by a local search from x0, within bounds.
+
+    Return a dictionary with the start, the initial and final parameter
+    values and cost, and the number of evaluations.
+    """
+    bounds = np.asarray(bounds, dtype=float)
+    norm = 2. / (bounds[:, 1] - bounds[:, 0])
+    shift = 0.5 * (bounds[:, 1] + bounds[:, 0])
+    history = []
+    def cost(xnorm):
+        """Evaluate the renormalised point, recording it"""
+        xval = np.asarray(xnorm) / norm + shift
+        fitness = evaluate(list(xval), ('refine', start, len(history)))
+        history.append((float(np.ravel(fitness)[0]), xval))
+        return history[-1][0]
+    if options['method'] == 'nelder-mead':
+        solveroptions = {'maxfev': options['maxeval'],
+                         'xatol': options['xatol'],
+                         'fatol': options['fatol']}
+    else:
+        solveroptions = {'maxfev': options['maxeval'],
+                         'xtol': options['xatol'],
+                         'ftol': options['fatol']}
+    xnorm0 = np.clip((np.asarray(x0, dtype=float) - shift) * norm, -1., 1.)
+    result = minimize(cost, xnorm0, method=options['method'],
+                      bounds=[(-1., 1.)] * len(bounds), options=solveroptions)
+    # the best evaluation, which need not be the last one
+    fbest, xbest = min(history, key=lambda item: item[0])
+    return {'start': start, 'x0': list(x0), 'f0': history[0][0],
+            'x': list(xbest), 'f': fbest, 'nfev': len(history),
+            'message': result.message}
+
+def refine(evaluate, halloffame, bounds, options):
+    """Refine the first `nstarts` entries of the hall of fame.
+
+    Return the list of results of `refine_point`, one per start.
+    """
+    starts = [params for _, params, _ in halloffame[:options['nstarts']]]
+    if not starts:
+        LOGGER.warning('No hall of fame to refine')
+        return []
+    nworkers = options['nworkers'] or len(starts)
+    config = getattr(evaluate, 'config', None)
+    if nworkers > 1 and config is not None and\
+            config.get('workroot', None) is None:
+        # concurrent starts would overwrite each other's files in the cwd
+        LOGGER.info('No workroot: starts of refinement run one at a time')
+        nworkers = 1
+    args = [(evaluate, i, x0, bounds, options) for i, x0 in enumerate(starts)]
+    if nworkers > 1 and len(starts) > 1:
+        with ThreadPool(min(nworkers, len(starts))) as pool:
+            return pool.starmap(refine_point, args)
+    return [refine_point(*arg) for arg in args]
+
+def get_refined(results, best=None):
+    """Return the best refined result if it improves on `best`, else None.
+
+    `best` is a hall-of-fame entry (fitness, parameter values, iteration).
+    """
+    if not results:
+        return None
+    refined = min(results, key=lambda res: res['f'])
+    if best is not None and refined['f'] >= best[0][0]:
+        return None
+    return refined
+
+def report_refinement(results, fglobal=None, parnames=None, method=None):
+    """Log the cost improvement and evaluations spent by the refinement"""
+    if not results:
+        return
+    logger = LOGGER
+    logger.info('')
+    logger.info('Local refinement ({}) from {} hall-of-fame entries:'.
+                format(method, len(results)))
+    for res in results:
+        logger.info('  start {:>3d}: cost {:.6g} -> {:.6g} in {} evaluations'.
+                    format(res['start'], res['f0'], res['f'], res['nfev']))
+    best = min(results, key=lambda res: res['f'])
+    if fglobal is None:
+        fglobal = min(res['f0'] for res in results)
+    logger.info('Refined cost      : {:.6g} -> {:.6g} (gain {:.6g})'.
+                format(fglobal, best['f'], fglobal - best['f']))
+    logger.info('Refinement evaluations: {}'.
+                format(sum(res['nfev'] for res in results)))
+    if parnames:
+        logger.info("Refined parameters:\n"+
+            "\n".join(["{:>20s}  {}".format(name, val)
+            for (name, val) in zip(parnames, best['x'])]))
+    else:
+        logger.info("Refined parameters: {}".format(best['x']))
@@ -0,0 +1,217 @@
+"""
+Space-filling sampling of the parameter space (SAMPLING)
+======================================================================
+
+This module evaluates a space-filling design of `nsamples` points over
+the ranges of the parameters: a (scrambled) Sobol sequence or a Latin
+hypercube, drawn by `scipy.stats.qmc`. For four or more parameters,
+such designs cover the space far better per evaluation than the full
+factorial grid of PSCAN, and make a good set of points to start a
+surrogate model or a Bayesian optimisation from.
+
+Samples are evaluated in batches of `chunksize` points, concurrently
+if `nworkers` > 1, and each batch may be appended to a text file
+(`samplefile`), a row per sample with the parameter values followed by
+the fitness -- the format read by the warm start of BO.
+
+A design can be extended: resuming from the checkpoint with a larger
+`nsamples` evaluates only the new samples. A Sobol sequence is then
+continued, so that the extended design is the same as if drawn at once
+(its balance is best for powers of 2 samples); a Latin hypercube is
+extended by an independent Latin hypercube of the new samples.
+An iteration is tagged by the index of the sample.
+"""
+import os
+import warnings
+import functools
+import numpy as np
+from scipy.stats import qmc
+from skpar.core.utils import get_logger
+from skpar.core.evaluate import batch_evaluate
+from skpar.core.engine import BatchEngine, get_ranges, get_stats
+from skpar.core.engine import run_batches, report_stats, report_parameters
+from skpar.core.checkpoint import save_checkpoint, load_checkpoint
+
+module_logger = get_logger('skpar.sampling')
+
+DESIGNS = ['sobol', 'lhs']
+
+
+def draw_sobol(ndim, start, stop, seed, scramble=True):
+    """Return points start to stop of a Sobol sequence in [0, 1)^ndim"""
+    sampler = qmc.Sobol(d=ndim, scramble=scramble, seed=seed)
+    if start:
+        sampler.fast_forward(start)
+    with warnings.catch_warnings():
+        # balance properties need powers of 2, which are not enforced
+        warnings.simplefilter('ignore', UserWarning)
+        return sampler.random(stop - start)
+
+def draw_lhs(ndim, npoints, rng):
+    """Return a Latin hypercube of npoints in [0, 1)^ndim"""
+    return qmc.LatinHypercube(d=ndim, seed=rng).random(npoints)
+
+
+class SAMPLING(BatchEngine):
+    """
+    Class defining a sampler of the parameter space by a design of points.
+    """
+    name = 'SAMPLING'
+
+    def __init__(self, parameters, evaluate, nsamples=64,
+                 objective_weights=(-1,), *args, **kwargs):
+        """
+        Set the design of the samples
+        """
+        # the seed fixes the scrambling of a Sobol sequence, which must
+        # be the same for an extension of the design
+        seed = kwargs.pop('seed', None)
+        if seed is None:
+            seed = int(np.random.default_rng().integers(2**31))
+        super().__init__(evaluate, objective_weights, seed=seed, **kwargs)
+        self.logger = module_logger
+        self.seed = seed
+        self.parnames, self.parrange, _ = get_ranges(parameters, self.name)
+        self.nsamples = nsamples
+        self.design = kwargs.get('design', 'sobol').lower()
+        if self.design not in DESIGNS:
+            self.logger.critical('Unknown sampling design %s; use one of %s',
+                                 self.design, DESIGNS)
+            raise ValueError('Unknown design {}'.format(self.design))
+        self.scramble = kwargs.get('scramble', True)
+        self.chunksize = kwargs.get('chunksize', 100)
+        self.samplefile = kwargs.get('samplefile', None)
+        # samples drawn, and their fitness, valid for the first
+        # `nevaluated` of them only
+        self.samples = np.empty((0, len(self.parrange)))
+        self.fitness = None
+        self.nevaluated = 0
+
+    def draw(self, nsamples):
+        """Extend the samples to nsamples points of the design"""
+        ndrawn = len(self.samples)
+        if nsamples <= ndrawn:
+            return
+        ndim = len(self.parrange)
+        if self.design == 'sobol':
+            unit = draw_sobol(ndim, ndrawn, nsamples, self.seed, self.scramble)
+        else:
+            unit = draw_lhs(ndim, nsamples - ndrawn, self.rng)
+        points = self.parrange[:, 0] + unit *\
+            (self.parrange[:, 1] - self.parrange[:, 0])
+        self.samples = np.vstack([self.samples, points])
+
+    def optimise(self, nsamples=None, resume=False):
+        """
+        Evaluate nsamples (or self.nsamples) samples of the design.
+
+        If `resume` is True, the samples already evaluated are restored
+        from the checkpoint file, and only the rest are evaluated, which
+        extends the design if nsamples is larger than before.
+        """
+        if nsamples is None:
+            nsamples = self.nsamples
+        if resume:
+            self.restore()
+        elif self.samplefile:
+            self.write_header()
+        self.draw(nsamples)
+        run_batches(functools.partial(self._sample, nsamples), self.evaluate,
+                    self.nworkers, self.pool)
+        self.stats_record = [get_stats(self.fitness[:self.nevaluated])]
+        if self.checkpoint:
+            self.save()
+        return self.samples[:self.nevaluated], self.stats_record
+
+    def _sample(self, nsamples, mapper=None):
+        """Evaluate the samples not evaluated yet, chunk by chunk."""
+        while self.nevaluated < nsamples:
+            start = self.nevaluated
+            stop = min(start + self.chunksize, nsamples)
+            # chunks end at checkpoints
+            if self.checkpoint:
+                stop = min(stop, (start // self.checkpoint + 1) *
+                           self.checkpoint)
+            points = self.samples[start:stop]
+            iterations = list(range(start, stop))
+            fitness = np.array(batch_evaluate(self.evaluate,
+                                              [list(pp) for pp in points],
+                                              iterations, self.nworkers,
+                                              self.pool, mapper),
+                               dtype=float).reshape(len(points), -1)
+            self.allocate(fitness.shape[1])
+            self.fitness[start:stop] = fitness
+            self.nevaluated = stop
+            self.update_best(fitness, self.get_score(fitness), points,
+                             iterations)
+            if self.samplefile:
+                self.write_chunk(fitness, points)
+            if self.checkpoint and stop % self.checkpoint == 0:
+                self.save()
+
+    def allocate(self, nobjectives):
+        """Size the fitness array to all samples drawn, NaN if not evaluated.
+
+        The array grows once per extension of the design, not per chunk.
+        """
+        nrows = 0 if self.fitness is None else len(self.fitness)
+        if nrows < len(self.samples):
+            fitness = np.full((len(self.samples), nobjectives), np.nan)
+            if nrows:
+                fitness[:nrows] = self.fitness
+            self.fitness = fitness
+
+    def write_header(self):
+        """Start the sample file with a header naming the columns"""
+        names = self.parnames or ['p{}'.format(k) for k in
+                                  range(len(self.parrange))]
+        with open(self.samplefile, 'w') as fout:
+            fout.write('# {} fitness\n'.format(' '.join(names)))
+
+    def write_chunk(self, fitness, points):
+        """Append the parameters and fitness of samples to the sample file"""
+        with open(self.samplefile, 'a') as fout:
+            np.savetxt(fout, np.column_stack([points, fitness]), fmt='%.10g')
+
+    def save(self, filename=None):
+        """Write the samples and their fitness to a checkpoint file"""
+        if filename is None:
+            filename = self.checkpointfile
+        state = {key: getattr(self, key) for key in
+                 ['design', 'seed', 'samples', 'fitness', 'nevaluated',
+                  'gbest', 'gbestfit', 'gbestscore', 'gbest_iteration',
+                  'halloffame']}
+        state['random'] = self.rng.bit_generator.state
+        if self.samplefile:
+            # rows written after the checkpoint are dropped upon resume
+            state['samplefilesize'] = os.path.getsize(self.samplefile)
+        save_checkpoint(filename, state)
+
+    def restore(self, filename=None):
+        """Restore the samples and their fitness from a checkpoint file"""
+        if filename is None:
+            filename = self.checkpointfile
+        state = load_checkpoint(filename)
+        self.rng.bit_generator.state = state.pop('random')
+        samplefilesize = state.pop('samplefilesize', None)
+        for key, val in state.items():
+            setattr(self, key, val)
+        if self.samplefile:
+            if samplefilesize is not None:
+                with open(self.samplefile, 'r+') as fout:
+                    fout.truncate(samplefilesize)
+            else:
+                self.write_header()
+        self.logger.info('Resuming %s sampling from sample %d',
+                         self.design, self.nevaluated)
+
+    def report(self):
+        report_stats(self.stats_record)
+        self.logger.info("Samples          : {} of a {} design".
+                         format(self.nevaluated, self.design))
+        self.logger.info("Best sample      : {}".format(self.gbest_iteration))
+        self.logger.info("Best fitness     : {}".format(self.gbestfit))
+        report_parameters(self.logger, "Best parameters", self.gbest,
+                          self.parnames)
+        if self.samplefile:
+            self.logger.info("Samples written to: {}".format(self.samplefile))
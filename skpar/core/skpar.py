@@ -52,11 +52,15 @@ class SKPAR():
             self.do_optimisation = False
 
 
-    def __call__(self, evalonly=False):
+    def __call__(self, evalonly=False, resume=False):
         if self.do_optimisation and not evalonly:
             # run the optimiser
-            self.logger.info('Starting optimisation')
-            self.optimiser()
+            if resume:
+                self.logger.info('Resuming optimisation from checkpoint')
+                self.optimiser(resume=True)
+            else:
+                self.logger.info('Starting optimisation')
+                self.optimiser()
             # issue final report
             self.optimiser.report()
             self.logger.info('Done.')
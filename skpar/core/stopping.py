@@ -0,0 +1,130 @@
+"""Criteria for stopping an optimiser before its last generation.
+
+An optimiser calls `Stopping.check()` after each generation, with the
+cost and the weighted fitness (score) of its global best, the normalised
+positions of the generation, and the number of evaluations made. The
+first criterion met is returned and kept as `reason`, to be reported:
+
+    * ``errtol`` -- the global best cost is below the tolerance;
+    * ``stall`` -- the global best has not improved for so many
+      generations;
+    * ``mindiameter`` -- the largest distance between two points of the
+      generation, in normalised coordinates, is below the threshold,
+      i.e. the swarm has collapsed;
+    * ``maxeval`` -- the number of evaluations reached the budget;
+    * ``maxtime`` -- the wall-clock time of the run, in seconds, exceeded
+      the budget.
+
+A criterion that is None (or 0) is not applied.
+"""
+import time
+import numpy as np
+from scipy.spatial.distance import pdist
+from skpar.core.utils import get_logger
+
+LOGGER = get_logger(__name__)
+
+STOPPING_OPTIONS = ['stall', 'mindiameter', 'maxeval', 'maxtime']
+
+
+def diameter(points):
+    """Return the largest distance between two points.
+
+    The distances of all pairs take n(n-1)/2 numbers, rather than the
+    n*n*d of an array of differences, e.g. 4 MB for 1000 points.
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) < 2:
+        return 0.
+    return float(np.max(pdist(points)))
+
+
+class Stopping():
+    """Bookkeeping and check of the stopping criteria of a run.
+
+    The counts of evaluations and of stalled generations are kept
+    across a resumed run (the object is part of the checkpoint), while
+    the wall-clock time is that of the current run.
+    """
+    def __init__(self, errtol=None, stall=None, mindiameter=None,
+                 maxeval=None, maxtime=None):
+        self.errtol = errtol
+        self.stall = stall
+        self.mindiameter = mindiameter
+        self.maxeval = maxeval
+        self.maxtime = maxtime
+        self.nevals = 0
+        self.nstall = 0
+        self.bestscore = None
+        self.reason = None
+        self.start = time.time()
+
+    def reset(self, previous=None):
+        """Start the timer of a run; continue the counts of a previous one"""
+        if previous is None:
+            self.nevals, self.nstall, self.bestscore = 0, 0, None
+        else:
+            self.nevals, self.nstall, self.bestscore = \
+                previous.nevals, previous.nstall, previous.bestscore
+        self.reason = None
+        self.start = time.time()
+
+    def check(self, cost, score, points=None, nevals=0):
+        """Return the reason to stop after a generation, or None.
+
+        Args:
+            cost(float): global cost of the best point, compared to errtol
+                if not None
+            score(float): weighted fitness of the best point (higher is
+                better), whose improvement resets the stall count
+            points(array): normalised points of the generation
+            nevals(int): number of evaluations in the generation
+        """
+        self.nevals += nevals
+        if self.bestscore is None or score > self.bestscore:
+            self.bestscore = score
+            self.nstall = 0
+        else:
+            self.nstall += 1
+        elapsed = time.time() - self.start
+        if self.errtol and cost is not None and cost <= self.errtol:
+            self.reason = 'errtol: cost {:.6g} <= {}'.format(cost, self.errtol)
+        elif self.stall and self.nstall >= self.stall:
+            self.reason = 'stall: no improvement in {} generations'.\
+                format(self.nstall)
+        elif self.mindiameter and points is not None and \
+                self.get_diameter(points) < self.mindiameter:
+            self.reason = 'mindiameter: diameter <= {:.6g} < {}'.\
+                format(self.get_diameter(points), self.mindiameter)
+        elif self.maxeval and self.nevals >= self.maxeval:
+            self.reason = 'maxeval: {} evaluations'.format(self.nevals)
+        elif self.maxtime and elapsed >= self.maxtime:
+            self.reason = 'maxtime: {:.1f} s elapsed'.format(elapsed)
+        if self.reason:
+            LOGGER.info('Stopping criterion met -- %s', self.reason)
+        return self.reason
+
+    def get_diameter(self, points):
+        """Return the diameter of points, or a bound if it is conclusive.
+
+        The diagonal of the bounding box of the points is at least their
+        diameter, so there is no need for the distances of all pairs if
+        it is already below `mindiameter`.
+        """
+        points = np.asarray(points, dtype=float)
+        if len(points) < 2:
+            return 0.
+        diagonal = float(np.linalg.norm(np.ptp(points, axis=0)))
+        if diagonal < self.mindiameter:
+            return diagonal
+        return diameter(points)
+
+    def __repr__(self):
+        return 'Stopped by        : {}'.format(self.reason or
+                                               'completion of all generations')
+
+
+def get_stopping(errtol=None, **kwargs):
+    """Return Stopping from the options of an optimiser"""
+    return Stopping(errtol, **{key: kwargs.get(key, None)
+                               for key in STOPPING_OPTIONS})
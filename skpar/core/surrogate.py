@@ -0,0 +1,245 @@
+"""Surrogate models of the cost, for pre-screening of candidate points.
+
+A surrogate is fitted on all points evaluated so far, and predicts the
+(weighted) fitness of new candidates at negligible cost compared to a
+full evaluation by the Evaluator. Two models are provided:
+
+    * `RBFSurrogate` -- radial basis function interpolation
+      (`scipy.interpolate.RBFInterpolator`); no uncertainty estimate;
+    * `GPSurrogate` -- Gaussian process regression with a squared
+      exponential kernel, whose length scale maximises the marginal
+      likelihood over a grid; it predicts mean and standard deviation.
+
+`Screen` uses a surrogate to select which candidates of a generation get
+a real evaluation: the predicted best `fraction`, plus a random
+`explore` fraction of the rest, which keeps the surrogate honest in
+regions it considers poor. Points are expected to be normalised, e.g.
+within [-1, 1] in each dimension, as in the optimisers of skpar.
+"""
+import math
+import numpy as np
+from scipy.interpolate import RBFInterpolator
+from scipy.linalg import cho_factor, cho_solve, solve_triangular
+from skpar.core.utils import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+def sqdistance(xa, xb):
+    """Return the matrix of squared distances between rows of xa and xb"""
+    return np.maximum(np.sum(xa**2, axis=1)[:, None] +
+                      np.sum(xb**2, axis=1)[None, :] - 2 * xa.dot(xb.T), 0.)
+
+
+class Surrogate():
+    """Base of surrogate models: bookkeeping of the evaluated points.
+
+    Points are de-duplicated, the last value of a point being retained.
+    The model is fitted lazily, upon the first prediction after new
+    points are added, and is not pickled (only the data is).
+    Only the `maxpoints` points added last are used by the fit, whose
+    cost grows as the cube of the number of points.
+
+    The model is refitted from scratch on these points, rather than
+    updated point by point: it is refitted at most once per generation,
+    whose evaluations cost far more than a fit of up to `maxpoints`
+    points, and the GP re-selects its length scale and standardisation
+    at each fit, which changes the whole kernel matrix anyway, while the
+    points dropped beyond `maxpoints` would need downdates of a factor.
+    """
+    def __init__(self, maxpoints=1000):
+        self.data = {}
+        self.maxpoints = maxpoints
+        self._model = None
+
+    def add(self, points, values):
+        """Add evaluated points and their values to the data"""
+        for point, value in zip(points, values):
+            key = tuple(np.asarray(point, dtype=float))
+            # a repeated point counts as added last
+            self.data.pop(key, None)
+            self.data[key] = float(value)
+        self._model = None
+
+    def __len__(self):
+        return len(self.data)
+
+    def get_data(self):
+        """Return the points and values, as arrays"""
+        return (np.array(list(self.data.keys())),
+                np.array(list(self.data.values())))
+
+    def predict(self, points):
+        """Return predicted mean and standard deviation (or None) at points"""
+        if self._model is None:
+            xval, yval = self.get_data()
+            self._model = self.fit(xval[-self.maxpoints:],
+                                   yval[-self.maxpoints:])
+        return self._predict(np.atleast_2d(np.asarray(points, dtype=float)))
+
+    def fit(self, xval, yval):
+        """Return the model fitted on points xval with values yval"""
+        raise NotImplementedError
+
+    def _predict(self, points):
+        raise NotImplementedError
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_model'] = None
+        return state
+
+
+class RBFSurrogate(Surrogate):
+    """Radial basis function interpolation of the data.
+
+    If `neighbors` is given, each prediction interpolates only that many
+    nearest points, which makes the fit local and cheaper still.
+    """
+    def __init__(self, kernel='thin_plate_spline', smoothing=1.e-8,
+                 maxpoints=1000, neighbors=None):
+        super().__init__(maxpoints)
+        self.kernel = kernel
+        self.smoothing = smoothing
+        self.neighbors = neighbors
+
+    def fit(self, xval, yval):
+        return RBFInterpolator(xval, yval, kernel=self.kernel,
+                               smoothing=self.smoothing,
+                               neighbors=self.neighbors)
+
+    def _predict(self, points):
+        return self._model(points), None
+
+    def __repr__(self):
+        return 'RBFSurrogate: {} points, kernel {}'.format(len(self),
+                                                           self.kernel)
+
+
+class GPSurrogate(Surrogate):
+    """Gaussian process regression with a squared exponential kernel.
+
+    Values are standardised. Unless `lengthscale` is given, it is chosen
+    among `lengthscales` by the largest log marginal likelihood.
+    """
+    lengthscales = np.geomspace(0.05, 2., 16)
+
+    def __init__(self, lengthscale=None, noise=1.e-6, maxpoints=1000):
+        super().__init__(maxpoints)
+        self.lengthscale = lengthscale
+        self.noise = noise
+
+    def fit(self, xval, yval):
+        ymean = np.mean(yval)
+        yscale = np.std(yval) or 1.
+        ynorm = (yval - ymean) / yscale
+        d2 = sqdistance(xval, xval)
+        best = None
+        for scale in ([self.lengthscale] if self.lengthscale
+                      else self.lengthscales):
+            kernel = np.exp(-0.5 * d2 / scale**2)
+            kernel[np.diag_indices_from(kernel)] += self.noise
+            try:
+                factor = cho_factor(kernel, lower=True)
+            except np.linalg.LinAlgError:
+                continue
+            alpha = cho_solve(factor, ynorm)
+            loglike = -0.5 * ynorm.dot(alpha) -\
+                np.sum(np.log(np.diag(factor[0])))
+            if best is None or loglike > best[0]:
+                best = (loglike, scale, factor, alpha)
+        if best is None:
+            raise np.linalg.LinAlgError('GP kernel matrix is not positive '
+                                        'definite for any length scale')
+        _, scale, factor, alpha = best
+        return {'x': xval, 'ymean': ymean, 'yscale': yscale,
+                'lengthscale': scale, 'factor': factor, 'alpha': alpha}
+
+    def _predict(self, points):
+        model = self._model
+        kstar = np.exp(-0.5 * sqdistance(points, model['x']) /
+                       model['lengthscale']**2)
+        mean = kstar.dot(model['alpha'])
+        vv = solve_triangular(model['factor'][0], kstar.T, lower=True)
+        var = np.maximum(1. + self.noise - np.sum(vv**2, axis=0), 0.)
+        return (mean * model['yscale'] + model['ymean'],
+                np.sqrt(var) * model['yscale'])
+
+    def __repr__(self):
+        return 'GPSurrogate: {} points'.format(len(self))
+
+
+SURROGATES = {'rbf': RBFSurrogate, 'gp': GPSurrogate}
+
+
+class Screen():
+    """Select the candidates of a generation worth a real evaluation.
+
+    Args:
+        model(str): key of SURROGATES
+        fraction(float): fraction of candidates with the best prediction
+            that are evaluated
+        explore(float): fraction of candidates chosen at random among the
+            rest, that are evaluated as well
+        minpoints(int): number of evaluated points below which all
+            candidates are evaluated; default: 2 * (ndim + 1)
+        kappa(float): ranking is by mean + kappa * std of the predicted
+            score, for models estimating their uncertainty
+        options(dict): passed to the surrogate model
+    """
+    def __init__(self, model='rbf', fraction=0.5, explore=0.1, minpoints=None,
+                 kappa=1., options=None):
+        try:
+            self.surrogate = SURROGATES[model.lower()](**(options or {}))
+        except KeyError:
+            LOGGER.critical('Unknown surrogate model %s; use one of %s',
+                            model, list(SURROGATES.keys()))
+            raise
+        self.fraction = fraction
+        self.explore = explore
+        self.minpoints = minpoints
+        self.kappa = kappa
+        self.nscreened = 0
+        self.nskipped = 0
+
+    def update(self, points, scores):
+        """Add evaluated points and their weighted fitness to the model"""
+        self.surrogate.add(points, scores)
+
+    def select(self, points, rng):
+        """Return sorted indices of points to be evaluated.
+
+        Args:
+            points(array): normalised candidate points
+            rng(random.Random): source of the random exploration choice
+        """
+        npoints = len(points)
+        minpoints = self.minpoints or 2 * (len(points[0]) + 1)
+        if len(self.surrogate) < minpoints:
+            return list(range(npoints))
+        mean, std = self.surrogate.predict(points)
+        if std is not None:
+            mean = mean + self.kappa * std
+        ranked = [int(i) for i in np.argsort(-mean, kind='stable')]
+        nbest = min(npoints, max(1, int(math.ceil(self.fraction * npoints))))
+        rest = ranked[nbest:]
+        nexplore = min(len(rest), int(math.ceil(self.explore * npoints)))
+        selected = sorted(ranked[:nbest] + rng.sample(rest, nexplore))
+        self.nscreened += npoints
+        self.nskipped += npoints - len(selected)
+        return selected
+
+    def __repr__(self):
+        return ('Screen: {}; fraction {}, explore {}; skipped {} of {} '
+                'screened candidates'.format(self.surrogate, self.fraction,
+                                             self.explore, self.nskipped,
+                                             self.nscreened))
+
+
+def get_screen(userinp):
+    """Return a Screen from user input, e.g. {model: gp, fraction: 0.3}"""
+    if not userinp:
+        return None
+    if isinstance(userinp, str):
+        userinp = {'model': userinp}
+    return Screen(**userinp)
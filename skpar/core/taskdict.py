@@ -4,6 +4,7 @@ import subprocess
 import shlex
 import shutil
 import glob
+import threading
 import numpy as np
 from skpar.core.utils import get_ranges, get_logger, islistoflists
 from skpar.core.plot import skparplot
@@ -12,8 +13,15 @@ from skpar.core.database import Query
 
 LOGGER = get_logger(__name__)
 
-def parse_cmd(cmd):
+# matplotlib.pyplot keeps global state, so plotting from concurrent
+# evaluations (threads) must be serialised
+PLOT_LOCK = threading.Lock()
+
+def parse_cmd(cmd, workdir='.'):
     """Parse shell command for globbing and environment variables.
+
+    Globbing patterns are expanded relative to `workdir`, where the
+    command is to be executed, independently of the current directory.
     """
     if not isinstance(cmd, list):
         cmd = shlex.split(cmd)
@@ -25,9 +33,9 @@ def parse_cmd(cmd):
             parsed_cmd.append(varval)
         else:
             if '*' in word:
-                items = glob.glob(word)
-                for item in items:
-                    parsed_cmd.append(item)
+                items = glob.glob(os.path.join(workdir, word))
+                for item in sorted(items):
+                    parsed_cmd.append(os.path.relpath(item, workdir))
             else:
                 parsed_cmd.append(word)
     return parsed_cmd
@@ -36,6 +44,10 @@ def execute(implargs, database, cmd, workdir='.', outfile='run.log',
             purge_workdir=False, **kwargs):
     """Execute external command in workdir, streaming output/error to outfile.
 
+    The command is executed as a subprocess in its own working directory,
+    i.e. the current directory of the calling process is never changed, so
+    that several tasks may be executed concurrently, e.g. in threads.
+
     Args:
         implargs (dict): caller environment variables
         database (dict-like): not used, but needed to maintain a task-signature
@@ -43,7 +55,7 @@ def execute(implargs, database, cmd, workdir='.', outfile='run.log',
                    if it contains `$` or `*`-globbing, these are shell-expanded
         workdir (path-like): execution directory relative to workroot
         outfile (str): output file for the stdout/stderr stream; continuously
-                       updated during execution
+                       updated during execution; relative to `workdir`
         purge_workdir (bool): if true, any existing working directory is purged
         kwargs (dict): passed directly to the underlying `subprocess.call()`
 
@@ -56,7 +68,6 @@ def execute(implargs, database, cmd, workdir='.', outfile='run.log',
         SubprocessError: other possible circumstances
     """
     # prepare workdir
-    origdir = os.getcwd()
     workroot = implargs.get('workroot', '.')
     _workdir = os.path.abspath(os.path.join(workroot, workdir))
     try:
@@ -67,27 +78,29 @@ def execute(implargs, database, cmd, workdir='.', outfile='run.log',
             # that's a bit brutal, but saves to worry of links and subdirs
             shutil.rmtree(_workdir)
             os.makedirs(_workdir)
-    os.chdir(_workdir)
-    # prepare out/err handling
+    # prepare out/err handling; file names are relative to _workdir
+    streams = []
     filename = kwargs.pop('stdout', outfile)
     if filename:
-        kwargs['stdout'] = open(filename, 'w')
+        kwargs['stdout'] = open(os.path.join(_workdir, filename), 'w')
+        streams.append(kwargs['stdout'])
     filename = kwargs.pop('stderr', None)
     if filename:
-        kwargs['stderr'] = open(filename, 'w')
+        kwargs['stderr'] = open(os.path.join(_workdir, filename), 'w')
+        streams.append(kwargs['stderr'])
     else:
         kwargs['stderr'] = subprocess.STDOUT
     # execute the command, make sure output is not streamed
-    _cmd = parse_cmd(cmd)
+    _cmd = parse_cmd(cmd, _workdir)
     try:
-        returncode = subprocess.call(_cmd, **kwargs)
+        returncode = subprocess.call(_cmd, cwd=_workdir, **kwargs)
         if returncode:
             LOGGER.critical('Execution of %s FAILED with exit status %d',
                             _cmd, returncode)
             raise RuntimeError
     #
     except subprocess.SubprocessError:
-        LOGGER.critical('Subprocess call of {:s} FAILED'.format(_cmd))
+        LOGGER.critical('Subprocess call of %s FAILED', _cmd)
         raise
     #
     except (OSError, FileNotFoundError) as exc:
@@ -98,8 +111,8 @@ def execute(implargs, database, cmd, workdir='.', outfile='run.log',
         raise
     #
     finally:
-        # make sure we return to where we started from in any case!
-        os.chdir(origdir)
+        for stream in streams:
+            stream.close()
 
 def get_model_data(implargs, database, item, source, model,
                    rm_columns=None, rm_rows=None, scale=1., **kwargs):
@@ -281,14 +294,17 @@ class PlotTask(object):
         self.plotname = plotname
         # The following are passed to the back end plotting routine
         # (e.g. matplotlib) so pass them directly upon call
-        self.kwargs = kwargs
+        self.kwargs = dict(kwargs)
         # clean up the kwargs that has been processed here
         try:
             del self.kwargs['queries']
         except KeyError:
             pass
+        # objectives are picked, and queries declared, upon first call
+        self.objectives = None
+        self.extra_queries = []
 
-    def pick_objectives(self, objectives, database):
+    def pick_objectives(self, objectives, database=None):
         """Get the references corresponding to the objective tags.
 
         This function acquired the reference data that must be plotted,
@@ -297,8 +313,9 @@ class PlotTask(object):
         itself, since at the time the plot task is being declared,
         the objectives may not yet be. So a separate agency is suppoosed
         to call this method once both objectives and task are declared.
-        Currently this happens within input.py -- at the end of processing
-        of the input file.
+        Currently this happens upon the first call of the task.
+        Queries are declared without a database, which is passed to them
+        upon call, so they serve all subsequent evaluations.
         """
         if isinstance(self.objv_selectors[0], int):
             # Since objectives are declared via a list, indexing is viable
@@ -319,6 +336,7 @@ class PlotTask(object):
                         self.objectives.append(objv)
         # Once we have the objectives, we know also their model names
         # and we can create queries for the abscissa key and extra query keys
+        self.absc_queries = []
         if self.abscissa_key is not None:
             for item in self.objectives:
                 self.absc_queries.append(Query(item.model_names,
@@ -351,12 +369,16 @@ class PlotTask(object):
         """
         # parse implargs first
         logger = implargs.get('logger', LOGGER)
+        workroot = implargs.get('workroot', '.')
         iteration = implargs.get('iteration', None)
         objectives = implargs.get('objectives', None)
         logger.debug('Implicit arguments passed to PlotTask\n%s', implargs)
-        self.pick_objectives(objectives, database)
-        self.func = implargs.get('taskdict', {}).get(self.func, skparplot)
-        logger.debug('Using plotting function %s', self.func)
+        if self.objectives is None:
+            self.pick_objectives(objectives)
+        plotfunc = implargs.get('taskdict', {}).get(self.func, skparplot)
+        logger.debug('Using plotting function %s', plotfunc)
+        # the kwargs of the plot function are updated at each call
+        kwargs = dict(self.kwargs)
         # get xy for plotting
         abscissas  = []
         ordinates  = []
@@ -424,41 +446,47 @@ class PlotTask(object):
                 mn = query.model_names
                 qk = query.key
                 logger.debug("Querying {} for {}:".format(mn, qk))
-                qdata = query(atleast_1d=False)
+                qdata = query(database, atleast_1d=False)
                 # note that plotting routines will not have knowledge
                 # about model names, hence pass on only query key and data
-                self.kwargs[qk] = qdata
+                kwargs[qk] = qdata
 
         # Set colors: draw all objectives with the same color, distinguish
         # only ref vs model unless explicit user spec is given
-        if self.kwargs.get('colors', None) is None:
+        if kwargs.get('colors', None) is None:
             colors = []
             for i in range(int(len(yval)/2.)):
                 # note how yval is composed above:
                 # y1 is ref (blue) y2 is model (orange)
                 colors.append('#1f77b4')
                 colors.append('#ff7f0e')
-            self.kwargs['colors'] = colors
+            kwargs['colors'] = colors
 
         # Tag the plot-name by iteration number; embed it in the plot title
         # and prepare directory where plot is to be saved
-        filename = prepare_for_plotsave(iteration, self.plotname)
-        self.kwargs['title'] = os.path.splitext(os.path.basename(filename))[0]
+        # Note that plotname is relative to workroot, unless absolute.
+        filename = prepare_for_plotsave(iteration,
+                                        os.path.join(workroot, self.plotname))
+        kwargs['title'] = os.path.splitext(os.path.basename(filename))[0]
         # set legend labels (only 2 labels by default, consistent with
         # the colour setting
-        self.kwargs['linelabels'] = ['ref', 'model']
+        kwargs['linelabels'] = ['ref', 'model']
         # Try to plot
         # Ignore subweights for the moment, although these may decorate later,
         # e.g. width of the model bands.
-        # The following self.kwargs are passed:
+        # The following kwargs are passed:
         # title, linelabels, colors, extra queries and extra incoming kwargs.
         # The extra incoming kwargs may contain plot specific stuff, like
         # x/ylimits, etc.
-        self.func(xval, yval, filename=filename, **self.kwargs)
+        with PLOT_LOCK:
+            plotfunc(xval, yval, filename=filename, **kwargs)
 
 
 def wrapper_PlotTask(env, database, *args, **kwargs):
-    """Wrapper around the legacy PlotTask"""
+    """Wrapper around the legacy PlotTask, creating it at each call.
+
+    Note that TASKDICT maps to PlotTask itself, which is set up only once.
+    """
     plot = PlotTask(*args, **kwargs)
     plot(env, database)
 
@@ -475,6 +503,6 @@ TASKDICT = {
     'get': get_model_data,
     'get_data': get_model_data,
     #
-    'plot': wrapper_PlotTask,
-    'plot_objectives': wrapper_PlotTask,
+    'plot': PlotTask,
+    'plot_objectives': PlotTask,
     }
@@ -1,6 +1,9 @@
 """Tasks module, defining relevant classes and functions"""
 import sys
+import inspect
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from skpar.core.utils import get_logger
+from skpar.core.taskstore import get_memo
 
 LOGGER = get_logger(__name__)
 
@@ -53,7 +56,15 @@ def initialise_tasks(tasklist, taskdict, report=False):
         assert isinstance(argslist, (list, tuple)),\
             ("Make sure task arguments are within []; IsString?: {}".\
              format(isinstance(argslist, str)))
-        tasks.append(Task(taskname, func, argslist))
+        task = Task(taskname, func, argslist)
+        if task.after is not None:
+            for dep in task.after:
+                if not 0 <= dep < len(tasks):
+                    LOGGER.critical('Task {:d} ({:s}) cannot run after task {}:'
+                                    ' only preceding tasks are allowed'.\
+                                    format(len(tasks), taskname, dep))
+                    sys.exit(1)
+        tasks.append(task)
 
     if report:
         LOGGER.info("The following tasks will be executed at each iteration.")
@@ -61,6 +72,59 @@ def initialise_tasks(tasklist, taskdict, report=False):
             LOGGER.info("Task {:d}:\t{:s}".format(i, task.__repr__()))
     return tasks
 
+def get_dependencies(tasks):
+    """Return the list of indexes of tasks that each task must wait for.
+
+    A task waits for the tasks declared by its `after` argument, or else
+    for all preceding tasks, which is the sequential execution.
+    """
+    return [list(range(i)) if task.after is None else list(task.after)
+            for i, task in enumerate(tasks)]
+
+def execute_tasks(tasks, env, database, workers=1, logger=LOGGER):
+    """Execute tasks in order, or concurrently, as their dependencies allow.
+
+    Tasks are executed sequentially if `workers` is 1, or if no task
+    declares its dependencies via `after`.
+    Otherwise, up to `workers` tasks run concurrently in threads, each
+    starting once the tasks it depends on are complete.
+    Upon failure of a task, no new task is started, the running ones
+    are completed, and the exception is raised.
+
+    Args:
+        tasks(list): Task instances, as returned by `initialise_tasks()`
+        env(dict): environment passed to each task
+        database(object): model database passed to each task
+        workers(int): maximum number of concurrently running tasks
+        logger(object): logger reporting a failure
+    """
+    if workers <= 1 or all(task.after is None for task in tasks):
+        for i, task in enumerate(tasks):
+            try:
+                task(env, database)
+            except:
+                logger.critical('Task %i FAILED:\n%s', i, task)
+                raise
+        return
+    dependencies = get_dependencies(tasks)
+    pending = list(range(len(tasks)))
+    done = set()
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            for i in [i for i in pending
+                      if all(dep in done for dep in dependencies[i])]:
+                pending.remove(i)
+                running[executor.submit(tasks[i], env, database)] = i
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = running.pop(future)
+                if future.exception() is not None:
+                    logger.critical('Task %i FAILED:\n%s', i, tasks[i])
+                    wait(running)
+                    raise future.exception()
+                done.add(i)
+
 
 class Task():
     """Generic wrapper over functions or executables.
@@ -76,6 +140,30 @@ class Task():
               then fargs[-1] becomes **kwargs while fargs[:-1] becomes *args
               for the function call
 
+        Note: `after` in the kwargs is not passed to the function, but
+              declares the index (or a list of indexes) of preceding tasks
+              that must complete before this task starts; see
+              `execute_tasks()`
+
+        Note: `memo` in the kwargs is not passed to the function either,
+              but declares the input and output files of the task (and the
+              parameters it uses), so that its outputs may be restored
+              from a store instead of executing the task; see `taskstore`
+
+        Note: if `func` (or the object it creates) has a true attribute
+              `vectorised`, the task accepts the parameter values of many
+              points at once, as an array of shape (npoints, nparameters),
+              and puts their model data in the database stacked along
+              the first axis; see `Evaluator._evaluate_stacked()`.
+              Memoised tasks are not vectorised, since their outputs are
+              stored point by point.
+
+        Note: if `func` is a class, it is instantiated here with `fargs`,
+              i.e. once per run, so that argument parsing, query
+              declaration etc. are not repeated at each evaluation;
+              the instance is then called with the environment and the
+              database only.
+
         Args:
             name(str): name of the task (to appear in logs)
             func(callable): the function being called by __call__()
@@ -86,10 +174,23 @@ class Task():
         # treat last argument as kwargs if dict
         if isinstance(fargs[-1], dict):
             self.args = fargs[:-1]
-            self.kwargs = fargs[-1]
+            self.kwargs = dict(fargs[-1])
         else:
             self.args = fargs
             self.kwargs = {}
+        after = self.kwargs.pop('after', None)
+        if after is not None and not isinstance(after, (list, tuple)):
+            after = [after]
+        self.after = after
+        self.memo = get_memo(self.kwargs.pop('memo', None))
+        if inspect.isclass(func):
+            self.target = func(*self.args, **self.kwargs)
+            self.targs, self.tkwargs = [], {}
+        else:
+            self.target = func
+            self.targs, self.tkwargs = self.args, self.kwargs
+        self.vectorised = bool(getattr(self.target, 'vectorised', False)) and\
+            self.memo is None
     #
     def __call__(self, env, database):
         """Execute the task, let caller handle any exception raised by func
@@ -99,7 +200,15 @@ class Task():
             database(object or dict): a database object serving for data
                                       exchange
         """
-        self.func(env, database, *self.args, **self.kwargs)
+        store = env.get('taskstore', None)
+        if self.memo is not None and store is not None:
+            store(self, env, database)
+        else:
+            self.execute(env, database)
+    #
+    def execute(self, env, database):
+        """Call the underlying function (or set-up object) of the task"""
+        self.target(env, database, *self.targs, **self.tkwargs)
     #
     def __repr__(self):
         """Yield a summary of the task.
@@ -113,4 +222,10 @@ class Task():
             srepr.append('\t\t\t{:d} kwargs: {:s}'.format(len(self.kwargs.keys()),
                ', '.join(['{}: {}'.format(key, val) for key, val in
                           self.kwargs.items()])))
+        if self.after is not None:
+            srepr.append('\t\t\t   after: {}'.format(self.after))
+        if self.memo is not None:
+            srepr.append('\t\t\t    memo: {}'.format(self.memo))
+        if self.vectorised:
+            srepr.append('\t\t\tvectorised')
         return "\n".join(srepr)
@@ -0,0 +1,193 @@
+"""Content-addressed store of the outputs of tasks, for their memoisation.
+
+A task declaring its input and output files by `memo` in its kwargs, e.g.::
+
+    - run: [skgen, skf, {memo: {inputs: [skf/skdefs.py, skf/*.dat],
+                                outputs: ['skf/*.skf']}}]
+
+is fingerprinted by its name, function and arguments, the contents of its
+input files and the values of the parameters it declares to use (if any).
+The command of a task running an executable is fingerprinted as it is
+executed, i.e. with environment variables and globs expanded and the
+executable resolved on the PATH.
+The output files produced by the task are then stored under the
+fingerprint, and if a later evaluation finds the same fingerprint, the
+outputs are copied from the store, instead of executing the task.
+
+This is useful when a task depends on a subset of the parameters only,
+e.g. an skgen step for one pair of elements does not change when a
+parameter of another pair moves.
+
+.. note:: Only files declared as outputs are restored; a memoised task
+    must therefore have no other effect, e.g. on the model database.
+"""
+import os
+import glob
+import uuid
+import shutil
+import hashlib
+import inspect
+from skpar.core.utils import get_logger
+from skpar.core.taskdict import parse_cmd
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_TASK_STORE = '_taskstore'
+
+def get_memo(userinp):
+    """Parse the `memo` declaration of a task into a dictionary of lists"""
+    if userinp is None:
+        return None
+    memo = {}
+    for key in ['inputs', 'outputs', 'parameters']:
+        val = userinp.get(key, None) or []
+        memo[key] = [val] if isinstance(val, str) else list(val)
+    if not memo['outputs']:
+        LOGGER.critical('Task memoisation needs outputs: %s', userinp)
+        raise ValueError('memo of a task has no outputs')
+    return memo
+
+def expand(patterns, workroot):
+    """Return sorted paths relative to workroot, matching glob patterns"""
+    paths = set()
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(workroot, pattern)):
+            paths.add(os.path.relpath(path, workroot))
+    return sorted(paths)
+
+def hash_file(sha, path, blocksize=2**20):
+    """Update the hash `sha` with the contents of the file `path`"""
+    with open(path, 'rb') as fin:
+        for block in iter(lambda: fin.read(blocksize), b''):
+            sha.update(block)
+
+def get_command(task, workroot):
+    """Return the command run by `task`, as executed, or None.
+
+    A task running an executable (e.g. `execute` of skpar.core.taskdict)
+    has the arguments `cmd` and `workdir`, relative to workroot. The
+    command is parsed as by `parse_cmd()`, in that directory, and the
+    executable, if given by name, is resolved on the PATH.
+    """
+    try:
+        bound = inspect.signature(task.target).bind(None, None, *task.targs,
+                                                    **task.tkwargs)
+    except (TypeError, ValueError):
+        return None
+    bound.apply_defaults()
+    if 'cmd' not in bound.arguments:
+        return None
+    workdir = os.path.join(workroot, bound.arguments.get('workdir', '.'))
+    cmd = parse_cmd(bound.arguments['cmd'], workdir)
+    if not os.path.dirname(cmd[0]):
+        cmd[0] = shutil.which(cmd[0]) or cmd[0]
+    return cmd
+
+
+class TaskStore():
+    """Directory of task outputs, one sub-directory per fingerprint.
+
+    Only the path to the directory is kept, so the store can be pickled
+    and shared by evaluations in concurrent processes. An entry is written
+    to a temporary directory which is then renamed, so that concurrent
+    evaluations see either a complete entry, or none.
+    """
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def fingerprint(self, task, workroot, env):
+        """Return the hex-digest of the fingerprint of `task`.
+
+        Args:
+            task(object): Task instance with a `memo` attribute
+            workroot(str): directory of the evaluation; input files
+                are relative to it
+            env(dict): environment of the evaluation, with parameter
+                names and values
+        """
+        sha = hashlib.sha1()
+        sha.update(repr((task.name, getattr(task.func, '__name__', None),
+                         task.args, sorted(task.kwargs.items()))).encode())
+        # the raw command may not tell what is run, e.g. with $VAR
+        cmd = get_command(task, workroot)
+        if cmd is not None:
+            sha.update(repr(cmd).encode())
+        for relpath in expand(task.memo['inputs'], workroot):
+            sha.update(relpath.encode())
+            path = os.path.join(workroot, relpath)
+            if os.path.isdir(path):
+                for root, dirnames, filenames in os.walk(path):
+                    dirnames.sort()
+                    for name in sorted(filenames):
+                        sha.update(os.path.relpath(os.path.join(root, name),
+                                                   workroot).encode())
+                        hash_file(sha, os.path.join(root, name))
+            else:
+                hash_file(sha, path)
+        if task.memo['parameters']:
+            # values may come as a list or as a NumPy row, depending on
+            # the engine; neither may be tested for truth
+            names = env.get('parameternames', None)
+            values = env.get('parametervalues', None)
+            if names is None or values is None:
+                parameters = {}
+            else:
+                parameters = dict(zip(list(names),
+                                      [float(val) for val in values]))
+            for name in task.memo['parameters']:
+                sha.update(repr((name, parameters.get(name, None))).encode())
+        return sha.hexdigest()
+
+    def get_entry(self, key):
+        """Return the directory of the entry `key`"""
+        return os.path.join(self.root, key[:2], key)
+
+    def restore(self, key, workroot):
+        """Copy the outputs stored under `key` into workroot.
+
+        Return False if there is no such entry.
+        """
+        entry = self.get_entry(key)
+        if not os.path.isdir(entry):
+            return False
+        shutil.copytree(entry, workroot, symlinks=True, dirs_exist_ok=True)
+        return True
+
+    def save(self, key, outputs, workroot):
+        """Store the files matching `outputs` patterns under `key`"""
+        paths = expand(outputs, workroot)
+        if not paths:
+            LOGGER.warning('No outputs matching %s in %s; nothing to store',
+                           outputs, workroot)
+            return
+        entry = self.get_entry(key)
+        tmpentry = os.path.join(self.root, 'tmp-{}'.format(uuid.uuid4().hex))
+        for relpath in paths:
+            src = os.path.join(workroot, relpath)
+            dst = os.path.join(tmpentry, relpath)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if os.path.isdir(src) and not os.path.islink(src):
+                shutil.copytree(src, dst, symlinks=True, dirs_exist_ok=True)
+            else:
+                shutil.copy2(src, dst, follow_symlinks=False)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        try:
+            os.rename(tmpentry, entry)
+        except OSError:
+            # the same entry was stored concurrently
+            shutil.rmtree(tmpentry)
+
+    def __call__(self, task, env, database):
+        """Execute `task` unless its outputs can be restored from the store"""
+        logger = env.get('logger', LOGGER)
+        workroot = env.get('workroot', '.')
+        key = self.fingerprint(task, workroot, env)
+        if self.restore(key, workroot):
+            logger.debug('Task %s: outputs restored from %s',
+                         task.name, self.get_entry(key))
+            return
+        task.execute(env, database)
+        self.save(key, task.memo['outputs'], workroot)
+
+    def __repr__(self):
+        return 'TaskStore: {}'.format(self.root)
@@ -0,0 +1,145 @@
+"""
+Vectorised Particle Swarm Optimizer (VPSO)
+======================================================================
+
+This module realises the same particle swarm algorithm as the PSO module,
+but the swarm is represented by NumPy arrays of shape (npart, ndim) --
+positions, past positions, speeds and personal best positions, together
+with the norm and shift of each dimension -- instead of a list of DEAP
+particles. The update of the whole swarm, the clamping of speeds, the
+bounce off strict bounds and the renormalisation are therefore done in a
+few array operations, which matters for large swarms and for cheap
+(e.g. surrogate or in-process) models, where the bookkeeping of the PSO
+would otherwise dominate.
+
+As in PSO, positions are normalised to [-1, +1] in each dimension, and
+the renormalised position, :math:`\\lambda = P/\\eta + \\sigma`, is passed
+for evaluation. The random numbers come from a NumPy generator, so the
+sequence of particles differs from that of PSO for the same seed.
+"""
+import numpy as np
+from skpar.core.utils import get_logger
+from skpar.core.evaluate import batch_evaluate
+from skpar.core.engine import BatchEngine, get_ranges, get_stats
+
+module_logger = get_logger('skpar.vpso')
+
+
+def evolve_swarm(position, past, speed, best, gbest, u1, u2, inertia=0.7298,
+                 smin=-1.0, smax=1.0, strict_bounds=True):
+    """Update speeds and positions of all particles, as `evolveParticle`.
+
+    Args:
+        position, past, speed, best(array): normalised current positions,
+            past positions, speeds and personal best positions, each of
+            shape (npart, ndim); position, past and speed are updated
+        gbest(array): normalised global best position, shape (ndim,)
+        u1, u2(array): random factors of the personal and global best
+            terms, uniform in [0, acceleration/2], shape (npart, ndim)
+        inertia(float): factor scaling the persistence of the particles
+        smin, smax(float): speed limits
+        strict_bounds(bool): bounce particles off the boundaries [-1, 1]
+
+    Returns:
+        number of escapes through the boundaries
+    """
+    speed[:] = inertia * (position - past) + u1 * (best - position) +\
+        u2 * (gbest - position)
+    past[:] = position
+    np.clip(speed, smin, smax, out=speed)
+    position += speed
+    nescaped = 0
+    if strict_bounds:
+        # reverse the excess travel, as in evolveParticle
+        above = position > 1
+        below = position < -1
+        nescaped = np.count_nonzero(above) + np.count_nonzero(below)
+        position[above] = 2 - position[above]
+        position[below] = -2 - position[below]
+    return nescaped
+
+
+class VPSO(BatchEngine):
+    """
+    Class defining a Particle-Swarm Optimizer with a vectorised swarm.
+    """
+    name = 'VPSO'
+    statekeys = ['position', 'past', 'speed', 'best', 'bestscore', 'gbest',
+                 'gbestfit', 'gbestscore', 'gbest_iteration', 'halloffame',
+                 'stats_record']
+
+    # see J. Kennedy "Particle Swarm Optimization" in "Encyclopedia of machine learning" (2010).
+    pInertia = 0.7298
+    pAcceleration = 2.9922
+
+    def __init__(self, parameters, evaluate, npart=10, ngen=100,
+                 objective_weights=(-1,), ErrTol=0.001, *args, **kwargs):
+        """
+        Create a particle swarm
+        """
+        super().__init__(evaluate, objective_weights, ngen, ErrTol, **kwargs)
+        self.logger = module_logger
+        self.parnames, parrange, _ = get_ranges(parameters, self.name)
+        self.npart = npart
+        self.strict_bounds = kwargs.get('strict_bounds', True)
+        # normalisation, as in createParticle
+        pmin, pmax = -1.0, 1.0
+        self.smin, self.smax = -1.0, 1.0
+        self.norm = (pmax - pmin) / (parrange[:, 1] - parrange[:, 0])
+        self.shift = 0.5 * (parrange[:, 1] + parrange[:, 0])
+        shape = (npart, len(parrange))
+        self.position = self.rng.uniform(pmin, pmax, shape)
+        self.past = self.rng.uniform(pmin, pmax, shape)
+        self.speed = self.rng.uniform(self.smin, self.smax, shape)
+        # personal and global best, with their weighted fitness;
+        # unlike other engines, gbest is normalised
+        self.best = self.position.copy()
+        self.bestscore = np.full(npart, -np.inf)
+
+    @property
+    def renormalized(self):
+        """True (physical) coordinates of the particles"""
+        return self.position / self.norm + self.shift
+
+    def get_output(self):
+        return self.renormalized
+
+    def _evolve(self, ngen, mapper=None):
+        """Evaluate and evolve the swarm for ngen generations."""
+        for g in range(self.gen0, ngen):
+            iterations = [(g, i) for i in range(self.npart)]
+            positions = self.renormalized
+            fitness = np.array(batch_evaluate(self.evaluate, list(positions),
+                                              iterations, self.nworkers,
+                                              self.pool, mapper), dtype=float)
+            fitness = fitness.reshape(self.npart, -1)
+            score = self.get_score(fitness)
+            # personal best
+            improved = score > self.bestscore
+            self.best[improved] = self.position[improved]
+            self.bestscore[improved] = score[improved]
+            # global best, the first of equally good particles
+            ibest = int(np.argmax(score))
+            if score[ibest] > self.gbestscore:
+                self.gbestscore = score[ibest]
+                self.gbest = self.position[ibest].copy()
+                self.gbestfit = tuple(fitness[ibest])
+                self.gbest_iteration = iterations[ibest]
+            self.update_halloffame(fitness, score, positions, iterations)
+            points = self.position.copy()
+            # update particles only after full evaluation of the swarm
+            u1 = self.rng.uniform(0, self.pAcceleration / 2, self.position.shape)
+            u2 = self.rng.uniform(0, self.pAcceleration / 2, self.position.shape)
+            nescaped = evolve_swarm(self.position, self.past, self.speed,
+                                    self.best, self.gbest, u1, u2,
+                                    self.pInertia, self.smin, self.smax,
+                                    self.strict_bounds)
+            if nescaped:
+                self.logger.warning('Generation %d: %d escapes through the '
+                                    'boundaries bounced back', g, nescaped)
+            self.stats_record.append(get_stats(fitness))
+            if self.end_generation(g, ngen, points):
+                break
+
+    def get_best_parameters(self):
+        return self.gbest / self.norm + self.shift
@@ -0,0 +1,353 @@
+"""Creation and removal of the working directories of individual evaluations.
+
+Each evaluation may be executed in its own working directory, which is
+materialised from a template directory. The template is either copied
+as a whole (the default), or only files that are modified by the tasks
+are copied, while the rest are hard-linked or symbolically linked to the
+template. The latter saves most of the I/O and disk space when the
+template contains large files that tasks only read, e.g. SK-tables,
+charge files or structures.
+
+A file is copied (rather than linked) if:
+
+    * it matches ``*template.*``, i.e. it is a template for parameter
+      substitution, or it is the result of substitution of such a template;
+
+    * it matches one of the patterns declared as `writable` by the user,
+      i.e. files that are modified in-place by the executables.
+
+.. note:: Any file that an executable opens for writing must be declared
+    as `writable`, else writing through the link modifies the template!
+
+Alternatively, a fixed pool of work directories may be materialised once,
+and recycled by successive evaluations: upon acquisition, a directory is
+reset to the state of the template, by removing any file that is not in
+the template, and by restoring any template file that has been modified.
+A directory is locked by a file naming the host and process that holds it,
+so that pools of concurrent runs (e.g. shards) sharing a work root only
+remove the locks of processes that are gone.
+"""
+import os
+import time
+import uuid
+import socket
+import shutil
+from fnmatch import fnmatch
+from skpar.core.utils import get_logger
+
+LOGGER = get_logger(__name__)
+
+MATERIALISE_MODES = ['copy', 'hardlink', 'symlink']
+
+# files matching these patterns are always copied
+TEMPLATE_PATTERNS = ['*template.*']
+
+def get_workdir(iteration, workroot):
+    """Find what is the root of the work-tree at a given iteration"""
+    if workroot is None:
+        workdir = None
+    else:
+        if iteration is None:
+            myworkdir = 'noiter'
+        else:
+            try:
+                myworkdir = '-'.join([str(it) for it in iteration])
+            except TypeError:
+                myworkdir = str(iteration)
+        workdir = os.path.abspath(os.path.join(workroot, myworkdir))
+    return workdir
+
+
+def get_writable(templatedir, writable=None):
+    """Return the set of files in `templatedir` that must be copied.
+
+    Args:
+        templatedir(str): template directory
+        writable(list): patterns of files declared as writable by user;
+            a pattern is matched against both the file name and its path
+            relative to `templatedir`
+
+    Returns:
+        set of paths relative to `templatedir`
+    """
+    patterns = TEMPLATE_PATTERNS + list(writable or [])
+    files = set()
+    for root, _, filenames in os.walk(templatedir):
+        for name in filenames:
+            relpath = os.path.relpath(os.path.join(root, name), templatedir)
+            if any(fnmatch(name, pp) or fnmatch(relpath, pp)
+                   for pp in patterns):
+                files.add(relpath)
+                # the result of a parameter substitution is written next
+                # to the template, see parameters.update_parameters()
+                if 'template.' in name:
+                    files.add(os.path.join(os.path.dirname(relpath),
+                                           name.replace('template.', '')))
+    return files
+
+
+def place_file(src, dst, mode='copy'):
+    """Place a copy, a hard link, or a symbolic link of `src` at `dst`.
+
+    Symbolic links are reproduced as they are. If a hard link cannot be
+    created (e.g. across file systems), the file is copied instead.
+    """
+    if os.path.islink(src):
+        os.symlink(os.readlink(src), dst)
+    elif mode == 'copy':
+        shutil.copy2(src, dst)
+    elif mode == 'symlink':
+        os.symlink(os.path.abspath(src), dst)
+    else:
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+
+def materialise(templatedir, workdir, mode='hardlink', writable=None):
+    """Replicate the tree of `templatedir` in `workdir`, linking its files.
+
+    Directories are always created; files in `get_writable()` are copied,
+    while the rest are hard-linked or symbolically linked, depending on
+    `mode`. Symbolic links in the template are reproduced as they are.
+    """
+    copyfiles = get_writable(templatedir, writable)
+    for root, dirnames, filenames in os.walk(templatedir):
+        reldir = os.path.relpath(root, templatedir)
+        dstdir = os.path.normpath(os.path.join(workdir, reldir))
+        os.makedirs(dstdir, exist_ok=True)
+        for name in dirnames + filenames:
+            src = os.path.join(root, name)
+            relpath = os.path.normpath(os.path.join(reldir, name))
+            if os.path.isdir(src) and not os.path.islink(src):
+                continue
+            place_file(src, os.path.join(dstdir, name),
+                       'copy' if relpath in copyfiles else mode)
+        # do not descend into symbolic links to directories
+        dirnames[:] = [dd for dd in dirnames
+                       if not os.path.islink(os.path.join(root, dd))]
+
+
+def create_workdir(workdir, templatedir, mode='copy', writable=None):
+    """Create a new and clean work directory tree from template
+
+    Args:
+        workdir(str): the work directory to be created; purged if exists
+        templatedir(str): template directory; may be None
+        mode(str): 'copy' the whole template, or 'hardlink' or 'symlink'
+            files that are not writable (see `materialise()`)
+        writable(list): patterns of file names that must be copied
+    """
+    if workdir is None:
+        return
+    if os.path.exists(workdir):
+        shutil.rmtree(workdir)
+    if templatedir is not None:
+        if mode == 'copy':
+            shutil.copytree(templatedir, workdir, symlinks=True)
+        else:
+            materialise(templatedir, workdir, mode, writable)
+    else:
+        os.mkdir(workdir)
+
+
+def destroy_workdir(workdir):
+    """Remove the entire work directory tree"""
+    if workdir is not None:
+        shutil.rmtree(workdir)
+
+
+def get_manifest(templatedir):
+    """Return {relative path: signature} for all entries of `templatedir`.
+
+    The signature of a file is its size and modification time (both are
+    preserved by copying, as well as by linking), while directories and
+    symbolic links are signed by their type (and target).
+    """
+    manifest = {}
+    for root, dirnames, filenames in os.walk(templatedir):
+        for name in dirnames + filenames:
+            path = os.path.join(root, name)
+            relpath = os.path.relpath(path, templatedir)
+            if os.path.islink(path):
+                manifest[relpath] = ('link', os.readlink(path))
+            elif os.path.isdir(path):
+                manifest[relpath] = ('dir', None)
+            else:
+                stat = os.stat(path)
+                manifest[relpath] = ('file', (stat.st_size, stat.st_mtime_ns))
+        dirnames[:] = [dd for dd in dirnames
+                       if not os.path.islink(os.path.join(root, dd))]
+    return manifest
+
+
+def get_signature(path):
+    """Return the signature of `path`, as recorded by `get_manifest()`"""
+    if os.path.islink(path):
+        return ('link', os.readlink(path))
+    if os.path.isdir(path):
+        return ('dir', None)
+    stat = os.stat(path)
+    return ('file', (stat.st_size, stat.st_mtime_ns))
+
+
+def get_lock_owner():
+    """Return the identity of this process, as written in lock files"""
+    return '{} {:d}'.format(socket.gethostname(), os.getpid())
+
+
+def is_stale(lockfile):
+    """Return True if `lockfile` is held by a process that no longer exists.
+
+    Only a process of this host can be checked; locks of other hosts, locks
+    of this process and locks without an owner (e.g. just being created) are
+    not stale.
+    """
+    try:
+        with open(lockfile, 'r') as fin:
+            host, pid = fin.read().split()
+        pid = int(pid)
+    except (OSError, ValueError):
+        return False
+    if os.name != 'posix' or host != socket.gethostname() or\
+            pid == os.getpid():
+        return False
+    try:
+        # signal 0 checks the existence of the process only
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def remove_stale_lock(lockfile):
+    """Remove `lockfile` if it is stale; return True if removed.
+
+    The lock is first moved aside and checked again, so that a lock taken
+    anew by a concurrent process in the meantime is put back, not removed.
+    """
+    if not is_stale(lockfile):
+        return False
+    aside = '{}.{}'.format(lockfile, uuid.uuid4().hex)
+    try:
+        os.rename(lockfile, aside)
+    except OSError:
+        return False
+    if is_stale(aside):
+        os.remove(aside)
+        return True
+    os.rename(aside, lockfile)
+    return False
+
+
+class WorkdirPool():
+    """A fixed set of work directories, recycled by successive evaluations.
+
+    Directories are materialised from the template only once, upon their
+    first use. A directory is acquired by an evaluation through a lock file,
+    which works across both threads and processes, and is reset to the
+    state of the template before it is handed over. The lock file holds
+    the host name and process id of the evaluation.
+    """
+    def __init__(self, workroot, templatedir, size, mode='copy', writable=None):
+        """Declare the pool and remove stale locks of preceding runs.
+
+        A lock is stale if the process holding it is gone; locks held by
+        running processes, e.g. concurrent runs in the same work root,
+        are kept, and their directories are skipped until released.
+
+        Args:
+            workroot(str): directory where pool directories are created
+            templatedir(str): template directory; may be None
+            size(int): number of directories, i.e. of concurrent evaluations
+            mode(str): materialisation mode of the template
+            writable(list): patterns of file names that must be copied
+        """
+        self.workroot = os.path.abspath(workroot)
+        self.templatedir = templatedir
+        self.mode = mode
+        self.writable = writable
+        self.slots = [os.path.join(self.workroot, 'pool-{:d}'.format(i))
+                      for i in range(size)]
+        if templatedir is not None:
+            self.manifest = get_manifest(templatedir)
+            self.copyfiles = get_writable(templatedir, writable)
+        else:
+            self.manifest = {}
+            self.copyfiles = set()
+        os.makedirs(self.workroot, exist_ok=True)
+        for slot in self.slots:
+            lockfile = slot + '.lock'
+            if os.path.exists(lockfile) and not remove_stale_lock(lockfile):
+                LOGGER.warning('%s is locked by a running process, or one of '
+                               'another host; remove the lock if it is not',
+                               slot)
+
+    def acquire(self, wait=0.1):
+        """Lock a free directory, reset it, and return its path.
+
+        If all directories are in use, try again after `wait` seconds.
+        """
+        while True:
+            for slot in self.slots:
+                try:
+                    fd = os.open(slot + '.lock',
+                                 os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                except FileExistsError:
+                    continue
+                try:
+                    os.write(fd, get_lock_owner().encode())
+                finally:
+                    os.close(fd)
+                if os.path.exists(slot):
+                    self.reset(slot)
+                else:
+                    create_workdir(slot, self.templatedir, self.mode,
+                                   self.writable)
+                return slot
+            time.sleep(wait)
+
+    def release(self, workdir):
+        """Make the directory available to other evaluations"""
+        os.remove(workdir + '.lock')
+
+    def reset(self, workdir):
+        """Bring `workdir` back to the state of the template.
+
+        Entries not in the template (i.e. outputs of the tasks) are
+        removed, and template files that are modified, replaced or
+        removed are restored.
+        """
+        for root, dirnames, filenames in os.walk(workdir):
+            for name in dirnames + filenames:
+                path = os.path.join(root, name)
+                relpath = os.path.relpath(path, workdir)
+                entry = self.manifest.get(relpath, None)
+                if entry is not None and entry == get_signature(path):
+                    continue
+                if os.path.isdir(path) and not os.path.islink(path):
+                    if entry is None:
+                        shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            dirnames[:] = [dd for dd in dirnames
+                           if os.path.isdir(os.path.join(root, dd)) and
+                           not os.path.islink(os.path.join(root, dd))]
+        # restore missing entries in the order of the walk of the template
+        for relpath, (kind, _) in sorted(self.manifest.items()):
+            path = os.path.join(workdir, relpath)
+            if os.path.lexists(path):
+                continue
+            src = os.path.join(self.templatedir, relpath)
+            if kind == 'dir':
+                os.makedirs(path, exist_ok=True)
+            else:
+                place_file(src, path, 'copy' if relpath in self.copyfiles
+                           else self.mode)
+
+    def __repr__(self):
+        return 'WorkdirPool: {:d} directories under {}'.\
+            format(len(self.slots), self.workroot)
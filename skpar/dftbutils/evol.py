@@ -75,13 +75,11 @@ def main_evol(args):
     # sub-folder for each volume.
     workdir = abspath(expanduser(args.workdir))
     sccdir  = args.sccdir
-    cwd = os.getcwd()
-    os.chdir(workdir)
     # Automatically establish the available directories for different volumes.
     # We are imposing that under strain directory there is an `scc` directory,
     # which may not be such a good idea, but allows to have also `bs` for a
     # given strain.
-    strain_dirs = [dd for dd in os.listdir() if dd.isdigit()]
+    strain_dirs = [dd for dd in os.listdir(workdir) if dd.isdigit()]
     for _dir in strain_dirs:
         calcdir = joinpath(workdir, _dir, sccdir)
         execute(cmd=dftb, workdir=calcdir, outfile=dftblog)
@@ -90,5 +88,4 @@ def main_evol(args):
         # diffusing the problem through attempts of subsequent operations.
         # check_dftblog is a bash script in skpar/bin/ but this can be moved to
         # python instead
-        execute(cmd=['check_dftblog', dftblog], workdir=sccdir, outfile='chk.log')
-    os.chdir(cwd)
+        execute(cmd=['check_dftblog', dftblog], workdir=calcdir, outfile='chk.log')
@@ -1,6 +1,7 @@
 import sys
 import os
 import logging
+import threading
 from os.path import abspath, expanduser, isdir
 from os.path import join as joinpath
 from math import pi
@@ -19,6 +20,13 @@ hbar = 1.054572e-34 # [J.s] reduced Planck's constant (h/2pi)
 q0 = 1.602176e-19   # [C] electron charge
 m0 = 9.10938e-31    # [kg] electron rest mass
 
+# Lattice and k-path data of band-structures, by lattice info and input of
+# dftb+; these are the same at every evaluation of a run, so they are
+# computed upon the first evaluation only. The last KPATHS_SIZE are kept.
+KPATHS = OrderedDict()
+KPATHS_SIZE = 8
+KPATHS_LOCK = threading.Lock()
+
 def get_labels(ss):
     """Return two labels from a string containing "-" or two words starting with a capital.
 
@@ -164,22 +172,18 @@ def get_dftbp_evol(implargs, database, source, model,
     logger = implargs.get('logger', LOGGER)
     workroot = implargs.get('workroot', '.')
     # In order to collect the tags that identify individual directories
-    # corresponding to a given cell-volume, we must go in the base
+    # corresponding to a given cell-volume, we must look in the base
     # directory, which includes workroot/source
-    cwd = os.getcwd()
     workdir = joinpath(abspath(expanduser(workroot)), source)
-    os.chdir(workdir)
     logger.info('Looking for Energy-vs-Strain data in {:s}'.format(workdir))
     # the following should be modifiable by command options
     logger.info('Assuming strain directories are named by digits only.')
-    sccdirs = [dd for dd in os.listdir() if dd.isdigit()]
+    sccdirs = [dd for dd in os.listdir(workdir) if dd.isdigit()]
     # These come in a disordered way.
     # But it is pivotal that the names are sorted, so that correspondence
     # with reference data can be established!
     sccdirs.sort()
     logger.info('The following SCC directories are found:\n{}'.format(sccdirs))
-    # make sure we return back
-    os.chdir(cwd)
     # go over individual volume directories and obtain the data
     e_tot = []
     e_elec = []
@@ -309,15 +313,7 @@ def get_bandstructure(implargs, database, source, model,
     data = Bandstructure.fromfiles(fin1, fin2)
     #
     if latticeinfo is not None:
-        lattice = Lattice(latticeinfo)
-        kLines, kLinesDict = get_klines(lattice, hsdfile=fin3)
-        kvec, kticks, klabels = get_kvec_abscissa(lattice, kLines)
-        data.update({'lattice': lattice,
-                     'kLines': kLines,
-                     'kLinesDict': kLinesDict,
-                     'kvector': kvec,
-                     'kticklabels': list(zip(kticks, klabels)),
-                    })
+        data.update(get_kpath(latticeinfo, fin3))
         #logger.debug(data['lattice'])
         #logger.debug(data['kLines'])
         #logger.debug(data['kLinesDict'])
@@ -328,6 +324,43 @@ def get_bandstructure(implargs, database, source, model,
         # model not in database
         database.update({model: data})
 
+def get_kpath(latticeinfo, hsdfile):
+    """Return the lattice and k-path data of a band-structure calculation.
+
+    The lattice is set by `latticeinfo`, and the k-lines are read from
+    `hsdfile`, the (parsed) input of dftb+. The result is cached by the
+    lattice info and the contents of `hsdfile`, so that each evaluation
+    reads the input file, but does not repeat the analysis of the k-path.
+    """
+    with open(hsdfile, 'r') as fh:
+        key = (repr(latticeinfo), fh.read())
+    with KPATHS_LOCK:
+        kpath = KPATHS.get(key, None)
+        if kpath is not None:
+            KPATHS.move_to_end(key)
+    if kpath is None:
+        lattice = Lattice(latticeinfo)
+        kLines, kLinesDict = get_klines(lattice, hsdfile=hsdfile)
+        kvec, kticks, klabels = get_kvec_abscissa(lattice, kLines)
+        kpath = {'lattice': lattice,
+                 'kLines': kLines,
+                 'kLinesDict': kLinesDict,
+                 'kvector': kvec,
+                 'kticklabels': list(zip(kticks, klabels)),
+                }
+        with KPATHS_LOCK:
+            KPATHS[key] = kpath
+            while len(KPATHS) > KPATHS_SIZE:
+                KPATHS.popitem(last=False)
+    # each model gets its own containers; the lattice is shared
+    return {'lattice': kpath['lattice'],
+            'kLines': list(kpath['kLines']),
+            'kLinesDict': {lbl: list(ixs) for lbl, ixs in
+                           kpath['kLinesDict'].items()},
+            'kvector': np.array(kpath['kvector']),
+            'kticklabels': list(kpath['kticklabels']),
+           }
+
 # ----------------------------------------------------------------------
 # Effective masses
 # ----------------------------------------------------------------------
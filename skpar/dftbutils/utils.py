@@ -8,8 +8,11 @@ import shlex
 import glob
 import logging
 
-def parse_cmd(cmd):
+def parse_cmd(cmd, workdir='.'):
     """Parse shell command for globbing and environment variables.
+
+    Globbing patterns are expanded relative to `workdir`, where the
+    command is to be executed, independently of the current directory.
     """
     if not isinstance(cmd, list):
         cmd = shlex.split(cmd)
@@ -21,9 +24,9 @@ def parse_cmd(cmd):
             parsed_cmd.append(varval)
         else:
             if '*' in word:
-                items = glob.glob(word)
-                for item in items:
-                    parsed_cmd.append(item)
+                items = glob.glob(os.path.join(workdir, word))
+                for item in sorted(items):
+                    parsed_cmd.append(os.path.relpath(item, workdir))
             else:
                 parsed_cmd.append(word)
     return parsed_cmd
@@ -31,12 +34,15 @@ def parse_cmd(cmd):
 def execute(cmd, workdir='.', outfile='run.log', purge_workdir=False, **kwargs):
     """Execute external command in workdir, streaming output/error to outfile.
 
+    The command is executed as a subprocess in `workdir`, without changing
+    the current directory of the calling process.
+
     Args:
         cmd (str): command; executed in `workir`; if it contains `$` or 
                    `*`-globbing, these are shell-expanded
         workdir (path-like): execution directory relative to workroot
         outfile (str): output file for the stdout/stderr stream; continuously
-                       updated during execution
+                       updated during execution; relative to `workdir`
         purge_workdir (bool): if true, any existing working directory is purged
         kwargs (dict): passed directly to the underlying `subprocess.call()`
 
@@ -49,48 +55,50 @@ def execute(cmd, workdir='.', outfile='run.log', purge_workdir=False, **kwargs):
         SubprocessError: other possible circumstances
     """
     # prepare workdir
-    origdir = os.getcwd()
+    _workdir = os.path.abspath(workdir)
     try:
-        os.makedirs(workdir)
+        os.makedirs(_workdir)
     except OSError:
         # directory exists
         if purge_workdir:
             # that's a bit brutal, but saves to worry of links and subdirs
-            shutil.rmtree(workdir)
-            os.makedirs(workdir)
-    os.chdir(workdir)
-    # prepare out/err handling
+            shutil.rmtree(_workdir)
+            os.makedirs(_workdir)
+    # prepare out/err handling; file names are relative to _workdir
+    streams = []
     filename = kwargs.pop('stdout', outfile)
     if filename:
-        kwargs['stdout'] = open(filename, 'w')
+        kwargs['stdout'] = open(os.path.join(_workdir, filename), 'w')
+        streams.append(kwargs['stdout'])
     filename = kwargs.pop('stderr', None)
     if filename:
-        kwargs['stderr'] = open(filename, 'w')
+        kwargs['stderr'] = open(os.path.join(_workdir, filename), 'w')
+        streams.append(kwargs['stderr'])
     else:
         kwargs['stderr'] = subprocess.STDOUT
     # execute the command, make sure output is not streamed
-    _cmd = parse_cmd(cmd)
+    _cmd = parse_cmd(cmd, _workdir)
     try:
-        returncode = subprocess.call(_cmd, **kwargs)
+        returncode = subprocess.call(_cmd, cwd=_workdir, **kwargs)
         if returncode:
-            LOGGER.critical('Execution of {:s} FAILED with exit status {:d}'.
-                            format(_cmd, returncode))
+            LOGGER.critical('Execution of %s FAILED with exit status %d',
+                            _cmd, returncode)
             raise RuntimeError
     #
     except subprocess.SubprocessError:
-        LOGGER.critical('Subprocess call of {:s} FAILED'.format(_cmd))
+        LOGGER.critical('Subprocess call of %s FAILED', _cmd)
         raise
     #
     except (OSError, FileNotFoundError) as exc:
         LOGGER.critical("Abnormal termination: OS could not execute %s in %s",
-                        _cmd, workdir)
+                        _cmd, _workdir)
         LOGGER.critical("If the command is a script ,"\
                         "check permissions and that is has a shebang!")
         raise
     #
     finally:
-        # make sure we return to where we started from in any case!
-        os.chdir(origdir)
+        for stream in streams:
+            stream.close()
 
 def configure_logger(name, filename=None, verbosity=logging.INFO):
     """Get parent logger: logging INFO on the console and DEBUG to file.
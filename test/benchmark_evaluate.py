@@ -0,0 +1,86 @@
+"""Benchmark the per-evaluation overhead of the evaluator.
+
+No external executable is involved: tasks substitute parameters in a
+template, load model data from a file written by a python task, and query
+the model database for plotting (without drawing), so the timings show
+the overhead of skpar itself. Evaluations with tasks set up once per run
+are compared with the former way, where tasks (and plot tasks in
+particular) were set up again at each evaluation.
+Logging is restricted to warnings, to exclude the output to the console.
+Usage:
+
+    python benchmark_evaluate.py [nevals [ntasks]]
+"""
+import os
+import sys
+import time
+import logging
+import tempfile
+import numpy as np
+from skpar.core.taskdict import TASKDICT, wrapper_PlotTask
+from skpar.core.tasks import initialise_tasks
+from skpar.core.evaluate import Evaluator
+from skpar.core.objectives import set_objectives
+
+
+def write_model(env, database, filename):
+    """Write a polynomial of the parameters, standing for an executable"""
+    xval = np.linspace(-1, 1, 50)
+    yval = np.polyval(env['parametervalues'], xval)
+    np.savetxt(os.path.join(env['workroot'], filename), yval)
+
+def noplot(xval, yval, filename=None, **kwargs):
+    """Plotting function that draws nothing"""
+    pass
+
+class LegacyEvaluator(Evaluator):
+    """Evaluator setting up the tasks at each evaluation"""
+    def evaluate(self, parametervalues, iteration=None):
+        self.tasks = initialise_tasks(self.tasklist, self.taskdict)
+        return super().evaluate(parametervalues, iteration)
+
+def main(nevals=200, ntasks=10):
+    """Time evaluations of a task list of about `ntasks` tasks"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        templatedir = os.path.join(tmpdir, 'template')
+        os.makedirs(templatedir)
+        with open(os.path.join(templatedir, 'template.par.dat'), 'w') as fout:
+            fout.write('%(c0)f %(c1)f %(c2)f\n')
+        taskdict = dict(TASKDICT)
+        taskdict.update({'model': write_model, 'noplot': noplot})
+        tasklist = [('set', [['template.par.dat']]),
+                    ('model', ['yval.dat'])]
+        objectives = []
+        nmodels = max(1, (ntasks - 2) // 2)
+        for i in range(nmodels):
+            model = 'poly{}'.format(i)
+            tasklist.append(('get', ['yval', 'yval.dat', model]))
+            tasklist.append(('plot', ['noplot', 'plot{}'.format(i),
+                                      [['yval', model]]]))
+            objectives.append({'yval': {'models': model, 'ref': [0.]*50}})
+        objectives = set_objectives(objectives)
+        config = {'workroot': os.path.join(tmpdir, 'work'),
+                  'templatedir': templatedir, 'keepworkdirs': False,
+                  'workdirpool': 1}
+        print('{} evaluations of {} tasks and {} objectives'.
+              format(nevals, len(tasklist), len(objectives)))
+        legacydict = dict(taskdict)
+        legacydict['plot'] = wrapper_PlotTask
+        for name, evaluator in [
+                ('set-up per run', Evaluator(objectives, tasklist, taskdict,
+                                             ['c0', 'c1', 'c2'], config)),
+                ('set-up per eval.', LegacyEvaluator(objectives, tasklist,
+                                                     legacydict,
+                                                     ['c0', 'c1', 'c2'],
+                                                     config))]:
+            t0 = time.perf_counter()
+            for i in range(nevals):
+                evaluator([1., 0.5, float(i)], i)
+            teval = time.perf_counter() - t0
+            print('{:>20s}{:>10.3f} ms'.format(name, 1000*teval/nevals))
+
+if __name__ == '__main__':
+    logging.getLogger('skpar').setLevel(logging.WARNING)
+    for handler in logging.getLogger('skpar').handlers:
+        handler.setLevel(logging.WARNING)
+    main(*[int(arg) for arg in sys.argv[1:]])
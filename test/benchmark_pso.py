@@ -0,0 +1,34 @@
+"""Benchmark the bookkeeping of PSO against the vectorised VPSO.
+
+The cost is a sum of squares evaluated in-process, so the timings are
+dominated by the creation, bookkeeping and evolution of the swarm.
+Usage:
+
+    python benchmark_pso.py [npart [ngen]]
+"""
+import sys
+import time
+import logging
+from skpar.core.pso import PSO
+from skpar.core.vpso import VPSO
+
+def evaluate_sphere(parameters, iteration):
+    """Return the sum of squares of the parameters, as a 1-tuple"""
+    return (sum(pp*pp for pp in parameters),)
+
+def main(npart=1000, ngen=20):
+    """Time the optimisation by both engines"""
+    prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+    print('{} particles, {} generations'.format(npart, ngen))
+    for name, engine in [('PSO', PSO), ('VPSO', VPSO)]:
+        t0 = time.perf_counter()
+        optimiser = engine(prange, evaluate_sphere, npart=npart, ngen=ngen)
+        optimiser()
+        telapsed = time.perf_counter() - t0
+        print('{:>10s}{:>10.3f} s'.format(name, telapsed))
+
+if __name__ == '__main__':
+    logging.getLogger('skpar').setLevel(logging.ERROR)
+    for handler in logging.getLogger('skpar').handlers:
+        handler.setLevel(logging.ERROR)
+    main(*[int(arg) for arg in sys.argv[1:]])
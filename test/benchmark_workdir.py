@@ -0,0 +1,78 @@
+"""Benchmark creation and removal of work directories from a template.
+
+Compares copying the whole template tree (the default), with hard-linking
+and symbolically linking the files that are not modified by tasks, and
+with recycling a directory from a pool (with the work of a task simulated
+by writing an output file), where destroy is the release of the directory.
+Usage:
+
+    python benchmark_workdir.py [nfiles [size_MB [nrepeat]]]
+"""
+import os
+import sys
+import time
+import tempfile
+from skpar.core.workdir import create_workdir, destroy_workdir, WorkdirPool
+
+def make_template(templatedir, nfiles, size):
+    """Create a template of `nfiles` read-only files and one template file"""
+    os.makedirs(os.path.join(templatedir, 'skf'))
+    os.makedirs(os.path.join(templatedir, 'scc'))
+    content = os.urandom(size)
+    for i in range(nfiles):
+        with open(os.path.join(templatedir, 'skf', 'X{}-Y.skf'.format(i)),
+                  'wb') as fout:
+            fout.write(content)
+    with open(os.path.join(templatedir, 'skf', 'template.skdefs.py'), 'w') as fout:
+        fout.write('r0 = %(r0)f\n')
+    with open(os.path.join(templatedir, 'scc', 'dftb_in.hsd'), 'w') as fout:
+        fout.write('Geometry = GenFormat {}\n')
+
+def main(nfiles=20, size_mb=2., nrepeat=10):
+    """Time create_workdir/destroy_workdir for all materialisation modes"""
+    size = int(size_mb * 1024 * 1024)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        templatedir = os.path.join(tmpdir, 'template')
+        make_template(templatedir, nfiles, size)
+        print('Template: {} files of {:.1f} MB; {} repetitions'.
+              format(nfiles, size_mb, nrepeat))
+        print('{:>10s}{:>14s}{:>14s}'.format('mode', 'create [ms]',
+                                             'destroy [ms]'))
+        for mode in ['copy', 'hardlink', 'symlink']:
+            tcreate, tdestroy = 0., 0.
+            for i in range(nrepeat):
+                workdir = os.path.join(tmpdir, '{}-{}'.format(mode, i))
+                t0 = time.perf_counter()
+                create_workdir(workdir, templatedir, mode)
+                t1 = time.perf_counter()
+                destroy_workdir(workdir)
+                t2 = time.perf_counter()
+                tcreate += t1 - t0
+                tdestroy += t2 - t1
+            print('{:>10s}{:>14.2f}{:>14.2f}'.format(mode,
+                                                     1000*tcreate/nrepeat,
+                                                     1000*tdestroy/nrepeat))
+        pool = WorkdirPool(os.path.join(tmpdir, 'pool'), templatedir, 1)
+        pool.release(pool.acquire())
+        tcreate, tdestroy = 0., 0.
+        for i in range(nrepeat):
+            t0 = time.perf_counter()
+            workdir = pool.acquire()
+            t1 = time.perf_counter()
+            with open(os.path.join(workdir, 'scc', 'detailed.out'), 'w') as fout:
+                fout.write('output {}\n'.format(i))
+            t2 = time.perf_counter()
+            pool.release(workdir)
+            t3 = time.perf_counter()
+            tcreate += t1 - t0
+            tdestroy += t3 - t2
+        print('{:>10s}{:>14.2f}{:>14.2f}'.format('pool', 1000*tcreate/nrepeat,
+                                                 1000*tdestroy/nrepeat))
+
+if __name__ == '__main__':
+    ARGS = [float(arg) for arg in sys.argv[1:]]
+    if ARGS:
+        ARGS[0] = int(ARGS[0])
+    if len(ARGS) > 2:
+        ARGS[2] = int(ARGS[2])
+    main(*ARGS)
@@ -0,0 +1,42 @@
+"""Models and evaluators shared by the tests of the optimisation engines.
+
+They are defined at module level, so that they can be pickled and sent
+to worker processes in the parallel tests.
+"""
+import numpy as np
+from numpy.polynomial.polynomial import polyval
+
+# Refdata: 5 points from a 3rd order polynomial
+XREF = np.linspace(-9, 9, 5)
+COEF = np.array([10, -2.5, 0.5, 0.05])
+REFDATA = polyval(XREF, COEF)
+
+PARAMETERS = ['c0 8 -20 20', 'c1 -2 -5 5', 'c2 0.4 -2 2', 'c3 0.06 -1 1']
+
+CENTRE = np.array([0.5, -1.2, 0.3])
+
+def evaluate_poly3(parameters, iteration):
+    """Return relative RMS deviation of a 3rd order polynomial from REFDATA"""
+    errors = REFDATA - polyval(XREF, parameters)
+    return np.atleast_1d(np.sqrt(np.sum(np.power(errors/REFDATA, 2))))
+
+def evaluate_constant(parameters, iteration):
+    """Return the same cost everywhere"""
+    return np.atleast_1d(1.)
+
+def residuals_poly3(parameters, iteration):
+    """Return relative deviations of a 3rd order polynomial from REFDATA"""
+    return (polyval(XREF, parameters) - REFDATA) / REFDATA
+
+def fpoly3(env, database, model):
+    """Put the polynomial of the parameters into the model database"""
+    database.update(model, {'yval': polyval(XREF, env['parametervalues'])})
+
+def evaluate_bowl(parameters, iteration):
+    """Return a quadratic cost with its minimum at CENTRE"""
+    return np.atleast_1d(np.sum((np.asarray(parameters) - CENTRE)**2))
+
+def evaluate_twowells(parameters, iteration):
+    """Two objectives, with a Pareto front on x1 = 0, 0 <= x0 <= 2"""
+    x0, x1 = parameters
+    return [x0**2 + x1**2, (x0 - 2)**2 + x1**2]
@@ -0,0 +1,67 @@
+"""Test the Bayesian optimisation module"""
+import os
+import unittest
+import tempfile
+import numpy as np
+import numpy.testing as nptest
+from skpar.core.bo import BO, expected_improvement
+from skpar.core.evalcache import EvaluationCache
+from .fixtures import evaluate_bowl, CENTRE
+
+
+class FunctionWithCache(object):
+    """Stand-in for an evaluator with a cache of evaluations"""
+    def __init__(self, cache):
+        self.cache = cache
+    def __call__(self, parameters, iteration):
+        return evaluate_bowl(parameters, iteration)
+
+
+class BOTest(unittest.TestCase):
+    """Check acquisition, convergence, warm start and resume of BO"""
+
+    def test_expected_improvement(self):
+        """Does EI prefer better means and, at equal means, uncertainty?"""
+        ei = expected_improvement(np.array([1., 0., 0., 0.]),
+                                  np.array([0.1, 0.1, 1., 0.]), best=0.5)
+        self.assertTrue(ei[0] > ei[2] > ei[1] > ei[3] - 1.e-12)
+        self.assertAlmostEqual(ei[0], 0.5, places=4)
+
+    def test_bo(self):
+        """Does BO find the minimum with few evaluations?"""
+        prange = [(-2, 2), (-2, 2), (-2, 2)]
+        bo = BO(prange, evaluate_bowl, q=3, ngen=12, seed=1)
+        gbest, stats = bo()
+        self.assertEqual(len(stats), 12)
+        # an initial design of 8 points, then 11 rounds of 3 points
+        self.assertEqual(len(bo.gp), 8 + 11 * 3)
+        nptest.assert_allclose(gbest, CENTRE, atol=0.15)
+        self.assertEqual(bo.halloffame[0][0], bo.gbestfit)
+        self.assertRaises(ValueError, BO, prange, evaluate_bowl, liar='lazy')
+
+    def test_warmstart(self):
+        """Are previous evaluations used instead of an initial design?"""
+        prange = [(-2, 2), (-2, 2), (-2, 2)]
+        points = np.random.default_rng(0).uniform(-2, 2, (12, 3))
+        costs = [evaluate_bowl(pp, None)[0] for pp in points]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'evaluations.dat')
+            # the last point is out of range and ignored
+            np.savetxt(filename, np.column_stack(
+                [np.vstack([points, [0., 0., 3.]]), costs + [9.]]))
+            bo = BO(prange, evaluate_bowl, q=2, ngen=1, warmstart=filename)
+            self.assertEqual(len(bo.gp), 12)
+            self.assertEqual(bo.gbest_iteration[0], 'warmstart')
+            bo()
+            self.assertEqual(len(bo.gp), 14)
+            cache = EvaluationCache(os.path.join(tmpdir, 'cache.sqlite'),
+                                    'abc')
+            for pp, cc in zip(points, costs):
+                cache.put(pp, [cc], cc)
+            bo = BO(prange, FunctionWithCache(cache), q=2, warmstart='cache')
+            self.assertEqual(len(bo.gp), 12)
+            self.assertEqual(bo.gbestfit, (min(costs),))
+
+
+if __name__ == '__main__':
+    unittest.main()
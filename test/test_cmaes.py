@@ -0,0 +1,55 @@
+"""Test the CMA-ES optimisation module"""
+import unittest
+import numpy as np
+import numpy.testing as nptest
+from skpar.core.cmaes import CMAES, get_penalty
+from skpar.core.parameters import get_parameters
+from .fixtures import evaluate_poly3, COEF
+
+
+class CMAESTest(unittest.TestCase):
+    """Check convergence, parallel evaluation and resume of CMA-ES"""
+
+    def test_cmaes(self):
+        """Does the strategy find the coefficients of a polynomial?"""
+        prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        cmaes = CMAES(prange, evaluate_poly3, ngen=150, seed=1)
+        # DEAP's default population size, 4 + 3 ln(4)
+        self.assertEqual(cmaes.npop, 8)
+        gbest, stats = cmaes()
+        # stopped by the default ErrTol
+        self.assertTrue(len(stats) < 150)
+        self.assertTrue(cmaes.stopping.reason.startswith('errtol'))
+        nptest.assert_allclose(gbest, COEF, rtol=0.01)
+        self.assertTrue(cmaes.gbestfit[0] < 0.01)
+        self.assertEqual(cmaes.halloffame[0][0], cmaes.gbestfit)
+        self.assertEqual(cmaes.halloffame[0][2], cmaes.gbest_iteration)
+
+    def test_initial_values(self):
+        """Does the search start from the initial values of parameters?"""
+        parameters = get_parameters(['p0 5 -20 20', 'p1 -5 5', 'p2 9 -2 2'])
+        cmaes = CMAES(parameters, evaluate_poly3, npop=12)
+        self.assertEqual(cmaes.npop, 12)
+        self.assertEqual(cmaes.parnames, ['p0', 'p1', 'p2'])
+        # p1 has no initial value (0 is implied), p2 is out of range
+        nptest.assert_array_almost_equal(cmaes.strategy.centroid,
+                                         [0.25, 0., 0.])
+
+    def test_bounds(self):
+        """Are samples outside the range ranked by their distance from it?"""
+        population = np.array([[0.5, 0.], [1.5, 0.], [2., 0.]])
+        clipped = np.clip(population, -1., 1.)
+        penalty = get_penalty(population, clipped, np.array([1., 3., 3.]))
+        nptest.assert_array_almost_equal(penalty, [0., 0.5, 2.])
+        # the strategy is updated with the samples themselves, and the
+        # global random generator of NumPy is left alone
+        state = np.random.get_state()[1].copy()
+        cmaes = CMAES([(-1, 1), (-1, 1)], evaluate_poly3, ngen=2, seed=1,
+                      sigma=5.)
+        cmaes()
+        nptest.assert_array_equal(np.random.get_state()[1], state)
+        self.assertTrue(np.all(np.abs(cmaes.gbest) <= 1.))
+
+
+if __name__ == '__main__':
+    unittest.main()
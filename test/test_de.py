@@ -0,0 +1,43 @@
+"""Test the differential evolution module"""
+import unittest
+import numpy as np
+import numpy.testing as nptest
+from skpar.core.de import DE, get_trials
+from .fixtures import evaluate_poly3, COEF
+
+
+class DETest(unittest.TestCase):
+    """Check trial vectors, convergence and resume of DE"""
+
+    def test_get_trials(self):
+        """Are trials within bounds and crossed over with their targets?"""
+        rng = np.random.default_rng(0)
+        population = rng.uniform(-1, 1, (6, 3))
+        trials = get_trials(population, 0, 0.7, 0., rng)
+        self.assertTrue(np.all(np.abs(trials) <= 1))
+        # with CR=0, exactly one coordinate comes from the mutant
+        self.assertEqual(np.count_nonzero(trials != population), 6)
+        trials = get_trials(population, 0, 2., 1., rng, 'best1bin')
+        self.assertTrue(np.all(np.abs(trials) <= 1))
+
+    def test_de(self):
+        """Does the population find the coefficients of a polynomial?"""
+        prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        de = DE(prange, evaluate_poly3, npop=16, ngen=150, seed=1, ErrTol=0)
+        population, stats = de()
+        self.assertEqual(population.shape, (16, 4))
+        self.assertEqual(len(stats), 150)
+        nptest.assert_allclose(de.gbest, COEF, rtol=0.05)
+        self.assertEqual(de.halloffame[0][0], de.gbestfit)
+        self.assertEqual(de.halloffame[0][2], de.gbest_iteration)
+        # criteria of skpar.core.stopping apply, e.g. the budget
+        de = DE(prange, evaluate_poly3, npop=8, ngen=50, seed=1, maxeval=40)
+        _, stats = de()
+        self.assertEqual(len(stats), 5)
+        self.assertTrue(de.stopping.reason.startswith('maxeval'))
+        self.assertRaises(ValueError, DE, prange, evaluate_poly3,
+                          strategy='rand2exp')
+
+
+if __name__ == '__main__':
+    unittest.main()
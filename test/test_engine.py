@@ -0,0 +1,93 @@
+"""Test the bookkeeping shared by the optimisation engines"""
+import os
+import unittest
+import tempfile
+import numpy as np
+import numpy.testing as nptest
+from skpar.core.engine import get_ranges, merge_halloffame, run_batches
+from skpar.core.parameters import get_parameters
+from skpar.core.vpso import VPSO
+from skpar.core.cmaes import CMAES
+from skpar.core.de import DE
+from skpar.core.bo import BO
+from skpar.core.nsga2 import NSGA2
+from .fixtures import evaluate_poly3, evaluate_bowl, evaluate_twowells
+
+POLY3RANGE = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+
+# engine, ranges, evaluator, kwargs and generations of a short run
+ENGINES = [
+    (VPSO, POLY3RANGE, evaluate_poly3, {'npart': 5}, 6),
+    (CMAES, POLY3RANGE, evaluate_poly3, {}, 6),
+    (DE, POLY3RANGE, evaluate_poly3, {'npop': 6}, 6),
+    (BO, [(-2, 2)] * 3, evaluate_bowl, {'q': 2}, 4),
+    (NSGA2, [(-4, 4), (-4, 4)], evaluate_twowells, {'npop': 8}, 6),
+    ]
+
+
+def fsquare(point, iteration):
+    """Cost of a point, as a plain evaluation function"""
+    return [sum(xx**2 for xx in point)]
+
+
+class EngineTest(unittest.TestCase):
+    """Check parsing of parameters, hall of fame and dispatch of batches"""
+
+    def test_get_ranges(self):
+        """Are ranges and initial values taken from parameters or tuples?"""
+        parameters = get_parameters(['p0 5 -20 20', 'p1 -5 5'])
+        parnames, parrange, initial = get_ranges(parameters, 'test')
+        self.assertEqual(parnames, ['p0', 'p1'])
+        nptest.assert_array_equal(parrange, [[-20, 20], [-5, 5]])
+        self.assertEqual(initial[0], 5)
+        parnames, parrange, initial = get_ranges([(0, 1), (2, 3)], 'test')
+        self.assertIsNone(parnames)
+        self.assertEqual(initial, [None, None])
+
+    def test_merge_halloffame(self):
+        """Are the best distinct points kept, the best first?"""
+        weights = np.array([-1.])
+        fitness = np.array([[3.], [1.], [2.]])
+        positions = np.array([[3.], [1.], [2.]])
+        halloffame = merge_halloffame([], fitness, -fitness[:, 0], positions,
+                                      [0, 1, 2], weights, nkept=2)
+        self.assertEqual([it for _, _, it in halloffame], [1, 2])
+        # a repeated point is kept once, with its latest iteration
+        halloffame = merge_halloffame(halloffame, fitness[1:2],
+                                      np.array([-1.]), positions[1:2], [3],
+                                      weights, nkept=2)
+        self.assertEqual([it for _, _, it in halloffame], [3, 2])
+
+    def test_run_batches(self):
+        """Is a plain function mapped serially or by a pool of threads?"""
+        points = [[1., 2.], [0., 1.]]
+        def run(mapper):
+            return list(mapper(fsquare, zip(points, range(2))))
+        self.assertEqual(run_batches(run, fsquare), [[5.], [1.]])
+        self.assertEqual(run_batches(run, fsquare, 2, 'thread'), [[5.], [1.]])
+
+    def test_parallel_resume(self):
+        """Do parallel and resumed runs of each engine reproduce a serial one?"""
+        for engine, prange, evaluate, kwargs, ngen in ENGINES:
+            with self.subTest(engine=engine.name),\
+                    tempfile.TemporaryDirectory() as tmpdir:
+                kwargs = dict(kwargs, ngen=ngen,
+                              paretofile=os.path.join(tmpdir, 'pareto.dat'))
+                chkfile = os.path.join(tmpdir, 'engine.checkpoint')
+                serial = engine(prange, evaluate, seed=3, **kwargs)
+                output, stats = serial()
+                resumed = engine(prange, evaluate, seed=3, nworkers=2,
+                                 checkpoint=1, checkpointfile=chkfile, **kwargs)
+                resumed(ngen=ngen//2)
+                resumed = engine(prange, evaluate, seed=7, checkpoint=1,
+                                 checkpointfile=chkfile, **kwargs)
+                routput, rstats = resumed(resume=True)
+                self.assertEqual(serial.gbest_iteration,
+                                 resumed.gbest_iteration)
+                self.assertEqual(serial.gbestfit, resumed.gbestfit)
+                nptest.assert_array_equal(output, routput)
+                self.assertEqual(stats, rstats)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""Test the persistent cache of evaluations"""
+import os
+import unittest
+import tempfile
+import numpy as np
+import numpy.testing as nptest
+from skpar.core.evalcache import EvaluationCache, get_signature
+from skpar.core.evaluate import Evaluator
+
+
+class Objv(object):
+    """Barebone objective"""
+    def __init__(self, ff, ww):
+        self.fitness = ff
+        self.weight = ww
+    def __call__(self, database):
+        return self.fitness
+
+def fcount(env, db, counter):
+    """Count the calls of the task"""
+    counter.append(env['iteration'])
+
+
+class EvaluationCacheTest(unittest.TestCase):
+    """Check storage and retrieval of evaluations"""
+
+    def test_get_put(self):
+        """Can we store and retrieve an evaluation within tolerance?"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = EvaluationCache(os.path.join(tmpdir, 'cache.sqlite'),
+                                    'abc', tolerance=1.e-6)
+            self.assertTrue(cache.get([1., 2.]) is None)
+            cache.put([1., 2.], np.array([0.1, 0.2]), 0.15)
+            cost, fitness = cache.get([1. + 1.e-8, 2.])
+            self.assertEqual(cost, 0.15)
+            nptest.assert_array_equal(fitness, [0.1, 0.2])
+            self.assertTrue(cache.get([1. + 1.e-5, 2.]) is None)
+            # a different signature does not see the records
+            other = EvaluationCache(cache.filename, 'xyz', tolerance=1.e-6)
+            self.assertTrue(other.get([1., 2.]) is None)
+            self.assertEqual(len(other), 0)
+            self.assertEqual(len(cache), 1)
+            self.assertEqual(cache.records(), [([1., 2.], 0.15)])
+            self.assertEqual(other.records(), [])
+
+    def test_eviction(self):
+        """Are least recently used records evicted first?"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = EvaluationCache(os.path.join(tmpdir, 'cache.sqlite'),
+                                    'abc', maxsize=2)
+            cache.put([1.], [1.], 1.)
+            cache.put([2.], [2.], 2.)
+            # access the first record, so that the second is the oldest
+            cache.get([1.])
+            cache.put([3.], [3.], 3.)
+            self.assertEqual(len(cache), 2)
+            self.assertTrue(cache.get([2.]) is None)
+            self.assertEqual(cache.get([1.])[0], 1.)
+            self.assertEqual(cache.get([3.])[0], 3.)
+
+    def test_signature(self):
+        """Does the signature change with tasks and objectives?"""
+        objvs = [Objv(1, 1)]
+        sig0 = get_signature([['t1', ['a']]], objvs, ['p0'])
+        self.assertEqual(sig0, get_signature([['t1', ['a']]], objvs, ['p0']))
+        self.assertNotEqual(sig0, get_signature([['t1', ['b']]], objvs, ['p0']))
+        self.assertNotEqual(sig0, get_signature([['t1', ['a']]],
+                                                [Objv(1, 2)], ['p0']))
+
+    def test_evaluator_cache(self):
+        """Does a cache hit skip the tasks and the work directory?"""
+        counter = []
+        tasklist = [['t1', [counter]]]
+        taskdict = {'t1': fcount}
+        with tempfile.TemporaryDirectory() as workroot:
+            config = {'workroot': workroot, 'templatedir': None,
+                      'keepworkdirs': True,
+                      'cache': {'file': os.path.join(workroot, 'cache.sqlite'),
+                                'tolerance': 1.e-6, 'maxsize': 10}}
+            evaluator = Evaluator([Objv(2, 1)], tasklist, taskdict, ['p0'],
+                                  config)
+            self.assertEqual(evaluator([1.], 0), 2)
+            self.assertEqual(evaluator([1.], 1), 2)
+            self.assertEqual(counter, [0])
+            self.assertTrue(os.path.exists(os.path.join(workroot, '0')))
+            self.assertFalse(os.path.exists(os.path.join(workroot, '1')))
+            # unless the cache is bypassed
+            self.assertEqual(evaluator.evaluate([1.], 2, usecache=False), 2)
+            self.assertEqual(counter, [0, 2])
+            self.assertTrue(os.path.exists(os.path.join(workroot, '2')))
+
+    def test_evaluate_batch_cache(self):
+        """Are cached and repeated points of a batch evaluated only once?"""
+        counter = []
+        tasklist = [['t1', [counter]]]
+        taskdict = {'t1': fcount}
+        with tempfile.TemporaryDirectory() as workroot:
+            config = {'workroot': workroot, 'templatedir': None,
+                      'keepworkdirs': False,
+                      'cache': {'file': os.path.join(workroot, 'cache.sqlite'),
+                                'tolerance': 1.e-6, 'maxsize': 10}}
+            evaluator = Evaluator([Objv(2, 1), Objv(3, 1)], tasklist,
+                                  taskdict, ['p0'], config)
+            costs, fitness = evaluator.evaluate_batch([[1.], [2.], [1.]])
+            self.assertEqual(counter, [0, 1])
+            nptest.assert_array_equal(fitness, [[2, 3]]*3)
+            costs, fitness = evaluator.evaluate_batch([[2.], [3.]], [3, 4],
+                                                      nworkers=2,
+                                                      pool='thread')
+            self.assertEqual(counter, [0, 1, 4])
+            nptest.assert_array_equal(fitness, [[2, 3]]*2)
+            self.assertEqual(len(evaluator.cache), 3)
+            evaluator.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,11 @@
+import os
 import unittest
 import logging
+import tempfile
 import numpy as np
 import numpy.testing as nptest
 from skpar.core import evaluate as ev
+from skpar.core.objectives import set_objectives
 
 
 class Objv(object):
@@ -23,6 +26,37 @@ def fexception(env, db, exception=None):
     else:
         return None
 
+def fwritecwd(env, db, filename):
+    """write the current directory in a file under env['workroot']"""
+    with open(os.path.join(env['workroot'], filename), 'w') as fout:
+        fout.write(os.getcwd())
+
+def fsquare(env, db, model):
+    """put the squares of the parameters in the model database"""
+    db.update({model: {'square': np.array(env['parametervalues'])**2}})
+
+def fmodel(env, db, model):
+    """Put a line through the parameters into the model database"""
+    db.update(model, {'yval': np.polyval(env['parametervalues'], [1., 2., 3.])})
+
+def fmodel_stacked(env, db, model, calls=None):
+    """Put lines through the rows of parameters into the model database"""
+    parameters = env['parametervalues']
+    if calls is not None:
+        calls.append(len(parameters))
+    xval = np.array([1., 2., 3.])
+    db.update(model, {'yval': parameters.dot(
+        np.vander(xval, parameters.shape[1]).T)})
+fmodel_stacked.vectorised = True
+
+class ObjvSquare(object):
+    """Objective returning the square of a parameter"""
+    def __init__(self, index, ww):
+        self.index = index
+        self.weight = ww
+    def __call__(self, database):
+        return database.get('model')['square'][self.index]
+
 
 class EvaluatorTest(unittest.TestCase):
     """Check if we can create an evaluator."""
@@ -65,6 +99,149 @@ class EvaluatorTest(unittest.TestCase):
         par, ii = [2.], 1
         self.assertRaises(RuntimeError, evaluator, par, ii)
 
+    def test_evaluator_keeps_cwd(self):
+        """Does evaluation leave the current directory unchanged?"""
+        objvs = [Objv(2, 1)]
+        tasklist = [['t1', ['cwd.txt']]]
+        taskdict = {'t1': fwritecwd}
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as workroot:
+            config = {'workroot': workroot, 'templatedir': None,
+                      'keepworkdirs': True}
+            evaluator = ev.Evaluator(objvs, tasklist, taskdict, ['p0'], config)
+            evaluator([2.], (0, 1))
+            self.assertEqual(os.getcwd(), cwd)
+            with open(os.path.join(workroot, '0-1', 'cwd.txt')) as fin:
+                self.assertEqual(fin.read(), cwd)
+
+    def test_evaluator_workdirpool(self):
+        """Are work directories recycled, and released upon failure?"""
+        objvs = [Objv(2, 1)]
+        tasklist = [['t1', ['cwd.txt']]]
+        taskdict = {'t1': fwritecwd}
+        with tempfile.TemporaryDirectory() as workroot:
+            config = {'workroot': workroot, 'templatedir': None,
+                      'keepworkdirs': False, 'workdirpool': 1}
+            evaluator = ev.Evaluator(objvs, tasklist, taskdict, ['p0'], config)
+            for i in range(3):
+                evaluator([2.], (0, i))
+            self.assertEqual(sorted(os.listdir(workroot)), ['pool-0'])
+            self.assertTrue(os.path.exists(os.path.join(workroot, 'pool-0',
+                                                        'cwd.txt')))
+            evaluator = ev.Evaluator(objvs, [['t1', [ValueError]]],
+                                     {'t1': fexception}, ['p0'], config)
+            self.assertRaises(ValueError, evaluator, [2.], 3)
+            self.assertFalse(os.path.exists(os.path.join(workroot,
+                                                         'pool-0.lock')))
+
+    def test_evaluate_batch(self):
+        """Are batches evaluated alike, one by one or concurrently?"""
+        objvs = [ObjvSquare(0, 1), ObjvSquare(1, 1)]
+        tasklist = [['square', ['model']]]
+        taskdict = {'square': fsquare}
+        points = [[1., 2.], [3., 4.], [0., 5.]]
+        reffitness = np.array(points)**2
+        refcosts = np.array([ev.cost_rms(np.zeros(2), ff, np.array([.5, .5]))
+                             for ff in reffitness])
+        with tempfile.TemporaryDirectory() as workroot:
+            config = {'workroot': workroot, 'templatedir': None,
+                      'keepworkdirs': False}
+            evaluator = ev.Evaluator(objvs, tasklist, taskdict, ['p0', 'p1'],
+                                     config)
+            for nworkers, pool in [(1, 'process'), (2, 'thread'),
+                                   (2, 'process')]:
+                costs, fitness = evaluator.evaluate_batch(
+                    points, [(0, i) for i in range(3)], nworkers, pool)
+                nptest.assert_array_almost_equal(costs, refcosts)
+                nptest.assert_array_almost_equal(fitness, reffitness)
+            evaluator.close()
+            # functions without batch support are mapped over the points
+            costs = ev.batch_evaluate(evaluator.evaluate, points, range(3))
+            nptest.assert_array_almost_equal(np.ravel(costs), refcosts)
+
+    def test_evaluate_residuals(self):
+        """Is the global cost the norm of the weighted residuals?"""
+        refdata = [1., 2., 3.]
+        objectives = set_objectives([
+            {'yval': {'models': 'm1', 'ref': refdata, 'weight': 2,
+                      'eval': ['rms', 'relerr']}},
+            {'yval': {'models': 'm2', 'ref': refdata,
+                      'options': {'subweights': [1., 2., 3.]}}}],
+            verbose=False)
+        tasklist = [['model', ['m1']], ['model', ['m2']]]
+        config = {'workroot': None, 'templatedir': None, 'keepworkdirs': False}
+        evaluator = ev.Evaluator(objectives, tasklist, {'model': fmodel},
+                                 ['p0', 'p1'], config)
+        points = [[1., 2.], [0.5, 0.]]
+        for nworkers, pool in [(1, 'process'), (2, 'thread')]:
+            costs, residuals = evaluator.evaluate_residuals(points, None,
+                                                            nworkers, pool)
+            self.assertEqual(residuals.shape, (2, 6))
+            nptest.assert_array_almost_equal(costs,
+                                             [evaluator(pp)[0] for pp in points])
+            nptest.assert_array_almost_equal(np.linalg.norm(residuals, axis=1),
+                                             costs)
+        evaluator.close()
+
+    def test_evaluate_stacked(self):
+        """Does a vectorised task evaluate a batch at once, alike?"""
+        refdata = [1., 2., 3.]
+        objectives = set_objectives([
+            {'yval': {'models': 'm1', 'ref': refdata, 'weight': 2,
+                      'eval': ['rms', 'relerr']}},
+            {'yval': {'models': 'm2', 'ref': refdata,
+                      'options': {'subweights': [1., 2., 3.],
+                                  'align_model': 1}}}],
+            verbose=False)
+        config = {'workroot': None, 'templatedir': None, 'keepworkdirs': False}
+        evaluator = ev.Evaluator(objectives, [['model', ['m1']],
+                                              ['model', ['m2']]],
+                                 {'model': fmodel}, ['p0', 'p1'], config)
+        self.assertFalse(evaluator.vectorised)
+        calls = []
+        vevaluator = ev.Evaluator(objectives, [['model', ['m1', calls]],
+                                               ['model', ['m2', calls]]],
+                                  {'model': fmodel_stacked}, ['p0', 'p1'],
+                                  config)
+        self.assertTrue(vevaluator.vectorised)
+        points = [[1., 2.], [0.5, 0.], [-1., 3.], [2., 1.]]
+        costs, fitness = evaluator.evaluate_batch(points)
+        vcosts, vfitness = vevaluator.evaluate_batch(points, nworkers=2)
+        # each task is executed once for the whole batch
+        self.assertEqual(calls, [4, 4])
+        nptest.assert_array_almost_equal(vcosts, costs)
+        nptest.assert_array_almost_equal(vfitness, fitness)
+        _, residuals = evaluator.evaluate_residuals(points)
+        vcosts, vresiduals = vevaluator.evaluate_residuals(points)
+        nptest.assert_array_almost_equal(vresiduals, residuals)
+        nptest.assert_array_almost_equal(vcosts, costs)
+        # single points are evaluated as batches of one
+        self.assertAlmostEqual(vevaluator(points[2], 7)[0], costs[2])
+
+    def test_submit(self):
+        """Do submitted evaluations resolve to the costs of evaluate()?"""
+        objvs = [ObjvSquare(0, 1), ObjvSquare(1, 1)]
+        points = [[1., 2.], [3., 4.]]
+        refcosts = [ev.cost_rms(np.zeros(2), np.array(pp)**2,
+                                np.array([.5, .5])) for pp in points]
+        with tempfile.TemporaryDirectory() as workroot:
+            config = {'workroot': workroot, 'templatedir': None,
+                      'keepworkdirs': False}
+            evaluator = ev.Evaluator(objvs, [['square', ['model']]],
+                                     {'square': fsquare}, ['p0', 'p1'], config)
+            for pool in ['thread', 'process']:
+                with ev.get_executor(evaluator, 2, pool) as executor:
+                    futures = [ev.submit_evaluation(evaluator, executor, pp, i)
+                               for i, pp in enumerate(points)]
+                    costs = [ff.result() for ff in futures]
+                nptest.assert_array_almost_equal(np.ravel(costs), refcosts)
+            # evaluation failures are passed on to the future
+            evaluator = ev.Evaluator(objvs, [['fail', [ValueError]]],
+                                     {'fail': fexception}, ['p0', 'p1'], config)
+            with ev.get_executor(evaluator, 1, 'thread') as executor:
+                future = ev.submit_evaluation(evaluator, executor, points[0], 0)
+                self.assertRaises(ValueError, future.result)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -50,6 +50,12 @@ class ParseConfigTest(unittest.TestCase):
             'templatedir': os.path.abspath('./test_optimise'),
             'workroot': os.path.abspath('./_workdir/test_optimise'),
             'keepworkdirs': True,
+            'materialise': 'copy',
+            'writable': None,
+            'workdirpool': 0,
+            'taskworkers': 1,
+            'taskstore': None,
+            'cache': None,
         }
         self.assertDictEqual(refdict, config)
         return config
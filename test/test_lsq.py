@@ -0,0 +1,54 @@
+"""Test the least-squares optimisation module"""
+import os
+import unittest
+import tempfile
+import numpy.testing as nptest
+from skpar.core.lsq import LSQ
+from skpar.core.evaluate import Evaluator
+from skpar.core.objectives import set_objectives
+from skpar.core.parameters import get_parameters
+from .fixtures import COEF, REFDATA, PARAMETERS
+from .fixtures import residuals_poly3, fpoly3
+
+
+class LSQTest(unittest.TestCase):
+    """Check convergence of least squares with plain and batch residuals"""
+
+    def test_lsq(self):
+        """Does the solver find the coefficients with few evaluations?"""
+        lsq = LSQ(get_parameters(PARAMETERS), residuals_poly3)
+        nptest.assert_allclose(lsq.x0 / lsq.norm + lsq.shift,
+                               [8, -2, 0.4, 0.06])
+        gbest, stats = lsq()
+        nptest.assert_allclose(gbest, COEF, rtol=1.e-5)
+        self.assertTrue(lsq.gbestfit[0] < 1.e-6)
+        self.assertTrue(lsq.nfev < 20)
+        self.assertEqual(len(stats), lsq.nfev)
+        self.assertEqual(lsq.halloffame[0][2], lsq.gbest_iteration)
+        self.assertRaises(ValueError, LSQ, get_parameters(PARAMETERS),
+                          residuals_poly3, method='lm')
+
+    def test_lsq_evaluator(self):
+        """Does the solver work with an Evaluator and parallel Jacobian?"""
+        objectives = set_objectives([{'yval': {
+            'models': 'poly3', 'ref': list(REFDATA),
+            'eval': ['rms', 'relerr']}}], verbose=False)
+        config = {'workroot': None, 'templatedir': None, 'keepworkdirs': False}
+        evaluator = Evaluator(objectives, [['poly3', ['poly3']]],
+                              {'poly3': fpoly3}, ['c0', 'c1', 'c2', 'c3'],
+                              config)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            chkfile = os.path.join(tmpdir, 'lsq.checkpoint')
+            lsq = LSQ(get_parameters(PARAMETERS), evaluator, nworkers=2,
+                      pool='thread', checkpoint=1, checkpointfile=chkfile)
+            gbest, _ = lsq()
+            nptest.assert_allclose(gbest, COEF, rtol=1.e-5)
+            # a resumed search starts from the best point found
+            lsq = LSQ(get_parameters(PARAMETERS), evaluator,
+                      checkpointfile=chkfile)
+            rgbest, _ = lsq(resume=True)
+            nptest.assert_allclose(rgbest, gbest, rtol=1.e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
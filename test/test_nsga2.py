@@ -0,0 +1,87 @@
+"""Test the multi-objective NSGA-II module"""
+import os
+import unittest
+import tempfile
+import numpy as np
+import numpy.testing as nptest
+from skpar.core.nsga2 import NSGA2, nondominated, select_nsga2
+from skpar.core.evaluate import Evaluator
+from skpar.core.objectives import set_objectives
+from skpar.core.parameters import get_parameters
+from .fixtures import REFDATA, PARAMETERS, fpoly3, evaluate_twowells
+
+
+class NSGA2Test(unittest.TestCase):
+    """Check non-dominated sorting, the Pareto front and resume"""
+
+    def test_nondominated(self):
+        """Are dominated points identified, for minimisation?"""
+        fitness = [[1, 3], [2, 2], [3, 1], [2, 3], [3, 3], [1, 3]]
+        mask = nondominated(fitness, [-1, -1])
+        nptest.assert_array_equal(mask, [1, 1, 1, 0, 0, 1])
+        selected = select_nsga2(fitness, 3, [-1, -1])
+        self.assertNotIn(4, selected)
+        self.assertNotIn(3, selected)
+
+    def test_nsga2(self):
+        """Does the front approach the Pareto set and get written?"""
+        prange = [(-4, 4), (-4, 4)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paretofile = os.path.join(tmpdir, 'pareto.dat')
+            nsga2 = NSGA2(prange, evaluate_twowells, npop=20, ngen=40,
+                          seed=1, paretofile=paretofile)
+            (ffront, pfront, _), stats = nsga2()
+            data = np.loadtxt(paretofile)
+        self.assertEqual(len(stats), 40)
+        self.assertGreater(len(ffront), 10)
+        ffront, pfront = np.array(ffront), np.array(pfront)
+        self.assertTrue(np.all(nondominated(ffront, [-1, -1])))
+        # on the front, x1 ~ 0 and x0 spreads over [0, 2]
+        self.assertLess(np.max(np.abs(pfront[:, 1])), 0.2)
+        self.assertLess(np.min(pfront[:, 0]), 0.3)
+        self.assertGreater(np.max(pfront[:, 0]), 1.7)
+        # file rows: fitness of objectives, then parameters
+        self.assertEqual(data.shape, (len(ffront), 4))
+        nptest.assert_allclose(np.sort(data[:, 0]), np.sort(ffront[:, 0]))
+        self.assertEqual(nsga2.halloffame[0][2], nsga2.gbest_iteration)
+        self.assertRaises(ValueError, NSGA2, prange, evaluate_twowells,
+                          npop=10)
+        # ErrTol applies to the global cost of the best point
+        with tempfile.TemporaryDirectory() as tmpdir:
+            nsga2 = NSGA2(prange, evaluate_twowells, npop=20, ngen=40, seed=1,
+                          paretofile=os.path.join(tmpdir, 'pareto.dat'),
+                          ErrTol=10.)
+            _, stats = nsga2()
+        self.assertEqual(len(stats), 1)
+        self.assertTrue(nsga2.stopping.reason.startswith('errtol'))
+
+    def test_nsga2_evaluator(self):
+        """Are the objectives of an Evaluator optimised separately?"""
+        objectives = set_objectives([
+            {'yval': {'models': 'poly3', 'ref': list(REFDATA),
+                      'eval': ['rms', 'relerr'], 'doc': 'poly3'}},
+            {'yval': {'models': 'poly3', 'ref': list(2 * REFDATA),
+                      'eval': ['rms', 'relerr'], 'doc': 'double poly3'}}],
+            verbose=False)
+        config = {'workroot': None, 'templatedir': None, 'keepworkdirs': False}
+        evaluator = Evaluator(objectives, [['poly3', ['poly3']]],
+                              {'poly3': fpoly3}, ['c0', 'c1', 'c2', 'c3'],
+                              config)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paretofile = os.path.join(tmpdir, 'pareto.dat')
+            nsga2 = NSGA2(get_parameters(PARAMETERS), evaluator, npop=8,
+                          ngen=4, seed=1, nworkers=2, pool='thread',
+                          paretofile=paretofile)
+            (ffront, pfront, _), _ = nsga2()
+            with open(paretofile) as fin:
+                header = [line for line in fin if line.startswith('#')]
+            data = np.loadtxt(paretofile, ndmin=2)
+        self.assertEqual(np.shape(ffront)[1], 2)
+        self.assertEqual(data.shape, (len(ffront), 6))
+        self.assertIn('double poly3', header[2])
+        self.assertIn('c3', header[-1])
+        self.assertTrue(np.all(nondominated(ffront, [-1, -1])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,11 +2,14 @@ import unittest
 import logging
 import os
 import os.path
+import shutil
+import tempfile
 import numpy as np
 import numpy.testing as nptest
 import yaml
 from skpar.core.parameters import get_parameters, update_template
 from skpar.core.parameters import update_parameters, substitute_template
+from skpar.core.parameters import TEMPLATES
 
 logging.basicConfig(level=logging.DEBUG)
 logging.basicConfig(format='%(message)s')
@@ -115,6 +118,29 @@ class UpdateParametersTest(unittest.TestCase):
         os.remove(fout)
         os.remove(ftempl)
 
+    def test_updateparameters_cached(self):
+        """Is a template copied to several work directories read once?"""
+        ftempl = os.path.join('skf', 'template.par')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            templatedir = os.path.join(tmpdir, 'template')
+            os.makedirs(os.path.join(templatedir, 'skf'))
+            with open(os.path.join(templatedir, ftempl), 'w') as fh:
+                fh.write('%(A)f')
+            TEMPLATES.clear()
+            for i, value in enumerate([1, 2]):
+                workdir = os.path.join(tmpdir, str(i))
+                shutil.copytree(templatedir, workdir)
+                update_parameters(workdir, [ftempl], [value], ['A'])
+                with open(os.path.join(workdir, 'skf', 'par')) as fh:
+                    self.assertEqual(fh.read(), '{:f}'.format(value))
+            self.assertEqual(len(TEMPLATES), 1)
+            # a modified template is read again
+            with open(os.path.join(workdir, ftempl), 'w') as fh:
+                fh.write('%(A)f %(A)f')
+            update_parameters(workdir, [ftempl], [3], ['A'])
+            with open(os.path.join(workdir, 'skf', 'par')) as fh:
+                self.assertEqual(fh.read(), '3.000000 3.000000')
+
     #BA: Disabled: update_parameters can't handle parnames=None.
     #BA: But, why should it?
     #def test_updateparameters_None(self):
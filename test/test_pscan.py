@@ -3,13 +3,34 @@ import numpy as np
 import numpy.testing as nptest
 from numpy.polynomial.polynomial import polyval
 import logging
+import tempfile
 import os, sys
-from skpar.core.pscan import PSCAN, pformat
+from skpar.core.pscan import PSCAN, pformat, create_positions
+from skpar.core.pscan import get_shard, merge_shards
+from skpar.core.evaluate import Evaluator
+from skpar.core.objectives import set_objectives
+from skpar.core.checkpoint import load_checkpoint
 
 logging.basicConfig(level=logging.DEBUG)
 logging.basicConfig(format='%(message)s')
 logger = logging.getLogger(__name__)
 
+def evaluate_paraboloid(parameters, iteration):
+    """Return the squared distance from (0.5, 0.5, ...)"""
+    return np.atleast_1d(np.sum((np.array(parameters) - 0.5)**2))
+
+XREF = np.linspace(-9, 9, 5)
+
+def fpoly3(env, database, model):
+    """Put the values of a 3rd order polynomial at XREF in the database"""
+    database.update(model, {'yval': polyval(XREF, env['parametervalues'])})
+
+def fpoly3_stacked(env, database, model):
+    """Put the polynomials of all rows of parameters in the database"""
+    database.update(model, {'yval': polyval(XREF, env['parametervalues'].T,
+                                            tensor=True)})
+fpoly3_stacked.vectorised = True
+
 class PscanTest(unittest.TestCase):
     """
     A small test and usage example of the PSCAN engine.
@@ -56,11 +77,17 @@ class PscanTest(unittest.TestCase):
         # Target coef. are: 10, -2.5, 0.5, 0.05
         parameters = [(4, -10.,20.), (3, -3.,-2.), (5, 0.,2.)]
         objectives = (-1, )
-        # make an instance of the pscan
-        optimise = PSCAN(parameters, evaluate, objective_weights=objectives)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # make an instance of the pscan
+            optimise = PSCAN(parameters, evaluate, objective_weights=objectives,
+                checkpointfile=os.path.join(tmpdir, 'pscan.checkpoint'))
 
-        # buzz the particle swarm for ngen generations 
-        population, stats = optimise()
+            # buzz the particle swarm for ngen generations 
+            population, stats = optimise()
+            # the fitness is memory-mapped to a file next to the checkpoint
+            self.assertEqual(optimise.fitnessfile,
+                             os.path.join(tmpdir, 'pscan_fitness.npy'))
+            self.assertEqual(np.load(optimise.fitnessfile).shape, (4, 3, 5, 1))
 
         logger.debug ("Best position sequential number: {0}".format(population.ibest))
         logger.debug ("Best position fitness: {:.5f}".format(population.best.fitness.values[0]))
@@ -73,6 +100,198 @@ class PscanTest(unittest.TestCase):
         nptest.assert_allclose(population.best, c[:3], rtol=0.1, verbose=True)
         self.assertTrue(population.best.fitness.values[0] < 0.2)
 
+    def test_scan_resume(self):
+        """Can we resume an interrupted scan from a checkpoint?"""
+        def evaluate(parameters, iteration):
+            if iteration == 7 and not resumed:
+                raise KeyboardInterrupt
+            evaluated.append(iteration)
+            return np.atleast_1d(np.sum((np.array(parameters) - 0.5)**2))
+        parameters = [(3, 0., 1.), (4, 0., 1.5)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            chkfile = os.path.join(tmpdir, 'pscan.checkpoint')
+            evaluated, resumed = [], False
+            optimise = PSCAN(parameters, evaluate, checkpoint=2,
+                             checkpointfile=chkfile)
+            self.assertRaises(KeyboardInterrupt, optimise)
+            self.assertEqual(evaluated, list(range(7)))
+            evaluated, resumed = [], True
+            optimise = PSCAN(parameters, evaluate, checkpoint=2,
+                             checkpointfile=chkfile)
+            population, stats = optimise(resume=True)
+            # the checkpoint refers to the fitness file, not its content
+            state = load_checkpoint(chkfile)
+        self.assertNotIn('fitness', state)
+        self.assertEqual(state['fitnessfile'],
+                         os.path.join(tmpdir, 'pscan_fitness.npy'))
+        # points 0..5 were checkpointed, 6 is lost and re-evaluated
+        self.assertEqual(evaluated, list(range(6, 12)))
+        self.assertEqual(population.inext, 12)
+        nptest.assert_allclose(population.best, [0.5, 0.5])
+        self.assertEqual(population.best.fitness.values[0], 0)
+
+    def test_grid(self):
+        """Are grid points created lazily, in C order of the parameters?"""
+        grid = create_positions([(0, 1), (-1, 1), (2, 3)], [2, 3, 4])
+        self.assertEqual(len(grid), 24)
+        self.assertEqual(grid.shape, (2, 3, 4))
+        expected = [(x, y, z) for x in np.linspace(0, 1, 2)
+                    for y in np.linspace(-1, 1, 3)
+                    for z in np.linspace(2, 3, 4)]
+        nptest.assert_allclose(list(grid), expected)
+        nptest.assert_allclose(grid.points(5, 11), expected[5:11])
+        self.assertEqual(grid[-1], expected[-1])
+        self.assertRaises(IndexError, grid.__getitem__, 24)
+
+    def test_scan_streaming(self):
+        """Are chunks written to the scan file and the fitness array?"""
+        def evaluate(parameters, iteration):
+            if iteration == 9 and not resumed:
+                raise RuntimeError('interrupted')
+            return np.atleast_1d(np.sum((np.array(parameters) - 0.5)**2))
+        parameters = [(3, 0., 1.), (4, 0., 1.5), (2, 0., 1.)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            chkfile = os.path.join(tmpdir, 'pscan.checkpoint')
+            scanfile = os.path.join(tmpdir, 'scan.dat')
+            fitnessfile = os.path.join(tmpdir, 'fitness.npy')
+            options = {'chunksize': 5, 'nworkers': 2, 'pool': 'thread',
+                       'checkpoint': 8, 'checkpointfile': chkfile,
+                       'scanfile': scanfile, 'fitnessfile': fitnessfile}
+            resumed = False
+            optimise = PSCAN(parameters, evaluate, **options)
+            self.assertRaises(RuntimeError, optimise)
+            resumed = True
+            optimise = PSCAN(parameters, evaluate, **options)
+            population, stats = optimise(resume=True)
+            data = np.loadtxt(scanfile)
+            fitness = np.load(fitnessfile)
+        # every point written once, despite the interruption
+        nptest.assert_array_equal(data[:, 0], np.arange(24))
+        positions = create_positions([(0., 1.), (0., 1.5), (0., 1.)],
+                                     [3, 4, 2])
+        nptest.assert_allclose(data[:, 1:4], list(positions))
+        expected = np.sum((data[:, 1:4] - 0.5)**2, axis=1)
+        nptest.assert_allclose(data[:, 4], expected)
+        self.assertEqual(fitness.shape, (3, 4, 2, 1))
+        nptest.assert_allclose(fitness.ravel(), expected)
+        self.assertEqual(population.ibest, int(np.argmin(expected)))
+        self.assertEqual(population[3].fitness.values[0], expected[3])
+        self.assertAlmostEqual(stats[0]['Fitness']['Avg'], np.mean(expected))
+        self.assertAlmostEqual(stats[0]['Fitness']['Std'], np.std(expected))
+        self.assertEqual(optimise.halloffame[0][2], population.ibest)
+
+    def test_scan_shards(self):
+        """Do shards of a scan merge into the fitness grid of a full scan?"""
+        self.assertEqual(get_shard('2/3', 10), (2, 3, 3, 6))
+        self.assertEqual(get_shard([3, 3], 10), (3, 3, 6, 10))
+        self.assertRaises(ValueError, get_shard, '4/3', 10)
+        self.assertRaises(ValueError, get_shard, 'all', 10)
+        parameters = [(3, 0., 1.), (4, 0., 1.5), (2, 0., 1.)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            chkfile = os.path.join(tmpdir, 'pscan.checkpoint')
+            fitnessfile = os.path.join(tmpdir, 'fitness.npy')
+            population, _ = PSCAN(parameters, evaluate_paraboloid,
+                                  fitnessfile=fitnessfile)()
+            full = np.load(fitnessfile)
+            shardfiles = []
+            for ishard in range(1, 4):
+                optimise = PSCAN(parameters, evaluate_paraboloid,
+                                 shard='{}/3'.format(ishard), chunksize=3,
+                                 nworkers=2, checkpointfile=chkfile)
+                optimise()
+                self.assertEqual(optimise.population.inext,
+                                 ishard * 24 // 3)
+                shardfiles.append(optimise.fitnessfile)
+            # metadata files may be given instead of fitness files
+            shardfiles[0] = shardfiles[0].replace('.npy', '.yaml')
+            mergedfile = os.path.join(tmpdir, 'merged.npy')
+            fitness, ibest, best, meta = merge_shards(shardfiles, mergedfile)
+            nptest.assert_array_equal(np.load(mergedfile), full)
+            # a missing shard leaves a hole in the grid
+            _, _, _, meta = merge_shards(shardfiles[:2])
+        nptest.assert_array_equal(fitness, full)
+        self.assertEqual(ibest, population.ibest)
+        nptest.assert_allclose(best, population.best)
+        self.assertEqual(meta['missing'], 8)
+
+    def test_scan_more_shards_than_points(self):
+        """Does a shard without points end cleanly, and merge with others?"""
+        parameters = [(2, 0., 1.)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            chkfile = os.path.join(tmpdir, 'pscan.checkpoint')
+            shardfiles = []
+            for ishard in range(1, 4):
+                optimise = PSCAN(parameters, evaluate_paraboloid,
+                                 shard='{}/3'.format(ishard),
+                                 checkpointfile=chkfile)
+                population, stats = optimise()
+                optimise.report()
+                shardfiles.append(optimise.fitnessfile)
+                if ishard == 1:
+                    # the first of 3 shards of 2 points is empty
+                    self.assertEqual(population.stop - population.start, 0)
+                    self.assertIsNone(population.best)
+                    self.assertTrue(np.isnan(stats[0]['Fitness']['Avg']))
+                else:
+                    self.assertEqual(stats[0]['Fitness']['Std'], 0.)
+            fitness, ibest, best, meta = merge_shards(shardfiles)
+        nptest.assert_allclose(fitness.ravel(), [0.25, 0.25])
+        self.assertEqual(meta['missing'], 0)
+
+    def test_scan_vectorised(self):
+        """Does a vectorised model scan chunks of the grid at once, alike?"""
+        objectives = set_objectives([
+            {'yval': {'models': 'poly3',
+                      'ref': polyval(XREF, [10, -2.5, 0.5, 0.05]),
+                      'eval': ['rms', 'relerr']}}], verbose=False)
+        parameters = [(4, -10., 20.), (3, -3., -2.), (5, 0., 2.),
+                      (1, 0.05, 0.05)]
+        config = {'workroot': None, 'templatedir': None, 'keepworkdirs': False}
+        results = []
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fitnessfile = os.path.join(tmpdir, 'fitness.npy')
+            for task in [fpoly3, fpoly3_stacked]:
+                evaluator = Evaluator(objectives, [['poly3', ['poly3']]],
+                                      {'poly3': task}, list('abcd'), config)
+                optimise = PSCAN(parameters, evaluator, chunksize=25,
+                                 fitnessfile=fitnessfile)
+                population, _ = optimise()
+                results.append((np.load(fitnessfile), population.ibest))
+        self.assertTrue(evaluator.vectorised)
+        nptest.assert_allclose(results[1][0], results[0][0])
+        self.assertEqual(results[1][1], results[0][1])
+        nptest.assert_allclose(population.best, [10, -2.5, 0.5, 0.05],
+                               rtol=0.1)
+
+    def test_scan_adaptive(self):
+        """Does refinement around the best points reach the fine minimum?"""
+        def evaluate(parameters, iteration):
+            evaluated.append(iteration)
+            return np.atleast_1d(np.sum((np.array(parameters) -
+                                         [0.37, 0.61])**2))
+        evaluated = []
+        with tempfile.TemporaryDirectory() as tmpdir:
+            population, _ = PSCAN([(65, 0., 1.), (65, 0., 1.)], evaluate,
+                checkpointfile=os.path.join(tmpdir, 'pscan.checkpoint'))()
+        fullbest = population.ibest
+        evaluated = []
+        optimise = PSCAN([(5, 0., 1.), (5, 0., 1.)], evaluate, adaptive=4,
+                         nbest=2, chunksize=7)
+        population, stats = optimise()
+        self.assertEqual(len(population), 65 * 65)
+        self.assertEqual(population.ibest, fullbest)
+        nptest.assert_allclose(population.best, [0.375, 0.609375])
+        # each point is evaluated once, and far fewer than the fine grid
+        self.assertEqual(len(evaluated), len(set(evaluated)))
+        self.assertEqual(population.inext, len(evaluated))
+        self.assertLess(len(evaluated), 65 * 65 // 10)
+        # the coarse grid is the first level
+        self.assertEqual(evaluated[:5], [0, 16, 32, 48, 64])
+        self.assertEqual(population[evaluated[-1]].fitness.values,
+                         tuple(evaluate(population[evaluated[-1]], None)))
+        self.assertRaises(ValueError, PSCAN, [(5, 0., 1.)], evaluate,
+                          adaptive=2, shard='1/2')
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -1,17 +1,23 @@
 """Test particle swarm optimisation module"""
+import os
 import unittest
 import logging
+import random
+import tempfile
 import numpy as np
 import numpy.testing as nptest
 from numpy.polynomial.polynomial import polyval
 from deap import base
 from deap import creator
 from skpar.core.pso import PSO, createParticle, evolveParticle, pformat
+from skpar.core.stopping import Stopping, diameter
+from .fixtures import evaluate_poly3, evaluate_constant, COEF
 
 logging.basicConfig(level=logging.DEBUG)
 logging.basicConfig(format='%(message)s')
 LOGGER = logging.getLogger(__name__)
 
+
 class PSOTest(unittest.TestCase):
     """
     A small test and usage example of the PSO engine.
@@ -82,6 +88,136 @@ class PSOTest(unittest.TestCase):
                                verbose=True)
         self.assertTrue(swarm.gbest.fitness.values[0] < 0.2)
 
+    def test_pso_parallel(self):
+        """Does parallel evaluation of the swarm reproduce the serial run?"""
+        prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        results = []
+        for nworkers, pool in [(1, 'process'), (3, 'process'), (3, 'thread')]:
+            random.seed(1234)
+            pso = PSO(prange, evaluate_poly3, npart=6, ngen=5,
+                      nworkers=nworkers, pool=pool)
+            swarm, stats = pso()
+            results.append((swarm.gbest_iteration, swarm.gbest.fitness.values,
+                            swarm.gbest.renormalized,
+                            [ss['Fitness']['Avg'] for ss in stats]))
+        serial = results[0]
+        for parallel in results[1:]:
+            self.assertEqual(serial[0], parallel[0])
+            self.assertEqual(serial[1], parallel[1])
+            nptest.assert_array_equal(serial[2], parallel[2])
+            nptest.assert_array_equal(serial[3], parallel[3])
+
+    def test_pso_resume(self):
+        """Does a resumed run reproduce an uninterrupted one?"""
+        prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        random.seed(4321)
+        pso = PSO(prange, evaluate_poly3, npart=5, ngen=6)
+        swarm, stats = pso()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            chkfile = os.path.join(tmpdir, 'pso.checkpoint')
+            random.seed(4321)
+            pso = PSO(prange, evaluate_poly3, npart=5, ngen=6,
+                      checkpoint=1, checkpointfile=chkfile)
+            # interrupt the run after 3 generations
+            pso(ngen=3)
+            # a new instance picks up where the last one stopped
+            random.seed(1)
+            pso = PSO(prange, evaluate_poly3, npart=5, ngen=6,
+                      checkpoint=1, checkpointfile=chkfile)
+            rswarm, rstats = pso(resume=True)
+        self.assertEqual(len(rstats), 6)
+        self.assertEqual(swarm.gbest_iteration, rswarm.gbest_iteration)
+        self.assertEqual(swarm.gbest.fitness.values, rswarm.gbest.fitness.values)
+        nptest.assert_array_equal(swarm.gbest.renormalized,
+                                  rswarm.gbest.renormalized)
+        nptest.assert_array_equal([ss['Fitness']['Avg'] for ss in stats],
+                                  [ss['Fitness']['Avg'] for ss in rstats])
+
+    def test_pso_async(self):
+        """Does the asynchronous swarm converge within the same budget?"""
+        prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        results = []
+        for nworkers, pool in [(1, 'thread'), (1, 'thread'), (3, 'thread'),
+                               (3, 'process')]:
+            random.seed(1234)
+            # ErrTol=0 lets the whole budget be spent
+            pso = PSO(prange, evaluate_poly3, npart=8, ngen=150,
+                      nworkers=nworkers, pool=pool, asynchronous=True,
+                      statsinterval=40, ErrTol=0)
+            swarm, stats = pso()
+            # statistics per 40 evaluations
+            self.assertEqual(len(stats), 30)
+            self.assertEqual(sum(pso.counts), 150 * 8)
+            nptest.assert_allclose(swarm.gbest.renormalized, COEF, rtol=0.1)
+            results.append((swarm.gbest_iteration, swarm.gbest.fitness.values))
+        # a single worker completes evaluations in order of submission
+        self.assertEqual(results[0], results[1])
+
+    def test_pso_async_resume(self):
+        """Does a resumed asynchronous run use the remaining budget?"""
+        prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        random.seed(4321)
+        pso = PSO(prange, evaluate_poly3, npart=5, ngen=6, pool='thread',
+                  asynchronous=True)
+        swarm, stats = pso()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            chkfile = os.path.join(tmpdir, 'pso.checkpoint')
+            random.seed(4321)
+            pso = PSO(prange, evaluate_poly3, npart=5, ngen=6, pool='thread',
+                      asynchronous=True, checkpoint=1, checkpointfile=chkfile)
+            pso(ngen=3)
+            random.seed(1)
+            pso = PSO(prange, evaluate_poly3, npart=5, ngen=6, pool='thread',
+                      asynchronous=True, checkpoint=1, checkpointfile=chkfile)
+            rswarm, rstats = pso(resume=True)
+        self.assertEqual(pso.counts, [6] * 5)
+        self.assertEqual(len(rstats), 6)
+        self.assertEqual(swarm.gbest_iteration, rswarm.gbest_iteration)
+        self.assertEqual(swarm.gbest.fitness.values, rswarm.gbest.fitness.values)
+        nptest.assert_array_equal([ss['Fitness']['Avg'] for ss in stats],
+                                  [ss['Fitness']['Avg'] for ss in rstats])
+
+    def test_pso_stopping(self):
+        """Does the swarm stop early by each criterion, and report which?"""
+        prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        random.seed(1234)
+        pso = PSO(prange, evaluate_poly3, npart=8, ngen=150, ErrTol=0.01)
+        swarm, stats = pso()
+        self.assertLess(len(stats), 150)
+        self.assertLessEqual(swarm.gbest.fitness.values[0], 0.01)
+        self.assertTrue(pso.stopping.reason.startswith('errtol'))
+        for options, ngen, reason in [({'maxeval': 40}, 5, 'maxeval'),
+                                      ({'stall': 2}, 3, 'stall'),
+                                      ({'mindiameter': 10.}, 1, 'mindiameter'),
+                                      ({'maxtime': 1.e-9}, 1, 'maxtime')]:
+            evaluate = evaluate_constant if reason == 'stall' else\
+                evaluate_poly3
+            pso = PSO(prange, evaluate, npart=8, ngen=150, ErrTol=0,
+                      **options)
+            _, stats = pso()
+            self.assertEqual(len(stats), ngen)
+            self.assertTrue(pso.stopping.reason.startswith(reason))
+        # in asynchronous mode, the budget of evaluations is exact
+        pso = PSO(prange, evaluate_poly3, npart=8, ngen=150, ErrTol=0,
+                  asynchronous=True, pool='thread', maxeval=30)
+        pso()
+        self.assertEqual(sum(pso.counts), 30)
+        self.assertTrue(pso.stopping.reason.startswith('maxeval'))
+
+    def test_diameter(self):
+        """Is the diameter that of the farthest pair, or a conclusive bound?"""
+        points = np.random.default_rng(0).uniform(-1, 1, (50, 3))
+        d2 = np.sum((points[:, None, :] - points[None, :, :])**2, axis=-1)
+        self.assertAlmostEqual(diameter(points), np.sqrt(np.max(d2)))
+        self.assertEqual(diameter(points[:1]), 0.)
+        # the diagonal of the bounding box suffices below the threshold
+        stopping = Stopping(mindiameter=10.)
+        diagonal = np.linalg.norm(np.ptp(points, axis=0))
+        self.assertAlmostEqual(stopping.get_diameter(points), diagonal)
+        stopping = Stopping(mindiameter=1.)
+        self.assertAlmostEqual(stopping.get_diameter(points),
+                               diameter(points))
+
 class ParticleTest(unittest.TestCase):
     """Test creation and evolution of particles for the PSO
     """
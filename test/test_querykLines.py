@@ -6,6 +6,7 @@ from skpar.core.database import Database
 from skpar.dftbutils import lattice
 from skpar.dftbutils.lattice import Lattice
 from skpar.dftbutils.queryDFTB import get_dftbp_data, get_bandstructure
+from skpar.dftbutils.queryDFTB import KPATHS
 from skpar.dftbutils.querykLines import get_klines, greekLabels, get_kvec_abscissa
 
 logging.basicConfig(level=logging.DEBUG)
@@ -59,6 +60,25 @@ class GetAbscissakVectorTest(unittest.TestCase):
         self.assertAlmostEqual(xx[-1], xt[-1])
         self.assertEqual(len(xx), kLines[-1][-1]+1)
 
+    def test_kpath_cached(self):
+        """Is the k-path analysed once for repeated band-structures?"""
+        latticeinfo = {'type': 'FCC', 'param': 1.}
+        src = 'test_dftbutils/bs'
+        KPATHS.clear()
+        database = Database()
+        for model in ['test1', 'test2']:
+            get_bandstructure({'workroot': '.'}, database, src, model,
+                              latticeinfo=latticeinfo)
+        self.assertEqual(len(KPATHS), 1)
+        kLines1 = database.get_item('test1', 'kLines')
+        kLines2 = database.get_item('test2', 'kLines')
+        self.assertListEqual(kLines1, kLines2)
+        # models do not share mutable data
+        self.assertIsNot(kLines1, kLines2)
+        get_bandstructure({'workroot': '.'}, database, src, 'test3',
+                          latticeinfo={'type': 'FCC', 'param': 2.})
+        self.assertEqual(len(KPATHS), 2)
+
     def test_get_kvec_abscissa3(self):
         """Can we get the bandstructure and extract the kvector info, from vasp style kLines"""
         latticeinfo = {'type': 'FCC', 'param': 1.}
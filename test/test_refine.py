@@ -0,0 +1,90 @@
+"""Test local refinement of the hall of fame of an optimiser"""
+import random
+import logging
+import unittest
+import threading
+import numpy.testing as nptest
+from skpar.core.optimise import Optimiser
+from skpar.core.parameters import get_parameters
+from skpar.core.refine import get_refine_options, get_halloffame, refine
+from .fixtures import evaluate_poly3, COEF
+
+PARAMETERS = ['c0 -20 20', 'c1 -5 5', 'c2 -2 2', 'c3 -1 1']
+
+
+class RefineTest(unittest.TestCase):
+    """Check refinement options and the gain of refinement"""
+
+    def test_options(self):
+        """Is user input of refinement parsed?"""
+        self.assertTrue(get_refine_options(None) is None)
+        self.assertEqual(get_refine_options(True)['method'], 'nelder-mead')
+        options = get_refine_options({'method': 'Powell', 'nstarts': 3})
+        self.assertEqual(options['method'], 'powell')
+        self.assertEqual(options['nstarts'], 3)
+        self.assertEqual(options['maxeval'], 100)
+        self.assertRaises(ValueError, get_refine_options, 'bfgs')
+
+    def test_refine(self):
+        """Do local searches improve on the hall of fame within bounds?"""
+        halloffame = [(evaluate_poly3(pp, None), pp, None)
+                      for pp in [[9., -2., 0.4, 0.06], [11., -3., 0.6, 0.04]]]
+        bounds = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        for method in ['nelder-mead', 'powell']:
+            options = get_refine_options({'method': method, 'nstarts': 2,
+                                          'maxeval': 400})
+            results = refine(evaluate_poly3, halloffame, bounds, options)
+            self.assertEqual([res['start'] for res in results], [0, 1])
+            for res, (fitness, _, _) in zip(results, halloffame):
+                self.assertAlmostEqual(res['f0'], fitness[0])
+                self.assertTrue(res['f'] < 0.1 * res['f0'])
+                self.assertTrue(res['nfev'] <= 400 + 2 * len(bounds))
+                nptest.assert_allclose(res['x'], COEF, rtol=0.05)
+
+    def test_refine_serial(self):
+        """Do starts run one at a time if the evaluator has no workroot?"""
+        class Evaluate():
+            """Stand-in for an Evaluator, recording the calling threads"""
+            def __init__(self, workroot):
+                self.config = {'workroot': workroot}
+                self.threads = set()
+            def __call__(self, parameters, iteration):
+                self.threads.add(threading.current_thread().name)
+                return evaluate_poly3(parameters, iteration)
+        halloffame = [(evaluate_poly3(pp, None), pp, None)
+                      for pp in [[9., -2., 0.4, 0.06], [11., -3., 0.6, 0.04]]]
+        bounds = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        options = get_refine_options({'nstarts': 2, 'maxeval': 20})
+        evaluate = Evaluate(None)
+        refine(evaluate, halloffame, bounds, options)
+        self.assertEqual(evaluate.threads,
+                         {threading.current_thread().name})
+        evaluate = Evaluate('_workdir')
+        refine(evaluate, halloffame, bounds, options)
+        self.assertNotIn(threading.current_thread().name, evaluate.threads)
+
+    def test_optimiser_refine(self):
+        """Does the Optimiser refine the outcome of PSO?"""
+        random.seed(1)
+        parameters = get_parameters(PARAMETERS)
+        optimiser = Optimiser('pso', parameters, evaluate_poly3,
+                              {'npart': 6, 'ngen': 10, 'refine':
+                               {'nstarts': 2, 'maxeval': 300}})
+        optimiser()
+        halloffame = get_halloffame(optimiser.optimise)
+        self.assertEqual(len(optimiser.refinement), 2)
+        fbefore = halloffame[0][0][0]
+        fafter = min(res['f'] for res in optimiser.refinement)
+        self.assertTrue(fafter < fbefore)
+        # the refined point is evaluated once more, and recorded as best
+        fitness, values, iteration = optimiser.best
+        self.assertEqual(iteration, ('refine', 'best'))
+        self.assertAlmostEqual(fitness[0], fafter)
+        self.assertEqual(fitness[0], evaluate_poly3(values, None)[0])
+        with self.assertLogs('skpar.core.refine', level=logging.INFO) as logs:
+            optimiser.report()
+        self.assertTrue(any('Refined cost' in line for line in logs.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
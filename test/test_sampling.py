@@ -0,0 +1,85 @@
+"""Test the space-filling sampling module"""
+import os
+import unittest
+import tempfile
+import numpy as np
+import numpy.testing as nptest
+from scipy.stats import qmc
+from skpar.core.sampling import SAMPLING, draw_sobol
+from skpar.core.bo import BO
+from .fixtures import evaluate_poly3
+
+
+class SamplingTest(unittest.TestCase):
+    """Check designs, batch evaluation and extension of samples"""
+
+    def test_draw_sobol(self):
+        """Is a continued Sobol sequence the same as one drawn at once?"""
+        whole = draw_sobol(3, 0, 32, seed=5)
+        nptest.assert_array_equal(np.vstack([draw_sobol(3, 0, 16, seed=5),
+                                             draw_sobol(3, 16, 32, seed=5)]),
+                                  whole)
+        # a scrambled Sobol sequence beats random points in discrepancy
+        rng = np.random.default_rng(5)
+        self.assertLess(qmc.discrepancy(whole),
+                        qmc.discrepancy(rng.uniform(size=(32, 3))))
+
+    def test_sampling(self):
+        """Are samples within ranges, evaluated and written to file?"""
+        prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        for design in ['sobol', 'lhs']:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                samplefile = os.path.join(tmpdir, 'samples.dat')
+                sampler = SAMPLING(prange, evaluate_poly3, nsamples=32,
+                                   design=design, seed=1, chunksize=10,
+                                   nworkers=2, samplefile=samplefile)
+                samples, stats = sampler()
+                data = np.loadtxt(samplefile)
+            self.assertEqual(samples.shape, (32, 4))
+            bounds = np.array(prange)
+            self.assertTrue(np.all((samples >= bounds[:, 0]) &
+                                   (samples <= bounds[:, 1])))
+            nptest.assert_allclose(data[:, :4], samples)
+            nptest.assert_allclose(data[:, 4], [evaluate_poly3(ss, None)[0]
+                                                for ss in samples])
+            self.assertEqual(stats[0]['Fitness']['Min'], sampler.gbestfit[0])
+            self.assertEqual(sampler.halloffame[0][2], sampler.gbest_iteration)
+        self.assertRaises(ValueError, SAMPLING, prange, evaluate_poly3,
+                          design='grid')
+
+    def test_sampling_extend(self):
+        """Does an extended design evaluate only the new samples?"""
+        def evaluate(parameters, iteration):
+            evaluated.append(iteration)
+            return evaluate_poly3(parameters, iteration)
+        prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        evaluated = []
+        with tempfile.TemporaryDirectory() as tmpdir:
+            chkfile = os.path.join(tmpdir, 'sampling.checkpoint')
+            samplefile = os.path.join(tmpdir, 'samples.dat')
+            options = {'checkpoint': 8, 'checkpointfile': chkfile,
+                       'samplefile': samplefile}
+            SAMPLING(prange, evaluate, nsamples=16, seed=3, **options)()
+            self.assertEqual(evaluated, list(range(16)))
+            evaluated = []
+            # the seed of the checkpoint prevails
+            sampler = SAMPLING(prange, evaluate, nsamples=32, seed=4,
+                               **options)
+            samples, _ = sampler(resume=True)
+            self.assertEqual(evaluated, list(range(16, 32)))
+            self.assertEqual(sampler.fitness.shape, (32, 1))
+            nptest.assert_allclose(sampler.fitness[:, 0],
+                                   [evaluate_poly3(ss, None)[0]
+                                    for ss in samples])
+            bounds = np.array(prange, dtype=float)
+            nptest.assert_allclose(samples, bounds[:, 0] +
+                                   draw_sobol(4, 0, 32, seed=3) *
+                                   (bounds[:, 1] - bounds[:, 0]))
+            # samples make a warm start of a Bayesian optimiser
+            bo = BO(prange, evaluate_poly3, warmstart=samplefile)
+        self.assertEqual(len(bo.gp), 32)
+        self.assertAlmostEqual(bo.gbestfit[0], sampler.gbestfit[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""Test surrogate models and pre-screening of candidates"""
+import random
+import unittest
+import numpy as np
+import numpy.testing as nptest
+from skpar.core.surrogate import RBFSurrogate, GPSurrogate, Screen, get_screen
+from skpar.core.pso import PSO
+from .fixtures import evaluate_poly3, COEF
+
+
+def quadratic(points):
+    """Smooth test function of normalised points"""
+    points = np.atleast_2d(points)
+    return -np.sum((points - 0.2)**2, axis=1)
+
+
+class SurrogateTest(unittest.TestCase):
+    """Check the predictions of the surrogate models"""
+
+    def test_models(self):
+        """Do the models reproduce a smooth function?"""
+        rng = np.random.default_rng(0)
+        xval = rng.uniform(-1, 1, (40, 2))
+        xtest = rng.uniform(-0.8, 0.8, (10, 2))
+        for model in [RBFSurrogate(), GPSurrogate()]:
+            model.add(xval, quadratic(xval))
+            # duplicates are merged
+            model.add(xval[:5], quadratic(xval[:5]))
+            self.assertEqual(len(model), 40)
+            mean, std = model.predict(xtest)
+            nptest.assert_allclose(mean, quadratic(xtest), atol=0.05)
+            if std is not None:
+                self.assertTrue(np.all(std < 0.05))
+                # uncertainty grows away from the data
+                _, far = model.predict([[5., 5.]])
+                self.assertTrue(far[0] > 10 * np.max(std))
+
+    def test_maxpoints(self):
+        """Are the models fitted on the points added last only?"""
+        rng = np.random.default_rng(0)
+        xval = rng.uniform(-1, 1, (40, 2))
+        for model in [RBFSurrogate(maxpoints=20, neighbors=10),
+                      GPSurrogate(maxpoints=20)]:
+            model.add(xval, quadratic(xval))
+            # a repeated point counts as added last
+            model.add(xval[:1], quadratic(xval[:1]))
+            model.predict(xval[:1])
+            fitted = getattr(model._model, 'y', None)
+            if fitted is None:
+                fitted = model._model['x']
+            self.assertEqual(len(fitted), 20)
+            nptest.assert_array_equal(fitted[-1], xval[0])
+
+    def test_screen(self):
+        """Are the predicted best plus an exploration quota selected?"""
+        screen = get_screen({'model': 'rbf', 'fraction': 0.25,
+                             'explore': 0.125})
+        candidates = np.linspace(-1, 1, 16)[:, None] * [1., 1.]
+        rng = random.Random(0)
+        # too few points: all candidates are selected
+        self.assertEqual(screen.select(candidates, rng), list(range(16)))
+        xval = np.random.default_rng(1).uniform(-1, 1, (30, 2))
+        screen.update(xval, quadratic(xval))
+        selected = screen.select(candidates, rng)
+        self.assertEqual(len(selected), 6)
+        # the candidates closest to the maximum at (0.2, 0.2)
+        for i in [8, 9, 10]:
+            self.assertIn(i, selected)
+        self.assertEqual(screen.nskipped, 10)
+        self.assertRaises(KeyError, Screen, 'spline')
+
+    def test_pso_surrogate(self):
+        """Does PSO converge with fewer evaluations when screened?"""
+        prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        random.seed(1234)
+        pso = PSO(prange, evaluate_poly3, npart=8, ngen=150,
+                  surrogate={'model': 'gp', 'fraction': 0.25,
+                             'explore': 0.125})
+        swarm, stats = pso()
+        self.assertEqual(len(stats), 150)
+        self.assertTrue(pso.screen.nskipped > 0.5 * 8 * 150)
+        nptest.assert_allclose(swarm.gbest.renormalized, COEF, rtol=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,7 +12,9 @@ from os.path import join as joinpath
 import numpy as np
 import numpy.testing as nptest
 from subprocess import CalledProcessError
-from skpar.core.tasks import get_tasklist, initialise_tasks
+import time
+import threading
+from skpar.core.tasks import get_tasklist, initialise_tasks, execute_tasks
 from skpar.core.parameters import Parameter
 from skpar.core.database import Database
 from skpar.core.usertasks import update_taskdict
@@ -157,6 +159,62 @@ class CoreTaskExecutionTest(unittest.TestCase):
         shutil.rmtree('./tmp')
 
 
+def ftimed(env, database, name, delay=0.1):
+    """Sleep for `delay`, recording start and end times in database"""
+    start = time.time()
+    time.sleep(delay)
+    with env['lock']:
+        database[name] = (start, time.time())
+
+class TaskGraphTest(unittest.TestCase):
+    """Check the concurrent execution of tasks as per their dependencies"""
+    yamldata = """
+        tasks:
+            - timed: [skgen]
+            - timed: [run1, {after: 0}]
+            - timed: [run2, {after: [0]}]
+            - timed: [get]
+        """
+
+    def test_parse_after(self):
+        """Is `after` taken out of the kwargs without changing the input?"""
+        tasklist = get_tasklist(yaml.load(self.yamldata)['tasks'])
+        tasks = initialise_tasks(tasklist, {'timed': ftimed})
+        self.assertListEqual([task.after for task in tasks],
+                             [None, [0], [0], None])
+        self.assertDictEqual(tasks[1].kwargs, {})
+        self.assertDictEqual(tasklist[1][1][-1], {'after': 0})
+        # only preceding tasks are allowed
+        self.assertRaises(SystemExit, initialise_tasks,
+                          [('timed', ['a', {'after': 0}])], {'timed': ftimed})
+
+    def test_execute_graph(self):
+        """Do independent tasks overlap, and do barriers hold?"""
+        tasklist = get_tasklist(yaml.load(self.yamldata)['tasks'])
+        tasks = initialise_tasks(tasklist, {'timed': ftimed})
+        for workers, overlap in [(1, False), (4, True)]:
+            database = {}
+            execute_tasks(tasks, {'lock': threading.Lock()}, database, workers)
+            self.assertTrue(database['run1'][0] >= database['skgen'][1])
+            self.assertTrue(database['run2'][0] >= database['skgen'][1])
+            self.assertTrue(database['get'][0] >= database['run1'][1])
+            self.assertTrue(database['get'][0] >= database['run2'][1])
+            first, second = sorted([database['run1'], database['run2']])
+            self.assertEqual(second[0] < first[1], overlap)
+
+    def test_execute_failure(self):
+        """Is the exception of a failing branch raised?"""
+        tasks = initialise_tasks([('timed', ['a']),
+                                  ('timed', ['b', 'x', {'after': 0}]),
+                                  ('timed', ['c', {'after': 0}]),
+                                  ('timed', ['d'])], {'timed': ftimed})
+        database = {}
+        self.assertRaises(TypeError, execute_tasks, tasks,
+                          {'lock': threading.Lock()}, database, 2)
+        self.assertTrue('c' in database)
+        self.assertFalse('d' in database)
+
+
 class GetTaskDFTBpTest(unittest.TestCase):
     """Do DFTB query tasks work well?"""
     yamlin = """
@@ -0,0 +1,120 @@
+"""Test memoisation of tasks via the content-addressed task store"""
+import os
+import unittest
+import tempfile
+from unittest import mock
+import numpy as np
+from skpar.core.tasks import initialise_tasks
+from skpar.core.taskdict import execute
+from skpar.core.taskstore import TaskStore, get_command
+
+
+def fconcat(env, database, src, dst):
+    """Concatenate the files in src into dst, counting calls in env"""
+    env['calls'].append(env['parametervalues'])
+    workroot = env['workroot']
+    os.makedirs(os.path.join(workroot, os.path.dirname(dst)), exist_ok=True)
+    with open(os.path.join(workroot, dst), 'w') as fout:
+        for name in sorted(os.listdir(os.path.join(workroot, src))):
+            with open(os.path.join(workroot, src, name)) as fin:
+                fout.write(fin.read())
+
+
+class TaskStoreTest(unittest.TestCase):
+    """Check that tasks are skipped when their inputs do not change"""
+
+    def test_memoisation(self):
+        """Are outputs restored when inputs and parameters are the same?"""
+        calls = []
+        memo = {'inputs': 'inp', 'outputs': ['out/*.dat'],
+                'parameters': ['p1']}
+        tasks = initialise_tasks([('concat', ['inp', 'out/all.dat',
+                                              {'memo': memo}])],
+                                 {'concat': fconcat})
+        self.assertEqual(tasks[0].memo['inputs'], ['inp'])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = TaskStore(os.path.join(tmpdir, 'store'))
+            def evaluate(iteration, values, content):
+                workroot = os.path.join(tmpdir, str(iteration))
+                os.makedirs(os.path.join(workroot, 'inp'))
+                with open(os.path.join(workroot, 'inp', 'a.txt'), 'w') as fout:
+                    fout.write(content)
+                env = {'workroot': workroot, 'taskstore': store,
+                       'calls': calls,
+                       'parameternames': ['p0', 'p1'],
+                       'parametervalues': values}
+                tasks[0](env, {})
+                with open(os.path.join(workroot, 'out', 'all.dat')) as fin:
+                    return fin.read()
+            self.assertEqual(evaluate(0, [1., 2.], 'a'), 'a')
+            self.assertEqual(len(calls), 1)
+            # p0 is not used by the task
+            self.assertEqual(evaluate(1, [3., 2.], 'a'), 'a')
+            self.assertEqual(len(calls), 1)
+            # modified input
+            self.assertEqual(evaluate(2, [3., 2.], 'b'), 'b')
+            self.assertEqual(len(calls), 2)
+            # modified parameter in use
+            self.assertEqual(evaluate(3, [3., 4.], 'b'), 'b')
+            self.assertEqual(len(calls), 3)
+            # no store: always executed
+            workroot = os.path.join(tmpdir, '1')
+            tasks[0]({'workroot': workroot, 'parametervalues': None,
+                      'calls': calls}, {})
+            self.assertEqual(len(calls), 4)
+
+    def test_fingerprint_ndarray(self):
+        """Are NumPy parameter values fingerprinted as a list would be?"""
+        memo = {'outputs': ['out/*.dat'], 'parameters': ['p1']}
+        tasks = initialise_tasks([('concat', ['inp', 'out/all.dat',
+                                              {'memo': memo}])],
+                                 {'concat': fconcat})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = TaskStore(os.path.join(tmpdir, 'store'))
+            def fingerprint(values):
+                env = {'parameternames': ['p0', 'p1'],
+                       'parametervalues': values}
+                return store.fingerprint(tasks[0], tmpdir, env)
+            key = fingerprint(np.array([1., 2.]))
+            self.assertEqual(key, fingerprint([1., 2.]))
+            self.assertEqual(key, fingerprint(np.array([3., 2.])))
+            self.assertNotEqual(key, fingerprint(np.array([1., 3.])))
+            self.assertEqual(fingerprint(None), fingerprint([]))
+
+    def test_fingerprint_command(self):
+        """Is the command of a task fingerprinted as it is executed?"""
+        memo = {'outputs': ['out/*.dat']}
+        tasks = initialise_tasks([('run', ['echo $SKPAR_TEST_ARG *.dat', 'calc',
+                                           {'memo': memo}])],
+                                 {'run': execute})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = TaskStore(os.path.join(tmpdir, 'store'))
+            os.makedirs(os.path.join(tmpdir, 'calc'))
+            def fingerprint(arg):
+                with mock.patch.dict(os.environ, {'SKPAR_TEST_ARG': arg}):
+                    return store.fingerprint(tasks[0], tmpdir, {})
+            with mock.patch.dict(os.environ, {'SKPAR_TEST_ARG': 'a'}):
+                cmd = get_command(tasks[0], tmpdir)
+            self.assertTrue(os.path.isabs(cmd[0]))
+            self.assertEqual(cmd[1:], ['a'])
+            key = fingerprint('a')
+            self.assertEqual(key, fingerprint('a'))
+            self.assertNotEqual(key, fingerprint('b'))
+            # globs are expanded in the execution directory
+            with open(os.path.join(tmpdir, 'calc', 'x.dat'), 'w'):
+                pass
+            self.assertNotEqual(key, fingerprint('a'))
+        # tasks of other functions have no command
+        self.assertIsNone(get_command(initialise_tasks(
+            [('concat', ['inp', 'out/all.dat'])], {'concat': fconcat})[0],
+            '.'))
+
+    def test_memo_needs_outputs(self):
+        """Is a memo without outputs rejected?"""
+        self.assertRaises(ValueError, initialise_tasks,
+                          [('concat', ['a', {'memo': {'inputs': 'a'}}])],
+                          {'concat': fconcat})
+
+
+if __name__ == '__main__':
+    unittest.main()
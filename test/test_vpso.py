@@ -0,0 +1,68 @@
+"""Test the vectorised particle swarm optimisation module"""
+import unittest
+import random
+import numpy as np
+import numpy.testing as nptest
+from deap import base
+from deap import creator
+from skpar.core.pso import createParticle, evolveParticle
+from skpar.core.vpso import VPSO, evolve_swarm
+from .fixtures import evaluate_poly3, COEF
+
+
+class VPSOTest(unittest.TestCase):
+    """Check the vectorised swarm against the particle-wise PSO"""
+
+    def test_evolve_swarm(self):
+        """Is the array update the same as that of evolveParticle?"""
+        creator.create("pFitness", base.Fitness, weights=(-1,))
+        creator.create("Particle", list, fitness=creator.pFitness, speed=list,
+                       past=list, smin=None, smax=None, best=None, norm=list,
+                       shift=list, renormalized=list, strict_bounds=True,
+                       prange=list)
+        prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        gbest = [0.9, -0.9, 0.5, 0.99]
+        random.seed(10)
+        parts = [createParticle(prange) for _ in range(6)]
+        for part in parts:
+            part.best = [random.uniform(-1, 1) for _ in range(4)]
+        position = np.array(parts, dtype=float)
+        past = np.array([part.past for part in parts])
+        speed = np.array([part.speed for part in parts])
+        best = np.array([part.best for part in parts])
+        # the same random factors, in the order drawn by evolveParticle
+        half = VPSO.pAcceleration / 2
+        random.seed(20)
+        factors = [[random.uniform(0, half) for _ in range(8)]
+                   for _ in parts]
+        u1 = np.array([ff[:4] for ff in factors])
+        u2 = np.array([ff[4:] for ff in factors])
+        random.seed(20)
+        for part in parts:
+            evolveParticle(part, gbest)
+        evolve_swarm(position, past, speed, best, np.array(gbest), u1, u2)
+        nptest.assert_array_almost_equal(position, np.array(parts))
+        nptest.assert_array_almost_equal(speed, [pp.speed for pp in parts])
+        nptest.assert_array_almost_equal(past, [pp.past for pp in parts])
+        self.assertTrue(np.all(np.abs(position) <= 1))
+
+    def test_vpso(self):
+        """Does the swarm find the coefficients of a polynomial?"""
+        prange = [(-20, 20), (-5, 5), (-2, 2), (-1, 1)]
+        vpso = VPSO(prange, evaluate_poly3, npart=8, ngen=150, seed=1)
+        positions, stats = vpso()
+        self.assertEqual(positions.shape, (8, 4))
+        # the default ErrTol (0.001) is reached before the last generation
+        self.assertLess(len(stats), 150)
+        self.assertTrue(vpso.stopping.reason.startswith('errtol'))
+        self.assertLessEqual(vpso.gbestfit[0], 0.001)
+        gbest = vpso.gbest / vpso.norm + vpso.shift
+        nptest.assert_allclose(gbest, COEF, rtol=0.1)
+        self.assertTrue(vpso.gbestfit[0] < 0.2)
+        # hall of fame starts with the global best
+        self.assertEqual(vpso.halloffame[0][0], vpso.gbestfit)
+        self.assertEqual(vpso.halloffame[0][2], vpso.gbest_iteration)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""Test materialisation of work directories from a template"""
+import os
+import sys
+import socket
+import unittest
+import tempfile
+import subprocess
+from skpar.core.workdir import create_workdir, destroy_workdir, get_workdir
+from skpar.core.workdir import WorkdirPool, get_lock_owner
+from skpar.core.parameters import update_parameters
+
+
+def make_template(templatedir):
+    """Create a small template tree with a symbolic link in it"""
+    os.makedirs(os.path.join(templatedir, 'skf'))
+    os.makedirs(os.path.join(templatedir, 'Si', 'scc'))
+    files = {'skf/Si-Si.skf': 'large table',
+             'skf/template.skdefs.py': 'r0 = %(r0)f',
+             'skf/skdefs.py': 'r0 = 0.0',
+             'Si/scc/dftb_in.hsd': 'Geometry = {}',
+             'Si/scc/charges.bin': 'charges'}
+    for name, content in files.items():
+        with open(os.path.join(templatedir, name), 'w') as fout:
+            fout.write(content)
+    os.symlink('../../skf', os.path.join(templatedir, 'Si', 'scc', 'skf'))
+
+
+class MaterialiseTest(unittest.TestCase):
+    """Check the different modes of work directory creation"""
+
+    def test_get_workdir(self):
+        """Is the work directory named by the iteration?"""
+        self.assertTrue(get_workdir(None, None) is None)
+        self.assertEqual(get_workdir((2, 3), '/tmp'), '/tmp/2-3')
+        self.assertEqual(get_workdir(4, '/tmp'), '/tmp/4')
+        self.assertEqual(get_workdir(None, '/tmp'), '/tmp/noiter')
+
+    def test_modes(self):
+        """Are the read-only files linked and writable ones copied?"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            templatedir = os.path.join(tmpdir, 'template')
+            make_template(templatedir)
+            for mode in ['copy', 'hardlink', 'symlink']:
+                workdir = os.path.join(tmpdir, mode)
+                create_workdir(workdir, templatedir, mode,
+                               writable=['charges.bin'])
+                def check(name):
+                    """Return (is same file as template, is a symlink)"""
+                    src = os.path.join(templatedir, name)
+                    dst = os.path.join(workdir, name)
+                    self.assertTrue(os.path.exists(dst), dst)
+                    return os.path.samefile(src, dst), os.path.islink(dst)
+                linked = {'copy': (False, False), 'hardlink': (True, False),
+                          'symlink': (True, True)}[mode]
+                self.assertEqual(check('skf/Si-Si.skf'), linked)
+                self.assertEqual(check('Si/scc/dftb_in.hsd'), linked)
+                # templates, their results, and writable files are copied
+                self.assertEqual(check('skf/template.skdefs.py'), (False, False))
+                self.assertEqual(check('skf/skdefs.py'), (False, False))
+                self.assertEqual(check('Si/scc/charges.bin'), (False, False))
+                # symbolic links are reproduced
+                self.assertEqual(os.readlink(os.path.join(workdir, 'Si/scc/skf')),
+                                 '../../skf')
+                # substitution must not propagate to the template
+                update_parameters(workdir, ['skf/template.skdefs.py'], [1.5],
+                                  ['r0'])
+                with open(os.path.join(templatedir, 'skf/skdefs.py')) as fin:
+                    self.assertEqual(fin.read(), 'r0 = 0.0')
+                with open(os.path.join(workdir, 'skf/skdefs.py')) as fin:
+                    self.assertEqual(fin.read(), 'r0 = 1.500000')
+                destroy_workdir(workdir)
+                self.assertFalse(os.path.exists(workdir))
+                self.assertTrue(os.path.exists(os.path.join(templatedir,
+                                                            'skf/Si-Si.skf')))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class WorkdirPoolTest(unittest.TestCase):
+    """Check the recycling of work directories"""
+
+    def test_acquire_release(self):
+        """Are directories locked, and reused only after release?"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            templatedir = os.path.join(tmpdir, 'template')
+            make_template(templatedir)
+            workroot = os.path.join(tmpdir, 'work')
+            pool = WorkdirPool(workroot, templatedir, 2, 'hardlink')
+            wd1 = pool.acquire()
+            wd2 = pool.acquire()
+            self.assertNotEqual(wd1, wd2)
+            self.assertTrue(os.path.exists(os.path.join(wd1, 'skf', 'Si-Si.skf')))
+            pool.release(wd1)
+            self.assertEqual(pool.acquire(), wd1)
+            with open(wd1 + '.lock') as fin:
+                self.assertEqual(fin.read(), get_lock_owner())
+            # locks of a process that is gone are removed by a new pool,
+            # while those of a running process are kept
+            dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+            dead.wait()
+            for workdir, pid in [(wd1, dead.pid), (wd2, os.getppid())]:
+                with open(workdir + '.lock', 'w') as fout:
+                    fout.write('{} {}'.format(socket.gethostname(), pid))
+            pool = WorkdirPool(workroot, templatedir, 2, 'hardlink')
+            self.assertFalse(os.path.exists(wd1 + '.lock'))
+            self.assertTrue(os.path.exists(wd2 + '.lock'))
+            self.assertEqual(pool.acquire(), wd1)
+            pool.release(wd2)
+            self.assertEqual(pool.acquire(), wd2)
+
+    def test_reset(self):
+        """Are outputs removed and modified template files restored?"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            templatedir = os.path.join(tmpdir, 'template')
+            make_template(templatedir)
+            for mode in ['copy', 'hardlink', 'symlink']:
+                pool = WorkdirPool(os.path.join(tmpdir, mode), templatedir, 1,
+                                   mode, writable=['charges.bin'])
+                workdir = pool.acquire()
+                scc = os.path.join(workdir, 'Si', 'scc')
+                update_parameters(workdir, ['skf/template.skdefs.py'],
+                                  [1.5], ['r0'])
+                with open(os.path.join(scc, 'charges.bin'), 'w') as fout:
+                    fout.write('modified charges')
+                os.remove(os.path.join(scc, 'dftb_in.hsd'))
+                os.makedirs(os.path.join(scc, 'output'))
+                with open(os.path.join(scc, 'output', 'detailed.out'),
+                          'w') as fout:
+                    fout.write('output')
+                with open(os.path.join(scc, 'band.out'), 'w') as fout:
+                    fout.write('output')
+                pool.release(workdir)
+                self.assertEqual(pool.acquire(), workdir)
+                self.assertFalse(os.path.exists(os.path.join(scc, 'output')))
+                self.assertFalse(os.path.exists(os.path.join(scc, 'band.out')))
+                for name in ['skf/skdefs.py', 'Si/scc/dftb_in.hsd',
+                             'Si/scc/charges.bin']:
+                    with open(os.path.join(templatedir, name)) as fin:
+                        ref = fin.read()
+                    with open(os.path.join(workdir, name)) as fin:
+                        self.assertEqual(fin.read(), ref, (mode, name))
+                self.assertTrue(os.path.islink(os.path.join(scc, 'skf')))
+                pool.release(workdir)